@@ -9,6 +9,11 @@ import os
 from flask_mail import Mail
 from .config import Config 
 from flask_moment import Moment 
+from .cache import AvailabilityCache
+from .database import (
+    REPLICA_BIND, RoutingSession, apply_sqlite_pragmas, engine_options,
+    normalize_database_url, replica_bind,
+)
 
 # ===============================================
 # 1. INSTÂNCIAS GLOBAIS
@@ -20,11 +25,12 @@ celery = Celery(
     result_backend=Config.result_backend 
 )
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login = LoginManager()
 mail = Mail() 
 moment = Moment() 
+availability_cache = AvailabilityCache()
 
 def create_app(config_class=Config):
     # Cria a instância da aplicação Flask
@@ -38,12 +44,24 @@ def create_app(config_class=Config):
     except OSError:
         pass
 
+    # --- Perfil do Banco: URL normalizada e opções do engine conforme o dialeto ---
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    replica = replica_bind(app.config)
+    if replica:
+        app.config['SQLALCHEMY_BINDS'] = {**(app.config.get('SQLALCHEMY_BINDS') or {}), REPLICA_BIND: replica}
+
     # --- Inicialização das Extensões com a App ---
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config)
     migrate.init_app(app, db)
     login.init_app(app) 
     mail.init_app(app) 
     moment.init_app(app) 
+    availability_cache.init_app(app)
     
     
     # ===============================================
@@ -51,7 +69,12 @@ def create_app(config_class=Config):
     # ===============================================
     
     # Configura o Celery com as configurações do Flask
-    celery.conf.update(app.config)
+    # 📌 Repassa só as chaves do Celery, já no formato novo (imports/beat_schedule):
+    # o Celery recusa misturar nomes antigos (CELERY_*) com os novos
+    celery.conf.update(
+        imports=app.config.get('CELERY_IMPORTS', ()),
+        beat_schedule=app.config.get('CELERY_BEAT_SCHEDULE', {}),
+    )
     
     # Cria uma classe base para tarefas que injeta o contexto da aplicação Flask
     class ContextTask(celery.Task):
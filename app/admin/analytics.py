@@ -0,0 +1,131 @@
+# app/admin/analytics.py
+
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import String, select, type_coerce
+from app import db
+from app.admin.dashboard import ATTENDED_STATUSES
+from app.archive import with_archive
+from app.models import Appointment
+from app.services.availability import END_HOUR, SLOT_INTERVAL, START_HOUR
+
+# ----------------------------------------------------
+# 📌 MAPA DE OCUPAÇÃO (dia da semana × faixa de 30 min)
+# ----------------------------------------------------
+# Os intervalos (início, fim) do período são lidos de uma vez para arrays
+# NumPy e acumulados sem laço Python por agendamento: cada intervalo vira um
+# +1 no minuto de início e um -1 no minuto de fim dentro da semana (10.080
+# minutos); a soma acumulada dá quantos agendamentos ocupam cada minuto, que
+# é então somada por faixa de SLOT_INTERVAL. Anos de histórico cabem em
+# poucos milissegundos de NumPy; o custo dominante é a leitura do banco.
+
+WEEKDAY_LABELS = ('Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom')
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# 1970-01-01 foi uma quinta-feira: (dias desde a época + 3) % 7 dá segunda = 0
+_EPOCH_WEEKDAY_OFFSET = 3
+
+
+def load_intervals(start, end):
+    """
+    Carrega (início, fim) dos agendamentos atendidos que começam no período
+    (incluindo o histórico arquivado, se o período o alcançar) como dois
+    arrays datetime64[m]. No SQLite as colunas chegam como texto ISO
+    (type_coerce evita criar um datetime Python por valor) e a conversão é
+    feita em bloco pelo NumPy.
+    """
+    stmt = select(
+        type_coerce(Appointment.data_horario, String),
+        type_coerce(Appointment.end_time, String),
+    ).where(
+        Appointment.status.in_(ATTENDED_STATUSES),
+        Appointment.data_horario >= start,
+        Appointment.data_horario <= end,
+        Appointment.end_time.is_not(None)
+    )
+    rows = db.session.execute(with_archive(stmt, start)).all()
+    if not rows:
+        empty = np.empty(0, dtype='datetime64[m]')
+        return empty, empty
+
+    starts, ends = zip(*rows)
+    return (
+        np.array(starts, dtype='datetime64[s]').astype('datetime64[m]'),
+        np.array(ends, dtype='datetime64[s]').astype('datetime64[m]'),
+    )
+
+
+def weekday_occurrences(start_day, end_day):
+    """Quantas vezes cada dia da semana (segunda = 0) aparece entre os dois dias, inclusive."""
+    days = np.arange(np.datetime64(start_day, 'D'), np.datetime64(end_day, 'D') + 1)
+    weekdays = (days.astype(np.int64) + _EPOCH_WEEKDAY_OFFSET) % 7
+    return np.bincount(weekdays, minlength=7)
+
+
+def occupied_minutes_matrix(starts, ends, slot_minutes=SLOT_INTERVAL):
+    """
+    Minutos ocupados acumulados por (dia da semana, faixa do dia), somando
+    todos os intervalos. Intervalos que passam da meia-noite são cortados no
+    fim do dia em que começam. Retorna um array (7, MINUTES_PER_DAY // slot_minutes).
+    """
+    slots_per_day = MINUTES_PER_DAY // slot_minutes
+    if starts.size == 0:
+        return np.zeros((7, slots_per_day), dtype=np.int64)
+
+    start_minutes = starts.astype(np.int64)
+    day_index = start_minutes // MINUTES_PER_DAY
+    minute_of_day = start_minutes - day_index * MINUTES_PER_DAY
+    weekday = (day_index + _EPOCH_WEEKDAY_OFFSET) % 7
+
+    duration = np.clip(ends.astype(np.int64) - start_minutes, 0, None)
+    end_of_day = np.minimum(minute_of_day + duration, MINUTES_PER_DAY)
+
+    week_start = weekday * MINUTES_PER_DAY + minute_of_day
+    week_end = weekday * MINUTES_PER_DAY + end_of_day
+
+    # Vetor de diferenças: +1 onde cada intervalo começa, -1 onde termina
+    delta = (
+        np.bincount(week_start, minlength=MINUTES_PER_WEEK + 1)
+        - np.bincount(week_end, minlength=MINUTES_PER_WEEK + 1)
+    )
+    per_minute = np.cumsum(delta[:MINUTES_PER_WEEK])
+
+    return per_minute.reshape(7, slots_per_day, slot_minutes).sum(axis=2)
+
+
+def utilization_heatmap(start, end, slot_minutes=SLOT_INTERVAL):
+    """
+    Utilização (%) de cada faixa do expediente por dia da semana no período:
+    minutos ocupados divididos pelos minutos disponíveis (a faixa × o número
+    de vezes que aquele dia da semana ocorre no período).
+    """
+    starts, ends = load_intervals(start, end)
+    occupied = occupied_minutes_matrix(starts, ends, slot_minutes)
+
+    first_slot = START_HOUR * 60 // slot_minutes
+    last_slot = END_HOUR * 60 // slot_minutes
+    occupied = occupied[:, first_slot:last_slot]
+
+    occurrences = weekday_occurrences(start.date(), end.date())
+    capacity = occurrences[:, np.newaxis] * slot_minutes
+    utilization = np.divide(
+        occupied * 100.0, capacity,
+        out=np.zeros(occupied.shape, dtype=np.float64), where=capacity > 0
+    )
+
+    day_start = datetime.combine(start.date(), datetime.min.time())
+    slot_labels = [
+        (day_start + timedelta(minutes=slot * slot_minutes)).strftime('%H:%M')
+        for slot in range(first_slot, last_slot)
+    ]
+
+    return {
+        'dias_semana': list(WEEKDAY_LABELS),
+        'faixas': slot_labels,
+        'utilizacao': np.round(utilization, 1).tolist(),
+        'minutos_ocupados': occupied.tolist(),
+        'ocorrencias': occurrences.tolist(),
+        'agendamentos': int(starts.size),
+    }
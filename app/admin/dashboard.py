@@ -0,0 +1,93 @@
+# app/admin/dashboard.py
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, case, func
+from app import db
+from app.admin.revenue import COMPLETED_STATUS, revenue_totals
+from app.cache import CachedValue
+from app.models import Appointment
+from app.services.availability import BUSY_STATUSES, END_HOUR, START_HOUR, business_hours
+
+# ----------------------------------------------------
+# 📌 INDICADORES DO PAINEL (KPIs em cache)
+# ----------------------------------------------------
+# O painel é recarregado com frequência; os indicadores são calculados com
+# três consultas agregadas e guardados por DASHBOARD_KPI_TTL segundos. As
+# rotas que alteram agendamentos chamam invalidate_dashboard_kpis() após o
+# commit, então o próprio processo nunca mostra números antigos; nos demais
+# workers o valor expira pelo TTL.
+
+CANCELLED_STATUS = 'Cancelado'
+
+# Status que contam como atendimento (ocupam ou ocuparam a agenda)
+ATTENDED_STATUSES = BUSY_STATUSES + (COMPLETED_STATUS,)
+
+# Capacidade diária da agenda em minutos (expediente de START_HOUR a END_HOUR)
+DAILY_CAPACITY_MINUTES = (END_HOUR - START_HOUR) * 60
+
+_kpi_cache = CachedValue()
+
+
+def _occupied_minutes(day):
+    """Minutos do expediente do dia ocupados por agendamentos (recortados ao horário de funcionamento)."""
+    opening, closing = business_hours(day)
+    intervals = db.session.query(Appointment.data_horario, Appointment.end_time).filter(
+        Appointment.status.in_(ATTENDED_STATUSES),
+        Appointment.data_horario < closing,
+        Appointment.end_time > opening
+    ).all()
+
+    minutes = 0.0
+    for start, end in intervals:
+        minutes += (min(end, closing) - max(start, opening)).total_seconds() / 60
+    return minutes
+
+
+def compute_dashboard_kpis(now=None):
+    """
+    Calcula os indicadores do painel: agendamentos de hoje e da semana,
+    cancelamentos da semana, ocupação do expediente de hoje e receita do mês
+    até hoje (lida do consolidado diário).
+    """
+    now = now or datetime.now()
+    today = now.date()
+    day_start = datetime.combine(today, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    week_start = day_start - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=7)
+
+    # Uma única varredura da semana (índice em data_horario) com contagens condicionais
+    in_today = and_(Appointment.data_horario >= day_start, Appointment.data_horario < day_end)
+    attended = Appointment.status.in_(ATTENDED_STATUSES)
+    cancelled = Appointment.status == CANCELLED_STATUS
+    hoje, semana, cancelamentos = db.session.query(
+        func.coalesce(func.sum(case((and_(in_today, attended), 1), else_=0)), 0),
+        func.coalesce(func.sum(case((attended, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((cancelled, 1), else_=0)), 0),
+    ).filter(
+        Appointment.data_horario >= week_start,
+        Appointment.data_horario < week_end
+    ).one()
+
+    receita_mes, concluidos_mes = revenue_totals(today.replace(day=1), today)
+
+    return {
+        'agendamentos_hoje': int(hoje),
+        'agendamentos_semana': int(semana),
+        'cancelamentos_semana': int(cancelamentos),
+        'ocupacao_hoje': round(_occupied_minutes(today) / DAILY_CAPACITY_MINUTES * 100, 1),
+        'receita_mes': round(float(receita_mes), 2),
+        'concluidos_mes': int(concluidos_mes),
+        'atualizado_em': now.isoformat(timespec='seconds'),
+    }
+
+
+def dashboard_kpis():
+    """Indicadores do painel, servidos do cache enquanto o TTL não expira."""
+    return _kpi_cache.get(compute_dashboard_kpis, current_app.config['DASHBOARD_KPI_TTL'])
+
+
+def invalidate_dashboard_kpis():
+    """Descarta os indicadores em cache; chamar após o commit de qualquer alteração de agendamento."""
+    _kpi_cache.invalidate()
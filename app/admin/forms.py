@@ -4,6 +4,7 @@ from flask_wtf import FlaskForm
 # 🟢 CORREÇÃO: Usando DecimalField para precisão monetária
 from wtforms import StringField, TextAreaField, DecimalField, IntegerField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, NumberRange, ValidationError
+from app.services.availability import RESERVATION_GRANULARITY
 # A importação do modelo Service não é estritamente necessária aqui, mas é mantida
 # from app.models import Service 
 
@@ -39,11 +40,17 @@ class ServiceForm(FlaskForm):
         'Duração (minutos)', 
         validators=[DataRequired(message="A duração é obrigatória."),
                     NumberRange(min=1, message="A duração deve ser de pelo menos 1 minuto.")],
-        render_kw={"type": "number", "step": "5", "min": "1"}
+        render_kw={"type": "number", "step": str(RESERVATION_GRANULARITY), "min": str(RESERVATION_GRANULARITY)}
     )
 
     is_active = BooleanField('Ativo para Agendamentos?', default=True)
     
     submit = SubmitField('Salvar Serviço')
 
-    # Validador Customizado removido por simplicidade, pois a checagem é feita nas rotas
\ No newline at end of file
+    # Validador Customizado removido por simplicidade, pois a checagem é feita nas rotas
+
+    def validate_duracao_minutos(self, field):
+        # As reservas de horário usam células de RESERVATION_GRANULARITY minutos: uma
+        # duração fora da grade faria agendamentos seguidos disputarem a mesma célula
+        if field.data and field.data % RESERVATION_GRANULARITY:
+            raise ValidationError(f'A duração deve ser múltipla de {RESERVATION_GRANULARITY} minutos.')
\ No newline at end of file
@@ -0,0 +1,119 @@
+# app/admin/revenue.py
+
+from sqlalchemy import func, insert, select
+from app import db
+from app.models import Appointment, DailyRevenue, Service
+from app.utils import date_bucket, day_of, upsert
+
+# ----------------------------------------------------
+# 📌 FATURAMENTO DIÁRIO CONSOLIDADO (daily_revenue)
+# ----------------------------------------------------
+# O consolidado é ajustado na mesma transação da mudança de status: +1 quando
+# um agendamento entra em 'Concluído' e -1 quando sai. O valor cobrado é
+# congelado na conclusão, então mudanças de preço não alteram o passado.
+
+COMPLETED_STATUS = 'Concluído'
+
+
+def _apply_delta(dia, service_id, quantidade, receita):
+    """Soma (ou subtrai) no consolidado do dia/serviço com um único upsert."""
+    table = DailyRevenue.__table__
+    upsert(
+        table,
+        {'dia': dia, 'service_id': service_id, 'quantidade': quantidade, 'receita': receita},
+        index_elements=['dia', 'service_id'],
+        set_=lambda excluded: {
+            'quantidade': table.c.quantidade + excluded.quantidade,
+            'receita': table.c.receita + excluded.receita,
+        }
+    )
+
+
+def record_completion(appointment):
+    """
+    Congela o preço do serviço em valor_cobrado e soma o agendamento ao
+    consolidado do dia. Deve ser chamada antes do commit, já com a data final.
+    """
+    appointment.valor_cobrado = appointment.servico.preco
+    _apply_delta(appointment.data_horario.date(), appointment.service_id, 1, appointment.valor_cobrado)
+
+
+def revert_completion(appointment):
+    """
+    Retira do consolidado um agendamento que deixou de estar 'Concluído'.
+    Deve ser chamada antes de qualquer mudança de data do agendamento.
+    """
+    valor = appointment.valor_cobrado
+    if valor is None:
+        valor = appointment.servico.preco
+    _apply_delta(appointment.data_horario.date(), appointment.service_id, -1, -valor)
+    appointment.valor_cobrado = None
+
+
+def rebuild_daily_revenue():
+    """
+    Recalcula todo o consolidado a partir dos agendamentos concluídos (da
+    tabela quente e do arquivo), com um único INSERT ... SELECT ... GROUP BY
+    no banco. Retorna o número de linhas.
+    """
+    from app.archive import union_archive
+
+    completed = union_archive(
+        select(Appointment.data_horario, Appointment.service_id, Appointment.valor_cobrado)
+        .where(Appointment.status == COMPLETED_STATUS)
+    ).subquery()
+    dia = day_of(completed.c.data_horario)
+    grouped = (
+        select(
+            dia.label('dia'),
+            completed.c.service_id,
+            func.count(),
+            func.sum(func.coalesce(completed.c.valor_cobrado, Service.preco)),
+        )
+        .select_from(completed)
+        .join(Service, completed.c.service_id == Service.id)
+        .group_by(dia, completed.c.service_id)
+    )
+
+    db.session.query(DailyRevenue).delete(synchronize_session=False)
+    db.session.execute(
+        insert(DailyRevenue).from_select(['dia', 'service_id', 'quantidade', 'receita'], grouped)
+    )
+    db.session.commit()
+    return db.session.query(func.count()).select_from(DailyRevenue).scalar()
+
+
+def revenue_totals(start_day, end_day):
+    """Total de receita e de agendamentos concluídos entre dois dias (inclusive), lido do consolidado."""
+    receita, quantidade = db.session.query(
+        func.coalesce(func.sum(DailyRevenue.receita), 0.0),
+        func.coalesce(func.sum(DailyRevenue.quantidade), 0)
+    ).filter(
+        DailyRevenue.dia >= start_day,
+        DailyRevenue.dia <= end_day
+    ).one()
+    return receita, quantidade
+
+
+def revenue_by_bucket(start_day, end_day, unit='month'):
+    """
+    Receita e quantidade agrupadas por período (dia/semana/mês) e serviço,
+    calculadas inteiramente no banco (GROUP BY sobre o consolidado diário).
+    Retorna linhas (periodo 'AAAA-MM-DD', service_id, servico, quantidade, receita).
+    """
+    periodo = date_bucket(DailyRevenue.dia, unit)
+    rows = db.session.query(
+        periodo.label('periodo'),
+        DailyRevenue.service_id,
+        Service.nome,
+        func.sum(DailyRevenue.quantidade),
+        func.sum(DailyRevenue.receita)
+    ).join(Service, DailyRevenue.service_id == Service.id).filter(
+        DailyRevenue.dia >= start_day,
+        DailyRevenue.dia <= end_day
+    ).group_by(periodo, DailyRevenue.service_id, Service.nome).order_by(periodo, Service.nome).all()
+
+    return [
+        (str(bucket), service_id, nome, int(quantidade), float(receita))
+        for bucket, service_id, nome, quantidade, receita in rows
+    ]
@@ -1,15 +1,32 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+from flask import (
+    Blueprint, Response, abort, current_app, render_template, request, flash, redirect,
+    stream_with_context, url_for, jsonify
+)
 from flask_login import login_required, current_user
-from app import db, mail
-from app.decorators import admin_required 
+from app import db, availability_cache
+from app.decorators import admin_required, use_replica
 from datetime import datetime, timedelta, date
 from app.models import Service, Appointment, User 
 from sqlalchemy import or_, func, and_
 from sqlalchemy.exc import IntegrityError 
-from flask_mail import Message
-from app.tasks import send_appointment_reminder 
+from sqlalchemy.orm import joinedload
 # 📌 Importação do Formulário de Serviço
 from app.admin.forms import ServiceForm 
+# 📌 E-mails gravados na caixa de saída (enviados pela tarefa drain_email_outbox)
+from app.notifications import dispatch_outbox, queue_appointment_email
+# 📌 Checagem de conflito compartilhada com o fluxo do cliente
+from app.services.availability import (
+    BUSY_STATUSES, RESERVATION_GRANULARITY, bump_schedule_versions, has_conflict, on_reservation_grid,
+    refresh_service_end_times, release_slots, reserve_slots
+)
+from app.admin.analytics import utilization_heatmap
+from app.admin.dashboard import dashboard_kpis, invalidate_dashboard_kpis
+from app.admin.revenue import (
+    COMPLETED_STATUS, record_completion, revenue_by_bucket, revenue_totals, revert_completion
+)
+from app.utils import keyset_paginate
+from app.search import SEARCH_ENGINES, fts_available, search
+from app.exports import EXPORT_FORMATS, appointments_statement, billing_statement, export_chunks
 # Importação necessária para usar o update direto no banco de dados
 from sqlalchemy import text 
 
@@ -19,6 +36,15 @@ from sqlalchemy import text
 # Prefixo /admin para isolar todas as rotas de administração
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Recortes da lista de agendamentos (parâmetro ?escopo=)
+APPOINTMENT_SCOPES = {
+    'proximos': 'Próximos',
+    'historico': 'Histórico',
+    'todos': 'Todos',
+}
+
+VALID_STATUSES = ['Agendado', 'Concluído', 'Cancelado', 'Reagendado']
+
 # Supondo que 'db' é o seu objeto SQLAlchemy global
 # e 'bp' é o seu Blueprint de administração.
 
@@ -33,104 +59,151 @@ def shutdown_session(exception=None):
 # Session.remove()
 
 # ----------------------------------------------------
-# 📌 2. FUNÇÃO AUXILIAR DE ENVIO DE EMAIL (Reusada)
+# 📌 2. ROTAS MIGRADA DE ADMINISTRAÇÃO
 # ----------------------------------------------------
-# Nota: Idealmente, mover para um módulo utils.
-def send_appointment_email(appointment, subject, status):
-    """
-    Envia email de notificação para o usuário sobre o agendamento.
-    (Necessário para notificar sobre alteração de status/reagendamento)
-    """
-    msg = Message(
-        subject,
-        recipients=[appointment.user.email] 
+
+## --- DASHBOARD ADMIN --- 
+@bp.route('/dashboard') 
+@login_required
+@admin_required
+def admin_dashboard():
+    """Renderiza o template do Painel de Administração com os indicadores em cache."""
+    return render_template(
+        'admin_dashboard.html',
+        title='Dashboard Admin',
+        kpis=dashboard_kpis(),
+        refresh_seconds=current_app.config['DASHBOARD_REFRESH_SECONDS']
     )
-    
-    msg.body = f"""
-Olá, {appointment.user.nome}!
 
-Seu agendamento foi {status.lower()} com sucesso.
 
-Detalhes do Serviço:
-- Serviço: {appointment.servico.nome}
-- Data/Hora: {appointment.data_horario.strftime('%d/%m/%Y às %H:%M')}
-- Duração: {appointment.servico.duracao_minutos} minutos
-- Status: {appointment.status}
+## --- INDICADORES DO PAINEL (JSON) ---
+@bp.route('/api/dashboard_kpis')
+@login_required
+@admin_required
+def dashboard_kpis_api():
+    """Indicadores do painel em JSON, consultados pela atualização automática do dashboard."""
+    return jsonify(dashboard_kpis())
 
-Para visualizar ou cancelar seu agendamento, acesse a seção 'Meus Agendamentos' no aplicativo.
 
-Atenciosamente,
-Sua Equipe de Agendamentos.
-"""
-    try:
-        mail.send(msg)
-        print(f"DEBUG: Email enviado com sucesso para {appointment.user.email} (Assunto: {subject})")
-    except Exception as e:
-        print(f"ERRO CRÍTICO AO ENVIAR EMAIL: Erro: {e}")
+## --- MÉTRICAS DO CACHE DE DISPONIBILIDADE ---
+@bp.route('/api/cache_stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Retorna os contadores de acerto/erro do cache de disponibilidade (por worker)."""
+    return jsonify(availability_cache.stats())
 
 
-# ----------------------------------------------------
-# 📌 3. FUNÇÃO AUXILIAR has_conflict (Reusada no Reagendamento)
-# ----------------------------------------------------
-def has_conflict(service_id, desired_start_time, appointment_id_to_exclude=None):
+def appointment_filters(args):
     """
-    Verifica se o horário desejado conflita com agendamentos existentes.
+    Traduz os parâmetros da lista de agendamentos em condições SQL.
+
+    Cada filtro tem um índice de apoio: status + período em
+    idx_appointment_status_periodo, serviço em idx_appointment_servico_data e
+    cliente (prefixo do nome ou do e-mail) em idx_user_nome_busca/idx_user_email,
+    resolvido como subconsulta sobre idx_appointment_user_data, e um cliente
+    exato (user_id, ex: link da lista de usuários) direto nesse índice.
+    Retorna (condições, parâmetros normalizados para repassar aos links).
     """
-    service = Service.query.get(service_id)
-    if not service:
-        return False
-        
-    duration = service.duracao_minutos
-    desired_end_time = desired_start_time + timedelta(minutes=duration)
+    conditions = []
+    applied = {}
+
+    status = args.get('status')
+    if status in VALID_STATUSES:
+        conditions.append(Appointment.status == status)
+        applied['status'] = status
+
+    for param, op in (('de', 'ge'), ('ate', 'lt')):
+        value = args.get(param)
+        if not value:
+            continue
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            continue
+        if op == 'ge':
+            conditions.append(Appointment.data_horario >= day)
+        else:
+            # 'ate' é inclusivo: vai até o fim do dia informado
+            conditions.append(Appointment.data_horario < day + timedelta(days=1))
+        applied[param] = value
 
-    start_of_day = datetime.combine(desired_start_time.date(), datetime.min.time())
-    end_of_day_exclusive = start_of_day + timedelta(days=1) 
+    service_id = args.get('service_id', type=int)
+    if service_id:
+        conditions.append(Appointment.service_id == service_id)
+        applied['service_id'] = service_id
 
-    query = Appointment.query.join(Service).filter(
-        Appointment.data_horario >= start_of_day,
-        Appointment.data_horario < end_of_day_exclusive
-    ).filter(Appointment.status == 'Agendado')
-    
-    if appointment_id_to_exclude:
-        query = query.filter(Appointment.id != appointment_id_to_exclude)
-        
-    all_appointments_on_day = query.all()
-    
-    for existing_appointment in all_appointments_on_day:
-        existing_service_duration = existing_appointment.servico.duracao_minutos 
-        existing_start_time = existing_appointment.data_horario
-        existing_end_time = existing_start_time + timedelta(minutes=existing_service_duration)
+    user_id = args.get('user_id', type=int)
+    if user_id:
+        conditions.append(Appointment.user_id == user_id)
+        applied['user_id'] = user_id
 
-        if desired_start_time < existing_end_time and desired_end_time > existing_start_time:
-            return True 
+    cliente = (args.get('cliente') or '').strip()
+    cliente_condition = User.prefix_condition(cliente)
+    if cliente_condition is not None:
+        matching_users = db.session.query(User.id).filter(cliente_condition)
+        conditions.append(Appointment.user_id.in_(matching_users.scalar_subquery()))
+        applied['cliente'] = cliente
 
-    return False
-    
-
-# ----------------------------------------------------
-# 📌 4. ROTAS MIGRADA DE ADMINISTRAÇÃO
-# ----------------------------------------------------
-
-## --- DASHBOARD ADMIN --- 
-@bp.route('/dashboard') 
-@login_required
-@admin_required
-def admin_dashboard():
-    """Renderiza o template do Painel de Administração."""
-    return render_template('admin_dashboard.html', title='Dashboard Admin')
+    return conditions, applied
 
 
 ## --- GERENCIAR AGENDAMENTOS ---
 @bp.route('/appointments')
 @login_required
 @admin_required
+@use_replica
 def manage_appointments():
-    """Visualiza todos os agendamentos feitos no sistema, incluindo o cliente."""
-    all_appointments = Appointment.query.order_by(Appointment.data_horario.asc()).all()
+    """
+    Visualiza os agendamentos do sistema, incluindo o cliente, uma página por vez.
+
+    Paginação por chave em (data_horario, id) com usuário e serviço carregados
+    no mesmo SELECT (JOIN): o número de consultas por página é constante,
+    independente do tamanho da tabela. Por padrão mostra os próximos agendamentos.
+    Os filtros (status, período, serviço e cliente) entram na mesma consulta.
+    """
+    escopo = request.args.get('escopo', 'proximos')
+    if escopo not in APPOINTMENT_SCOPES:
+        escopo = 'proximos'
+
+    conditions, filters = appointment_filters(request.args)
+
+    start_of_today = datetime.combine(date.today(), datetime.min.time())
+    query = Appointment.query.options(
+        joinedload(Appointment.user), joinedload(Appointment.servico)
+    ).filter(*conditions)
+    if escopo == 'proximos':
+        query = query.filter(Appointment.data_horario >= start_of_today)
+    elif escopo == 'historico':
+        query = query.filter(Appointment.data_horario < start_of_today)
+
+    try:
+        page = keyset_paginate(
+            query,
+            (Appointment.data_horario, Appointment.id),
+            per_page=current_app.config['ADMIN_APPOINTMENTS_PER_PAGE'],
+            after=request.args.get('depois'),
+            before=request.args.get('antes'),
+            # Histórico: do mais recente para o mais antigo
+            descending=(escopo == 'historico')
+        )
+    except ValueError:
+        flash('Link de paginação inválido. Exibindo a primeira página.', 'warning')
+        return redirect(url_for('admin.manage_appointments', escopo=escopo, **filters))
+
+    # Apenas id e nome, para o seletor de serviço do formulário de filtros
+    services = db.session.query(Service.id, Service.nome).order_by(Service.nome).all()
     
     return render_template('services/manage_appointments.html', 
                            title='Gerenciar Agendamentos', 
-                           appointments=all_appointments,
+                           appointments=page.items,
+                           next_cursor=page.next_cursor,
+                           prev_cursor=page.prev_cursor,
+                           escopo=escopo,
+                           scopes=APPOINTMENT_SCOPES,
+                           filters=filters,
+                           statuses=VALID_STATUSES,
+                           services=services,
                            now=datetime.now)
 
 
@@ -213,18 +286,34 @@ def edit_service(service_id):
             return render_template('services/edit_service.html', title=f'Editar Serviço: {service.nome}', form=form, service=service)
         
         try:
+            duration_changed = service.duracao_minutos != form.duracao_minutos.data
+
             # Atualiza o objeto service com os dados validados do formulário
             service.nome = form.nome.data
             service.descricao = form.descricao.data
             service.preco = form.preco.data
             service.duracao_minutos = form.duracao_minutos.data
             service.is_active = form.is_active.data 
+
+            # Mudança de duração: recalcula o end_time dos agendamentos futuros deste serviço
+            if duration_changed:
+                refresh_service_end_times(service)
+                bump_schedule_versions(include_global=True)
             
             db.session.commit()
+
+            # A duração entra no cálculo de todos os dias (e dos intervalos ocupados)
+            if duration_changed:
+                availability_cache.clear()
             
             flash(f'Serviço "{service.nome}" atualizado com sucesso!', 'success')
             return redirect(url_for('admin.list_services'))
             
+        except IntegrityError:
+            # A nova duração faria agendamentos futuros se sobreporem
+            db.session.rollback()
+            flash('A nova duração causaria conflito entre agendamentos futuros deste serviço.', 'danger')
+            return redirect(url_for('admin.edit_service', service_id=service.id))
         except Exception as e:
             db.session.rollback()
             print(f"Erro ao editar serviço: {e}")
@@ -311,13 +400,13 @@ def update_appointment_status(appointment_id):
     
     appointment = Appointment.query.get_or_404(appointment_id)
     new_status = request.form.get('status') 
-    valid_statuses = ['Agendado', 'Concluído', 'Cancelado', 'Reagendado']
     
-    if new_status not in valid_statuses:
+    if new_status not in VALID_STATUSES:
         flash('Status inválido fornecido.', 'danger')
         return redirect(url_for('admin.manage_appointments'))
 
     old_status = appointment.status 
+    old_day = appointment.data_horario.date()
 
     if old_status == new_status:
         flash('Status inalterado.', 'info')
@@ -331,6 +420,7 @@ def update_appointment_status(appointment_id):
         if appointment.data_horario > now:
             # Altera a data agendada para o momento da conclusão para fins de faturamento
             appointment.data_horario = now
+            appointment.refresh_end_time()
             
             flash_message_override = (
                 f"Status do Agendamento ID {appointment_id} alterado para **Concluído**. "
@@ -339,20 +429,40 @@ def update_appointment_status(appointment_id):
             
     try:
         appointment.status = new_status
-        db.session.commit() 
 
-        # Envio de email de notificação
-        send_appointment_email(
+        # Mantém as reservas de horário em sincronia com o status
+        if old_status in BUSY_STATUSES and new_status not in BUSY_STATUSES:
+            release_slots(appointment)
+        elif old_status not in BUSY_STATUSES and new_status in BUSY_STATUSES:
+            reserve_slots(appointment)
+
+        # Mantém o faturamento diário consolidado em sincronia (entrada/saída de 'Concluído')
+        if new_status == COMPLETED_STATUS:
+            record_completion(appointment)
+        elif old_status == COMPLETED_STATUS:
+            revert_completion(appointment)
+
+        bump_schedule_versions(old_day, appointment.data_horario.date())
+
+        # Email de notificação: gravado na caixa de saída, no mesmo commit
+        queue_appointment_email(
             appointment=appointment, 
             subject=f"ATUALIZAÇÃO DE STATUS: Agendamento ID {appointment_id}", 
             status=new_status
         )
+        db.session.commit() 
+        availability_cache.invalidate_days(old_day, appointment.data_horario.date())
+        invalidate_dashboard_kpis()
+        dispatch_outbox()
         
         if flash_message_override:
             flash(flash_message_override, 'warning')
         else:
             flash(f'Status do agendamento atualizado para "{new_status}" e cliente notificado.', 'success')
         
+    except IntegrityError:
+        db.session.rollback()
+        flash('ERRO: O horário deste agendamento já foi ocupado por outro agendamento.', 'danger')
     except Exception as e:
         db.session.rollback()
         print(f"ERRO DE DB ao atualizar status: {e}")
@@ -381,6 +491,10 @@ def reschedule_appointment(appointment_id):
         flash('Formato de data e hora inválido.', 'danger')
         return redirect(url_for('admin.manage_appointments'))
 
+    if not on_reservation_grid(new_datetime):
+        flash(f'Escolha um horário em intervalos de {RESERVATION_GRANULARITY} minutos.', 'danger')
+        return redirect(url_for('admin.manage_appointments'))
+
     # 1. Validação de Data Futura
     if new_datetime < datetime.now():
         flash('A data e hora do reagendamento não podem ser no passado.', 'danger')
@@ -393,29 +507,40 @@ def reschedule_appointment(appointment_id):
 
 
     # 3. Atualiza e salva no banco de dados
+    old_day = appointment.data_horario.date()
     try:
+        # Um concluído reagendado sai do faturamento consolidado (na data antiga)
+        if appointment.status == COMPLETED_STATUS:
+            revert_completion(appointment)
+
+        # Troca atômica das reservas: libera as células antigas e disputa as novas
+        release_slots(appointment)
+
         appointment.data_horario = new_datetime
+        appointment.refresh_end_time()
         appointment.status = 'Reagendado' 
+        # O lembrete volta a ficar pendente para o novo horário (varredura periódica)
+        appointment.reset_reminder(current_app.config['REMINDER_LEAD_HOURS'])
+
+        reserve_slots(appointment)
+        bump_schedule_versions(old_day, new_datetime.date())
         
-        db.session.commit()
-        
-        # Envio de Email de reagendamento
-        send_appointment_email(
+        # Email de reagendamento: gravado na caixa de saída, no mesmo commit
+        queue_appointment_email(
             appointment=appointment, 
             subject="REAGENDAMENTO de Serviço", 
             status='Reagendado'
         )
-        
-        # Reagendar o lembrete Celery, se necessário
-        reminder_time = new_datetime - timedelta(hours=24)
-        if reminder_time > datetime.now():
-            countdown_seconds = (reminder_time - datetime.now()).total_seconds()
-            send_appointment_reminder.apply_async(
-                args=[appointment.id], 
-                countdown=countdown_seconds
-            )
+        db.session.commit()
+        availability_cache.invalidate_days(old_day, new_datetime.date())
+        invalidate_dashboard_kpis()
+        dispatch_outbox()
         
         flash(f'Agendamento #{appointment.id} reagendado com sucesso para {new_datetime.strftime("%d/%m/%Y às %H:%M")} e cliente notificado.', 'success')
+    except IntegrityError:
+        # Outra requisição concorrente reservou o novo horário primeiro
+        db.session.rollback()
+        flash('ERRO: O novo horário acabou de ser reservado por outro agendamento. Selecione outro slot.', 'danger')
     except Exception as e:
         db.session.rollback()
         print(f"ERRO DE REAGENDAMENTO: {e}") 
@@ -424,15 +549,13 @@ def reschedule_appointment(appointment_id):
     return redirect(url_for('admin.manage_appointments'))
 
 
-## --- Rota para o Relatório de Faturamento ---
-@bp.route('/reports/billing', methods=['GET'])
-@login_required
-@admin_required
-def billing_report():
-    """Calcula e exibe o faturamento total com base nos agendamentos concluídos."""
-    
-    start_date_str = request.args.get('start_date')
-    end_date_str = request.args.get('end_date')
+def billing_period(args):
+    """
+    Período do relatório de faturamento a partir de start_date/end_date
+    (padrão: mês atual). Levanta ValueError se as datas forem inválidas.
+    """
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
     
     # --- 1. Determinação do Período (Padrão: Mês Atual) ---
     today = date.today()
@@ -449,37 +572,252 @@ def billing_report():
             
     # --- Se datas FORAM fornecidas ---
     else:
-        try:
-            start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
-            end_date_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
-            
-            # Ajusta para incluir o dia inteiro (até 23:59:59)
-            start_date_filter = start_date_obj
-            end_date_filter = datetime.combine(end_date_obj.date(), datetime.max.time())
-            
-        except ValueError:
-            flash('Formato de data inválido.', 'danger')
-            return redirect(url_for('admin.billing_report'))
+        start_date_obj = datetime.strptime(start_date_str, '%Y-%m-%d')
+        end_date_obj = datetime.strptime(end_date_str, '%Y-%m-%d')
+        
+        # Ajusta para incluir o dia inteiro (até 23:59:59)
+        start_date_filter = start_date_obj
+        end_date_filter = datetime.combine(end_date_obj.date(), datetime.max.time())
+
+    return start_date_filter, end_date_filter
+
+
+## --- Rota para o Relatório de Faturamento ---
+@bp.route('/reports/billing', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def billing_report():
+    """Calcula e exibe o faturamento total com base nos agendamentos concluídos."""
+    
+    try:
+        start_date_filter, end_date_filter = billing_period(request.args)
+    except ValueError:
+        flash('Formato de data inválido.', 'danger')
+        return redirect(url_for('admin.billing_report'))
             
-    # 2. Construção da Query Base
-    base_filter = [Appointment.status == 'Concluído']
-    base_filter.append(Appointment.data_horario >= start_date_filter)
-    base_filter.append(Appointment.data_horario <= end_date_filter)
-
-    # 3. Execução do Cálculo SQL
-    total_revenue_query = db.session.query(func.sum(Service.preco)).select_from(Appointment).join(Service).filter(*base_filter)
-    total_revenue = total_revenue_query.scalar() or 0.00
+    # 2. Totais lidos do consolidado diário (daily_revenue), sem varrer os agendamentos
+    total_revenue, total_count = revenue_totals(start_date_filter.date(), end_date_filter.date())
+
+    # 3. Detalhes: as mesmas colunas da exportação (com o histórico arquivado, se o período o alcançar)
+    billing_rows = billing_statement(start_date_filter, end_date_filter).order_by(None).subquery()
     
-    # 4. Busca dos Agendamentos Detalhados
-    appointments_query = Appointment.query.join(Service).filter(*base_filter).order_by(Appointment.data_horario.desc()) 
-    completed_appointments = appointments_query.all()
+    # 4. Busca dos Agendamentos Detalhados: uma página por vez (paginação por chave)
+    try:
+        page = keyset_paginate(
+            db.session.query(billing_rows),
+            (billing_rows.c.data_horario, billing_rows.c.id),
+            per_page=current_app.config['ADMIN_APPOINTMENTS_PER_PAGE'],
+            after=request.args.get('depois'),
+            before=request.args.get('antes'),
+            descending=True
+        )
+    except ValueError:
+        flash('Link de paginação inválido. Exibindo a primeira página.', 'warning')
+        return redirect(url_for('admin.billing_report',
+                                start_date=start_date_filter.strftime('%Y-%m-%d'),
+                                end_date=end_date_filter.strftime('%Y-%m-%d')))
     
     # 5. Retorno
     return render_template('services/billing_report.html', 
                            title='Relatório de Faturamento',
                            total_revenue=total_revenue,
-                           appointments=completed_appointments,
+                           total_count=total_count,
+                           appointments=page.items,
+                           next_cursor=page.next_cursor,
+                           prev_cursor=page.prev_cursor,
                            start_date=start_date_filter.strftime('%Y-%m-%d'),
                            end_date=end_date_filter.strftime('%Y-%m-%d'),
                            datetime=datetime 
-                           )
\ No newline at end of file
+                           )
+
+
+# Agrupamentos aceitos pela API de análise (?agrupamento=) -> unidade do date_bucket
+BILLING_BUCKETS = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+
+
+## --- API de Análise do Faturamento (JSON para gráficos) ---
+@bp.route('/reports/billing/analytics', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def billing_analytics():
+    """
+    Receita e quantidade de concluídos por serviço e por período (dia, semana
+    ou mês), no mesmo intervalo do relatório. O agrupamento é feito no banco;
+    o servidor só serializa as linhas já agregadas.
+    """
+    agrupamento = request.args.get('agrupamento', 'mes')
+    if agrupamento not in BILLING_BUCKETS:
+        return jsonify({'error': f"Agrupamento inválido. Use: {', '.join(BILLING_BUCKETS)}."}), 400
+
+    try:
+        start, end = billing_period(request.args)
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido. Use AAAA-MM-DD.'}), 400
+
+    rows = revenue_by_bucket(start.date(), end.date(), BILLING_BUCKETS[agrupamento])
+
+    services = {}
+    for _, service_id, nome, quantidade, receita in rows:
+        totals = services.setdefault(service_id, {'id': service_id, 'nome': nome, 'quantidade': 0, 'receita': 0.0})
+        totals['quantidade'] += quantidade
+        totals['receita'] = round(totals['receita'] + receita, 2)
+
+    return jsonify({
+        'inicio': start.strftime('%Y-%m-%d'),
+        'fim': end.strftime('%Y-%m-%d'),
+        'agrupamento': agrupamento,
+        'series': [
+            {'periodo': periodo, 'service_id': service_id, 'servico': nome,
+             'quantidade': quantidade, 'receita': round(receita, 2)}
+            for periodo, service_id, nome, quantidade, receita in rows
+        ],
+        'servicos': list(services.values()),
+        'total': {
+            'quantidade': sum(item['quantidade'] for item in services.values()),
+            'receita': round(sum(item['receita'] for item in services.values()), 2),
+        },
+    })
+
+
+# ----------------------------------------------------
+# 📌 BUSCA TEXTUAL (clientes, serviços e agendamentos)
+# ----------------------------------------------------
+SEARCH_MAX_RESULTS = 100
+
+
+## --- API de Busca (JSON) ---
+@bp.route('/search', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def search_api():
+    """
+    Busca por palavras (ou prefixos) em clientes, serviços e agendamentos
+    futuros, ordenada por relevância quando o índice FTS5 está disponível.
+    'motor=like' força a busca sem índice (comparação/diagnóstico).
+    """
+    consulta = (request.args.get('q') or '').strip()
+    motor = request.args.get('motor')
+    if motor is not None and motor not in SEARCH_ENGINES:
+        return jsonify({'error': f"Motor inválido. Use: {', '.join(SEARCH_ENGINES)}."}), 400
+    if motor == 'fts' and not fts_available():
+        return jsonify({'error': 'Índice de busca FTS5 indisponível neste banco.'}), 400
+
+    limite = min(max(request.args.get('limite', 20, type=int), 1), SEARCH_MAX_RESULTS)
+    motor, resultados = search(consulta, limit=limite, engine=motor)
+    return jsonify({'consulta': consulta, 'motor': motor, 'resultados': resultados})
+
+
+# ----------------------------------------------------
+# 📌 MAPA DE OCUPAÇÃO (dia da semana × faixa de 30 min)
+# ----------------------------------------------------
+OCCUPANCY_DEFAULT_WEEKS = 12
+
+
+def occupancy_period(args):
+    """
+    Período do mapa de ocupação a partir de start_date/end_date (padrão: as
+    últimas OCCUPANCY_DEFAULT_WEEKS semanas até hoje). Levanta ValueError se
+    as datas forem inválidas ou estiverem invertidas.
+    """
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
+
+    if not start_date_str or not end_date_str:
+        end_day = date.today()
+        start_day = end_day - timedelta(weeks=OCCUPANCY_DEFAULT_WEEKS) + timedelta(days=1)
+    else:
+        start_day = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_day = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        if end_day < start_day:
+            raise ValueError('Data final anterior à inicial.')
+
+    return datetime.combine(start_day, datetime.min.time()), datetime.combine(end_day, datetime.max.time())
+
+
+## --- Página do Mapa de Ocupação ---
+@bp.route('/reports/occupancy', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def occupancy_report():
+    """Exibe o mapa de calor de utilização da agenda; os dados vêm de occupancy_heatmap."""
+    try:
+        start, end = occupancy_period(request.args)
+    except ValueError:
+        flash('Período inválido.', 'danger')
+        return redirect(url_for('admin.occupancy_report'))
+
+    return render_template(
+        'services/occupancy_report.html',
+        title='Mapa de Ocupação',
+        start_date=start.strftime('%Y-%m-%d'),
+        end_date=end.strftime('%Y-%m-%d')
+    )
+
+
+## --- API do Mapa de Ocupação (JSON) ---
+@bp.route('/reports/occupancy/heatmap', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def occupancy_heatmap():
+    """Matriz de utilização (%) por dia da semana e faixa do expediente no período."""
+    try:
+        start, end = occupancy_period(request.args)
+    except ValueError:
+        return jsonify({'error': 'Período inválido. Use AAAA-MM-DD, com a data final após a inicial.'}), 400
+
+    heatmap = utilization_heatmap(start, end)
+    heatmap.update({'inicio': start.strftime('%Y-%m-%d'), 'fim': end.strftime('%Y-%m-%d')})
+    return jsonify(heatmap)
+
+
+# ----------------------------------------------------
+# 📌 EXPORTAÇÃO EM STREAMING (CSV / NDJSON)
+# ----------------------------------------------------
+def export_response(stmt, fmt, filename):
+    """Resposta em streaming: cada lote lido do banco é enviado antes do próximo."""
+    mimetype, _ = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(export_chunks(stmt, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
+## --- Exportação dos Agendamentos (mesmos filtros da lista) ---
+@bp.route('/export/appointments.<fmt>', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def export_appointments(fmt):
+    """Exporta os agendamentos que atendem aos filtros de manage_appointments."""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    conditions, applied = appointment_filters(request.args)
+    start = datetime.strptime(applied['de'], '%Y-%m-%d') if 'de' in applied else None
+    return export_response(appointments_statement(conditions, start), fmt, 'agendamentos')
+
+
+## --- Exportação do Faturamento (mesmo período do relatório) ---
+@bp.route('/export/billing.<fmt>', methods=['GET'])
+@login_required
+@admin_required
+@use_replica
+def export_billing(fmt):
+    """Exporta os agendamentos concluídos do período do relatório de faturamento."""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    try:
+        start, end = billing_period(request.args)
+    except ValueError:
+        flash('Formato de data inválido.', 'danger')
+        return redirect(url_for('admin.billing_report'))
+
+    filename = f"faturamento_{start.strftime('%Y-%m-%d')}_{end.strftime('%Y-%m-%d')}"
+    return export_response(billing_statement(start, end), fmt, filename)
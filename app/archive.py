@@ -0,0 +1,124 @@
+# app/archive.py
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Table, delete, func, insert, literal, select, union_all
+from sqlalchemy.sql.visitors import replacement_traverse
+from app import db
+from app.admin.revenue import COMPLETED_STATUS
+from app.models import Appointment, AppointmentArchive, SlotReservation
+
+# ----------------------------------------------------
+# 📌 ARQUIVAMENTO DO HISTÓRICO (tabela quente / tabela fria)
+# ----------------------------------------------------
+# Concluídos e cancelados mais antigos que ARCHIVE_AFTER_DAYS saem de
+# 'appointment' para 'appointment_archive' em lotes de ARCHIVE_BATCH_SIZE,
+# cada lote na sua própria transação curta (INSERT ... SELECT + DELETE por
+# id): os índices da agenda ficam do tamanho do movimento recente e a
+# escrita nunca segura a tabela quente por muito tempo.
+#
+# As leituras de histórico (faturamento, exportações, mapa de ocupação)
+# passam por with_archive(): enquanto o período pedido não alcança o
+# agendamento arquivado mais recente, a consulta continua só na tabela
+# quente; quando alcança, a mesma consulta é repetida sobre o arquivo
+# (colunas trocadas uma a uma) e as duas partes são unidas com UNION ALL.
+
+ARCHIVED_STATUSES = (COMPLETED_STATUS, 'Cancelado')
+
+# Colunas copiadas da tabela quente (as demais do arquivo são próprias dele)
+_COPIED_COLUMNS = [column.name for column in AppointmentArchive.__table__.c if column.name != 'arquivado_em']
+
+
+def archive_horizon():
+    """data_horario do agendamento arquivado mais recente (None se o arquivo está vazio)."""
+    return db.session.query(func.max(AppointmentArchive.data_horario)).scalar()
+
+
+def reaches_archive(start):
+    """True se um período que começa em 'start' (None = sem limite) inclui histórico arquivado."""
+    horizon = archive_horizon()
+    return horizon is not None and (start is None or start <= horizon)
+
+
+def for_archive(stmt):
+    """A mesma consulta, lendo de appointment_archive no lugar de appointment."""
+    archive = AppointmentArchive.__table__
+
+    def replace(element):
+        if isinstance(element, Table) and element.name == Appointment.__tablename__:
+            return archive
+        if (isinstance(element, Column) and isinstance(element.table, Table)
+                and element.table.name == Appointment.__tablename__):
+            return archive.c[element.name]
+        return None
+
+    return replacement_traverse(stmt, {}, replace)
+
+
+def union_archive(stmt, order_by=()):
+    """
+    UNION ALL da consulta (sem ORDER BY) com a sua versão sobre o arquivo.
+    order_by: nomes das colunas selecionadas para ordenar o resultado unido.
+    """
+    combined = union_all(stmt, for_archive(stmt))
+    if order_by:
+        combined = combined.order_by(*[combined.selected_columns[name] for name in order_by])
+    return combined
+
+
+def with_archive(stmt, start=None, order_by=()):
+    """union_archive() se o período que começa em 'start' alcança o arquivo; senão a própria consulta."""
+    if not reaches_archive(start):
+        return stmt
+    return union_archive(stmt, order_by)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move até batch_size agendamentos concluídos/cancelados anteriores a
+    cutoff em uma transação. Retorna quantos foram movidos.
+    """
+    # O maior id nunca é arquivado: o SQLite (sem AUTOINCREMENT) reutilizaria
+    # o id para o próximo agendamento, colidindo com o do arquivo
+    last_id = select(func.max(Appointment.id)).scalar_subquery()
+    ids = db.session.scalars(
+        select(Appointment.id).where(
+            Appointment.status.in_(ARCHIVED_STATUSES),
+            Appointment.data_horario < cutoff,
+            Appointment.id < last_id
+        ).limit(batch_size)
+    ).all()
+    if not ids:
+        return 0
+
+    hot = Appointment.__table__
+    db.session.execute(
+        insert(AppointmentArchive).from_select(
+            _COPIED_COLUMNS + ['arquivado_em'],
+            select(*[hot.c[name] for name in _COPIED_COLUMNS], literal(datetime.now(), DateTime))
+            .where(hot.c.id.in_(ids))
+        )
+    )
+    db.session.execute(delete(SlotReservation).where(SlotReservation.appointment_id.in_(ids)))
+    db.session.execute(delete(Appointment).where(Appointment.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_appointments(older_than_days, batch_size, pause=0.0, now=None, progress=None):
+    """
+    Arquiva, lote a lote, os concluídos/cancelados com mais de older_than_days
+    dias. pause: espera (s) entre lotes, dando vez às escritas da agenda.
+    progress(total): chamado após cada lote. Retorna o total movido.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if progress and moved:
+            progress(total)
+        if moved < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
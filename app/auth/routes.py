@@ -1,10 +1,12 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import current_app, render_template, redirect, url_for, flash, request
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from app.auth import bp 
-from app.models import User
+from app.models import Appointment, User
 from app import db
-from app.decorators import admin_required 
+from app.utils import keyset_paginate, normalize_email
+from sqlalchemy import func
+from app.decorators import admin_required, use_replica
 
 # Se 'bp' não estiver definido no topo (depende da sua estrutura de __init__), 
 # você pode precisar desta linha:
@@ -18,7 +20,7 @@ def register():
 
     if request.method == 'POST':
         nome = request.form.get('nome')
-        email = request.form.get('email')
+        email = normalize_email(request.form.get('email'))
         password = request.form.get('password')
         confirm_password = request.form.get('confirm_password') 
         
@@ -60,7 +62,7 @@ def login():
         return redirect(url_for('main.index'))
 
     if request.method == 'POST':
-        email = request.form.get('email')
+        email = normalize_email(request.form.get('email'))
         password = request.form.get('password')
         
         user = User.query.filter_by(email=email).first()
@@ -97,12 +99,52 @@ def logout():
 @bp.route('/manage_users')
 @login_required
 @admin_required
+@use_replica
 def manage_users():
-    """Visualiza e gerencia todos os usuários (Admin)."""
-    all_users = User.query.all()
+    """
+    Visualiza e gerencia os usuários (Admin), uma página por vez.
+
+    Só as colunas exibidas são lidas (sem objetos ORM), em ordem de nome com
+    paginação por chave em (nome_busca, id) sobre idx_user_nome_busca. A
+    busca 'q' é um prefixo do nome (sem acentos) ou do e-mail (idx_user_email).
+    O total de agendamentos de cada usuário da página vem de uma única
+    consulta agregada.
+    """
+    busca = (request.args.get('q') or '').strip()
+
+    query = db.session.query(User.id, User.nome, User.email, User.is_admin, User.nome_busca)
+    search_condition = User.prefix_condition(busca)
+    if search_condition is not None:
+        query = query.filter(search_condition)
+
+    try:
+        page = keyset_paginate(
+            query,
+            (User.nome_busca, User.id),
+            per_page=current_app.config['ADMIN_USERS_PER_PAGE'],
+            after=request.args.get('depois'),
+            before=request.args.get('antes')
+        )
+    except ValueError:
+        flash('Link de paginação inválido. Exibindo a primeira página.', 'warning')
+        return redirect(url_for('auth.manage_users', q=busca or None))
+
+    # Agendamentos por usuário da página: um GROUP BY sobre idx_appointment_user_data
+    user_ids = [user.id for user in page.items]
+    appointment_counts = dict(
+        db.session.query(Appointment.user_id, func.count(Appointment.id))
+        .filter(Appointment.user_id.in_(user_ids))
+        .group_by(Appointment.user_id)
+        .all()
+    ) if user_ids else {}
+
     return render_template('auth/manage_users.html', 
                             title='Gerenciar Usuários', 
-                            users=all_users)
+                            users=page.items,
+                            appointment_counts=appointment_counts,
+                            busca=busca,
+                            next_cursor=page.next_cursor,
+                            prev_cursor=page.prev_cursor)
     
 @bp.route('/edit_user/<int:user_id>', methods=['GET', 'POST'])
 @login_required
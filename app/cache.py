@@ -0,0 +1,287 @@
+# app/cache.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# ----------------------------------------------------
+# 📌 BACKENDS DE CACHE
+# ----------------------------------------------------
+# As entradas são agrupadas (ex: por dia) para permitir invalidar um grupo
+# inteiro de uma vez: um agendamento em um dia muda a disponibilidade de
+# todos os serviços naquele dia.
+
+
+class MemoryCacheBackend:
+    """Cache em memória do processo com despejo LRU e expiração por TTL."""
+
+    def __init__(self, max_entries=2048, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (grupo, campo) -> (expira_em, valor)
+        self._groups = {}  # grupo -> {campos}
+        self._lock = threading.Lock()
+
+    def get(self, group, field):
+        key = (group, field)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, group, field, value):
+        key = (group, field)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._groups.setdefault(group, set()).add(field)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def delete_group(self, group):
+        with self._lock:
+            for field in self._groups.pop(group, ()):
+                self._entries.pop((group, field), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        fields = self._groups.get(key[0])
+        if fields is not None:
+            fields.discard(key[1])
+            if not fields:
+                del self._groups[key[0]]
+
+
+class RedisCacheBackend:
+    """
+    Cache compartilhado entre workers em um servidor compatível com Redis.
+    Cada grupo é um hash com TTL definido na primeira escrita; o despejo LRU
+    fica a cargo do servidor (maxmemory-policy allkeys-lru). Aceita qualquer
+    cliente com a API do redis-py (ex: um fake local nos testes).
+    """
+
+    def __init__(self, client, ttl=300, prefix='agendapro:disponibilidade:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, group, field):
+        raw = self.client.hget(self.prefix + str(group), str(field))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, group, field, value):
+        key = self.prefix + str(group)
+        pipe = self.client.pipeline()
+        pipe.hset(key, str(field), json.dumps(value))
+        pipe.expire(key, self.ttl, nx=True)
+        pipe.execute()
+
+    def delete_group(self, group):
+        self.client.delete(self.prefix + str(group))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCacheBackend:
+    """Backend que nunca guarda nada (desliga o cache sem mudar as rotas)."""
+
+    def get(self, group, field):
+        return None
+
+    def set(self, group, field, value):
+        pass
+
+    def delete_group(self, group):
+        pass
+
+    def clear(self):
+        pass
+
+
+# ----------------------------------------------------
+# 📌 COALESCÊNCIA DE REQUISIÇÕES (Single-flight)
+# ----------------------------------------------------
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Garante que, dentro de um worker, chamadas concorrentes com a mesma chave
+    executem a função uma única vez: a primeira thread calcula e as demais
+    aguardam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+
+# ----------------------------------------------------
+# 📌 VALOR ÚNICO COM TTL (ex: indicadores do painel)
+# ----------------------------------------------------
+class CachedValue:
+    """
+    Guarda um único valor calculado sob demanda até expirar o TTL ou até
+    invalidate() ser chamado. Cálculos concorrentes são coalescidos e um
+    resultado calculado antes de uma invalidação nunca é guardado (o contador
+    de geração muda), então uma escrita não é mascarada por um valor antigo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._value = None
+        self._expires_at = 0.0
+        self._generation = 0
+
+    def get(self, compute, ttl):
+        with self._lock:
+            if self._value is not None and self._expires_at > time.monotonic():
+                return self._value
+            generation = self._generation
+
+        def refresh():
+            value = compute()
+            with self._lock:
+                if generation == self._generation:
+                    self._value = value
+                    self._expires_at = time.monotonic() + ttl
+            return value
+
+        return self._flight.do(generation, refresh)
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._generation += 1
+
+
+# ----------------------------------------------------
+# 📌 CACHE DE DISPONIBILIDADE (Extensão Flask)
+# ----------------------------------------------------
+class AvailabilityCache:
+    """
+    Cache dos slots livres por (serviço, dia), com contadores de acerto/erro.
+
+    Guarda a lista do dia inteiro (sem o filtro de horários passados), então a
+    mesma entrada serve durante todo o dia. As rotas que alteram agendamentos
+    invalidam os dias afetados após o commit.
+
+    Cada entrada leva as versões da agenda (dia, global) lidas junto com os
+    agendamentos que a geraram, e só é devolvida a quem pede exatamente essas
+    versões: a invalidação de um worker não alcança o cache em memória dos
+    outros, e um cálculo iniciado antes de um commit pode gravar depois dele.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('AVAILABILITY_CACHE_BACKEND', 'memory')
+        ttl = app.config.get('AVAILABILITY_CACHE_TTL', 300)
+
+        if backend == 'redis':
+            import redis
+            client = redis.Redis.from_url(app.config['AVAILABILITY_CACHE_REDIS_URL'])
+            self.backend = RedisCacheBackend(client, ttl=ttl)
+        elif backend == 'memory':
+            self.backend = MemoryCacheBackend(
+                max_entries=app.config.get('AVAILABILITY_CACHE_MAX_ENTRIES', 2048), ttl=ttl
+            )
+        else:
+            self.backend = NullCacheBackend()
+
+        app.extensions['availability_cache'] = self
+
+    def use_backend(self, backend):
+        """Troca o backend em tempo de execução (ex: fake de Redis nos testes)."""
+        self.backend = backend
+        self.reset_stats()
+
+    def get(self, service_id, day, version):
+        """Slots do (serviço, dia) calculados na versão 'version', ou None."""
+        entry = self.backend.get(day.isoformat(), service_id)
+        slots = entry['slots'] if entry is not None and entry['versao'] == list(version) else None
+        with self._lock:
+            if slots is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return slots
+
+    def set(self, service_id, day, slots, version):
+        self.backend.set(day.isoformat(), service_id, {'versao': list(version), 'slots': slots})
+
+    def invalidate_days(self, *days):
+        """Remove as entradas de todos os serviços nos dias informados."""
+        for day in set(days):
+            self.backend.delete_group(day.isoformat())
+
+    def clear(self):
+        self.backend.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            }
@@ -2,6 +2,7 @@ import click
 from flask.cli import with_appcontext
 from app import db
 from app.models import User # Supondo que seu modelo User está em app.models
+from app.utils import normalize_email
 
 @click.command('create-admin')
 @click.argument('nome')
@@ -11,7 +12,8 @@ from app.models import User # Supondo que seu modelo User está em app.models
 def create_admin_command(nome, email, senha):
     """Cria um novo usuário e o define como administrador (is_admin=True)."""
     
-    # Verifica se o usuário já existe
+    # Verifica se o usuário já existe (e-mails são gravados em minúsculas)
+    email = normalize_email(email)
     if User.query.filter_by(email=email).first():
         click.echo(f"❌ Erro: O email '{email}' já está cadastrado.")
         return
@@ -34,5 +36,136 @@ def create_admin_command(nome, email, senha):
         db.session.rollback()
         click.echo(f"🛑 Erro ao criar administrador: {e}")
 
+
+
+@click.command('export-appointments')
+@click.option('--formato', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True,
+              help='Formato do arquivo gerado.')
+@click.option('--saida', type=click.File('w', encoding='utf-8'), default='-',
+              help='Arquivo de destino (padrão: saída padrão).')
+@click.option('--faturamento', is_flag=True,
+              help='Exporta só os concluídos do período (mesmos dados do relatório de faturamento).')
+@click.option('--status', help='Filtra por status (ex: Agendado).')
+@click.option('--service-id', type=int, help='Filtra por serviço.')
+@click.option('--cliente', help='Prefixo do nome ou e-mail do cliente.')
+@click.option('--de', help='Data inicial (AAAA-MM-DD).')
+@click.option('--ate', help='Data final, inclusiva (AAAA-MM-DD).')
+@with_appcontext
+def export_appointments_command(formato, saida, faturamento, status, service_id, cliente, de, ate):
+    """Exporta agendamentos (ou o faturamento) em CSV/NDJSON, em streaming."""
+    from datetime import datetime
+    from werkzeug.datastructures import MultiDict
+    from app.admin.routes import appointment_filters, billing_period
+    from app.exports import appointments_statement, billing_statement, export_chunks
+
+    if faturamento:
+        try:
+            start, end = billing_period({'start_date': de, 'end_date': ate})
+        except ValueError:
+            raise click.BadParameter('Use datas no formato AAAA-MM-DD.', param_hint='--de/--ate')
+        stmt = billing_statement(start, end)
+    else:
+        args = MultiDict({
+            key: value for key, value in
+            {'status': status, 'service_id': service_id, 'cliente': cliente, 'de': de, 'ate': ate}.items()
+            if value is not None
+        })
+        conditions, applied = appointment_filters(args)
+        start = datetime.strptime(applied['de'], '%Y-%m-%d') if 'de' in applied else None
+        stmt = appointments_statement(conditions, start)
+
+    for chunk in export_chunks(stmt, formato):
+        saida.write(chunk)
+
+
+@click.command('rebuild-daily-revenue')
+@with_appcontext
+def rebuild_daily_revenue_command():
+    """Reconstrói o faturamento diário consolidado (daily_revenue) a partir dos agendamentos."""
+    from app.admin.revenue import rebuild_daily_revenue
+
+    try:
+        rows = rebuild_daily_revenue()
+        click.echo(f"✅ Faturamento diário reconstruído: {rows} linhas (dia x serviço).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"🛑 Erro ao reconstruir o faturamento diário: {e}")
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Cria (se preciso) e recarrega o índice de busca FTS5 (somente SQLite)."""
+    from app.search import create_search_index
+
+    if db.session.get_bind().dialect.name != 'sqlite':
+        click.echo("❌ Erro: O índice FTS5 só existe no SQLite; os demais bancos usam a busca por LIKE.")
+        return
+
+    try:
+        create_search_index()
+        click.echo("✅ Índice de busca reconstruído.")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"🛑 Erro ao reconstruir o índice de busca: {e}")
+
+
+@click.command('archive-appointments')
+@click.option('--older-than', type=click.IntRange(min=1), default=None,
+              help='Idade mínima em dias (padrão: ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=click.IntRange(min=1), default=None,
+              help='Agendamentos por transação (padrão: ARCHIVE_BATCH_SIZE).')
+@click.option('--pausa', type=float, default=0.0, show_default=True,
+              help='Espera em segundos entre os lotes.')
+@with_appcontext
+def archive_appointments_command(older_than, batch_size, pausa):
+    """Move concluídos e cancelados antigos para appointment_archive, em lotes."""
+    from flask import current_app
+    from app.archive import archive_appointments
+
+    older_than = older_than or current_app.config['ARCHIVE_AFTER_DAYS']
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+
+    try:
+        total = archive_appointments(
+            older_than, batch_size, pause=pausa,
+            progress=lambda moved: click.echo(f"   ... {moved} arquivados")
+        )
+        click.echo(f"✅ {total} agendamentos com mais de {older_than} dias arquivados.")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"🛑 Erro ao arquivar agendamentos: {e}")
+
+
+@click.command('check-query-plans')
+@click.option('--verbose', '-v', is_flag=True, help='Mostra o plano de todas as consultas, não só das que falharam.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """Roda EXPLAIN QUERY PLAN nas consultas críticas e falha se alguma varrer a tabela inteira."""
+    from app.query_plans import check_query_plans
+
+    if db.session.get_bind().dialect.name != 'sqlite':
+        click.echo("❌ Erro: A verificação de planos usa o EXPLAIN QUERY PLAN do SQLite.")
+        raise SystemExit(1)
+
+    failures = 0
+    for name, plan, scans in check_query_plans():
+        if scans:
+            failures += 1
+            click.echo(f"🛑 {name}: varredura completa de {', '.join(scans)}")
+        else:
+            click.echo(f"✅ {name}")
+        if scans or verbose:
+            for line in plan:
+                click.echo(f"     {line}")
+
+    if failures:
+        click.echo(f"🛑 {failures} consulta(s) sem índice de apoio.")
+        raise SystemExit(1)
+
+
 # Adicione o comando a uma lista para ser registrado (ver próximo passo)
-cli_commands = [create_admin_command]
\ No newline at end of file
+cli_commands = [
+    create_admin_command, export_appointments_command, rebuild_daily_revenue_command,
+    rebuild_search_index_command, check_query_plans_command, archive_appointments_command,
+]
\ No newline at end of file
@@ -0,0 +1,155 @@
+# app/database.py
+
+import time
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# ----------------------------------------------------
+# 📌 PERFIL DO BANCO (pool de conexões e PRAGMAs do SQLite)
+# ----------------------------------------------------
+# As opções do engine dependem do banco: PostgreSQL (e demais servidores)
+# usa pool com tamanho, transbordo, reciclagem e pre-ping configuráveis; o
+# SQLite recebe, a cada nova conexão, os PRAGMAs do modo WAL (leitores não
+# bloqueiam o escritor e vice-versa), synchronous=NORMAL (fsync só no
+# checkpoint), busy_timeout (espera o lock em vez de falhar na hora) e mmap.
+
+
+def normalize_database_url(url):
+    """Aceita o esquema 'postgres://' (ex: Heroku/Render), que o SQLAlchemy 2 não reconhece."""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def is_sqlite_memory(url):
+    return is_sqlite(url) and make_url(url).database in (None, '', ':memory:')
+
+
+def engine_options(config, url=None):
+    """
+    Opções de create_engine para a URL (padrão: SQLALCHEMY_DATABASE_URI).
+    O SQLite em memória usa um pool próprio (uma conexão por thread), que
+    não aceita tamanho de pool; o SQLite em arquivo e os servidores usam
+    QueuePool com os limites configurados.
+    """
+    url = url or config['SQLALCHEMY_DATABASE_URI']
+    if is_sqlite_memory(url):
+        return {}
+
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if is_sqlite(url):
+        # O arquivo local não derruba conexões ociosas: reciclar só custaria reabrir
+        options['connect_args'] = {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}
+    else:
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+    return options
+
+
+def sqlite_pragmas(config):
+    """PRAGMAs aplicados a cada conexão SQLite, na ordem de execução."""
+    # Explícito também sem WAL: o modo fica gravado no arquivo, então um banco
+    # que já foi aberto em WAL continuaria em WAL
+    pragmas = [('journal_mode', 'WAL' if config['SQLITE_WAL'] else 'DELETE')]
+    pragmas += [
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+    ]
+    if config['SQLITE_MMAP_SIZE']:
+        pragmas.append(('mmap_size', config['SQLITE_MMAP_SIZE']))
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Registra no engine (se for SQLite) a aplicação dos PRAGMAs a cada nova conexão."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+# ----------------------------------------------------
+# 📌 RÉPLICA DE LEITURA (roteamento por sessão)
+# ----------------------------------------------------
+# Com DATABASE_REPLICA_URL definida, a réplica vira o bind 'replica' e os
+# SELECTs das rotas marcadas com @use_replica vão para ela. Todo o resto
+# fica no primário:
+#   - escritas (flush do ORM ou INSERT/UPDATE/DELETE do Core);
+#   - qualquer leitura da mesma requisição depois de uma escrita;
+#   - as requisições do mesmo usuário por REPLICA_STICKY_SECONDS após um
+#     commit com escrita (ler o que acabou de gravar, apesar do atraso da
+#     replicação), marcado na sessão do Flask;
+#   - SQL textual e chamadas sem cláusula (ex: db.session.get_bind()).
+
+REPLICA_BIND = 'replica'
+
+_WROTE = 'escreveu'
+_PRIMARY_UNTIL = '_ler_primario_ate'
+
+
+def replica_bind(config):
+    """Valor de SQLALCHEMY_BINDS para a réplica (URL + opções do engine), ou None se não houver."""
+    url = config.get('DATABASE_REPLICA_URL')
+    if not url:
+        return None
+    url = normalize_database_url(url)
+    return {'url': url, **engine_options(config, url)}
+
+
+class RoutingSession(Session):
+    """Sessão que envia à réplica as leituras das rotas marcadas com @use_replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None:
+            if getattr(clause, 'is_dml', False):
+                self.info[_WROTE] = True
+            elif self._reads_from_replica(clause):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_replica(self):
+        """True se os próximos SELECTs desta sessão irão para a réplica."""
+        return (
+            has_request_context()
+            and g.get('usar_replica', False)
+            and REPLICA_BIND in self._db.engines
+            and not self.info.get(_WROTE)
+            and not (self.new or self.dirty or self.deleted)
+            and flask_session.get(_PRIMARY_UNTIL, 0) <= time.time()
+        )
+
+    def _reads_from_replica(self, clause):
+        return getattr(clause, 'is_select', False) and self.reads_from_replica()
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info[_WROTE] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    """Após um commit com escrita, as próximas leituras do usuário ficam no primário por um tempo."""
+    if session.info.get(_WROTE) and has_request_context():
+        sticky = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+        if sticky and REPLICA_BIND in session._db.engines:
+            flask_session[_PRIMARY_UNTIL] = time.time() + sticky
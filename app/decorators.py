@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import abort, current_app, redirect, url_for, flash
+from flask import abort, current_app, g, redirect, url_for, flash
 from flask_login import current_user
 
 def admin_required(f):
@@ -22,4 +22,15 @@ def admin_required(f):
             
         # 3. Se for admin, executa a função original
         return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def use_replica(f):
+    """
+    Marca a rota como somente leitura: seus SELECTs podem ser atendidos pela
+    réplica de leitura, se configurada (ver RoutingSession em app/database.py).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.usar_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
@@ -0,0 +1,128 @@
+# app/exports.py
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import func, select
+from app import db
+from app.archive import reaches_archive, union_archive
+from app.models import Appointment, Service, User
+
+# ----------------------------------------------------
+# 📌 EXPORTAÇÃO EM STREAMING (CSV / NDJSON)
+# ----------------------------------------------------
+# As consultas selecionam apenas colunas (sem objetos ORM nem identity map) e
+# são lidas em lotes com yield_per; cada lote é serializado e entregue antes
+# do próximo ser lido. A memória fica constante, seja 1 mil ou 10 milhões de
+# linhas. Usado pelas rotas /admin/export/... e pelo comando
+# 'flask export-appointments'; o histórico arquivado entra quando o período
+# o alcança (ver app/archive.py).
+
+EXPORT_BATCH_SIZE = 1000
+
+APPOINTMENT_COLUMNS = (
+    ('id', Appointment.id),
+    ('data_horario', Appointment.data_horario),
+    ('fim', Appointment.end_time),
+    ('status', Appointment.status),
+    ('cliente', User.nome),
+    ('email', User.email),
+    ('servico', Service.nome),
+    ('preco', Service.preco),
+    ('duracao_minutos', Service.duracao_minutos),
+    ('criado_em', Appointment.created_at),
+)
+
+BILLING_COLUMNS = (
+    ('id', Appointment.id),
+    ('data_horario', Appointment.data_horario),
+    ('cliente', User.nome),
+    ('email', User.email),
+    ('servico', Service.nome),
+    # Preço congelado na conclusão (linhas antigas, sem o valor, usam o preço atual)
+    ('valor', func.coalesce(Appointment.valor_cobrado, Service.preco)),
+)
+
+
+def _statement(columns, conditions, start):
+    stmt = (
+        select(*[column.label(name) for name, column in columns])
+        .select_from(Appointment)
+        .join(User, Appointment.user_id == User.id)
+        .join(Service, Appointment.service_id == Service.id)
+        .where(*conditions)
+    )
+    # Períodos que alcançam o histórico arquivado leem as duas tabelas
+    if reaches_archive(start):
+        return union_archive(stmt, order_by=('data_horario', 'id'))
+    return stmt.order_by(Appointment.data_horario, Appointment.id)
+
+
+def appointments_statement(conditions=(), start=None):
+    """
+    SELECT só de colunas dos agendamentos (com cliente e serviço) que atendem
+    às condições. start: início do período filtrado (None = sem limite), que
+    decide se o histórico arquivado entra na consulta.
+    """
+    return _statement(APPOINTMENT_COLUMNS, conditions, start)
+
+
+def billing_statement(start, end):
+    """SELECT só de colunas dos agendamentos concluídos no período do relatório de faturamento."""
+    return _statement(BILLING_COLUMNS, (
+        Appointment.status == 'Concluído',
+        Appointment.data_horario >= start,
+        Appointment.data_horario <= end,
+    ), start)
+
+
+def iter_rows(stmt, batch_size=EXPORT_BATCH_SIZE):
+    """Percorre o resultado em lotes de batch_size linhas (yield_per), sem materializar tudo."""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+
+def _csv_chunks(header, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_chunks(header, partitions):
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(header, row)), default=_json_default, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+# formato -> (mimetype, gerador de blocos de texto)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', _csv_chunks),
+    'ndjson': ('application/x-ndjson', _ndjson_chunks),
+}
+
+
+def export_chunks(stmt, fmt, batch_size=EXPORT_BATCH_SIZE):
+    """Gera o arquivo de exportação em blocos de texto (um por lote de linhas)."""
+    _, chunk_writer = EXPORT_FORMATS[fmt]
+    header = [column.name for column in stmt.selected_columns]
+    return chunk_writer(header, iter_rows(stmt, batch_size))
@@ -1,10 +1,13 @@
 # app/models.py
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from app import db, login
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Index
+from sqlalchemy import Index, and_, event, inspect, or_
+from sqlalchemy.orm import validates
+from app.database import RoutingSession
+from app.utils import normalize_email, prefix_bounds, search_key
 
 # Função auxiliar para o loader do Flask-Login
 @login.user_loader
@@ -22,9 +25,25 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     senha_hash = db.Column(db.String(256), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    # Nome em minúsculas e sem acentos (app.utils.search_key), mantido a cada
+    # alteração de 'nome': base da busca por prefixo e da ordem da listagem
+    nome_busca = db.Column(db.String(100))
     
-    # 📌 Índice para otimizar buscas por e-mail
-    __table_args__ = (Index('idx_user_email', 'email'),)
+    # 📌 Índices para otimizar buscas por e-mail e por prefixo do nome (sem diferenciar maiúsculas nem acentos)
+    __table_args__ = (
+        Index('idx_user_email', 'email'),
+        Index('idx_user_nome_busca', 'nome_busca'),
+    )
+
+    @validates('nome')
+    def _update_nome_busca(self, key, nome):
+        self.nome_busca = search_key(nome)
+        return nome
+
+    @validates('email')
+    def _normalize_email(self, key, email):
+        # E-mails gravados em minúsculas: a busca e o login comparam direto com idx_user_email
+        return normalize_email(email)
     
     def set_password(self, password):
         """Criptografa a senha para armazenamento."""
@@ -34,6 +53,21 @@ class User(UserMixin, db.Model):
         """Verifica se a senha fornecida corresponde ao hash armazenado."""
         return check_password_hash(self.senha_hash, password)
 
+    @classmethod
+    def prefix_condition(cls, term):
+        """
+        Condição SQL para o prefixo do nome (sem diferenciar maiúsculas nem
+        acentos) ou do e-mail, como intervalo sobre idx_user_nome_busca /
+        idx_user_email. Retorna None para busca vazia.
+        """
+        conditions = []
+        for column, prefix in ((cls.nome_busca, search_key(term)), (cls.email, normalize_email(term))):
+            bounds = prefix_bounds(prefix)
+            if bounds:
+                low, high = bounds
+                conditions.append(and_(column >= low, column < high))
+        return or_(*conditions) if conditions else None
+
     def __repr__(self):
         return f'<User {self.email}>'
 
@@ -51,6 +85,12 @@ class Service(db.Model):
     # 📌 MELHORIA: Soft Delete - O serviço é ATIVO por padrão
     is_active = db.Column(db.Boolean, default=True) 
 
+    # 📌 Índice parcial: só os serviços ativos, já em ordem de nome (página de agendamento)
+    __table_args__ = (
+        Index('idx_service_ativo_nome', 'nome',
+              sqlite_where=is_active == True, postgresql_where=is_active == True),  # noqa: E712
+    )
+
     # Agendamentos reversos criados pelo backref em Appointment
     
     def __repr__(self):
@@ -62,7 +102,19 @@ class Service(db.Model):
 class Appointment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     data_horario = db.Column(db.DateTime, index=True, nullable=False)
+    # 📌 Fim calculado (início + duração do serviço), persistido para a checagem de conflito em SQL.
+    # Invariante mantido no flush (_refresh_appointment_end_times) quando início ou serviço mudam;
+    # mudança de duração do serviço: refresh_service_end_times (app/services/availability.py)
+    end_time = db.Column(db.DateTime)
     status = db.Column(db.String(50), default='Agendado') 
+    # 📌 Marcado pela varredura periódica de lembretes (nulo = lembrete pendente)
+    lembrete_enviado_em = db.Column(db.DateTime)
+    # 📌 Incrementada a cada reagendamento: tarefas de lembrete de versões antigas são ignoradas
+    lembrete_versao = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 📌 Falhas de envio do lembrete atual: após REMINDER_MAX_ATTEMPTS a varredura desiste dele
+    lembrete_tentativas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # 📌 Preço do serviço no momento da conclusão (o faturamento não muda se o preço mudar depois)
+    valor_cobrado = db.Column(db.Float)
     
     # 📌 MELHORIA: Campo de Auditoria (registra quando o agendamento foi CRIADO)
     # Usa datetime.now(timezone.utc) para consistência no banco de dados.
@@ -78,5 +130,183 @@ class Appointment(db.Model):
     # Relacionamento 2: Service (acesso: appointment.servico)
     servico = db.relationship('Service', backref='agendamentos_do_servico', foreign_keys=[service_id])
 
+    # 📌 Índices compostos: sobreposição (status + intervalo), varredura de lembretes
+    # pendentes e filtros da lista administrativa (serviço ou cliente + período).
+    # O faturamento (status = 'Concluído' + período) usa idx_appointment_status_periodo.
+    __table_args__ = (
+        Index('idx_appointment_status_periodo', 'status', 'data_horario', 'end_time'),
+        Index('idx_appointment_lembrete', 'lembrete_enviado_em', 'data_horario'),
+        Index('idx_appointment_servico_data', 'service_id', 'data_horario'),
+        Index('idx_appointment_user_data', 'user_id', 'data_horario'),
+    )
+
+    def refresh_end_time(self, duracao_minutos=None):
+        """Recalcula end_time a partir do início e da duração do serviço."""
+        if duracao_minutos is None:
+            duracao_minutos = self.servico.duracao_minutos
+        self.end_time = self.data_horario + timedelta(minutes=duracao_minutos)
+
+    def reset_reminder(self, lead_hours):
+        """
+        Reabre o lembrete para o horário atual (varredura periódica) e
+        incrementa sua versão, invalidando tarefas de lembrete anteriores. Se o
+        agendamento já está dentro da janela do lembrete, ele é dispensado.
+        Retorna True se o lembrete ficou pendente.
+        """
+        now = datetime.now()
+        self.lembrete_versao = (self.lembrete_versao or 0) + 1
+        self.lembrete_tentativas = 0
+        if self.data_horario - timedelta(hours=lead_hours) > now:
+            self.lembrete_enviado_em = None
+            return True
+        self.lembrete_enviado_em = now
+        return False
+
+    def __repr__(self):
+        return f'<Appointment {self.user.nome} - {self.servico.nome} em {self.data_horario}>'
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _refresh_appointment_end_times(session, flush_context, instances):
+    """
+    Recalcula end_time de agendamentos novos ou com início/serviço alterados
+    antes de gravar, a menos que o próprio end_time tenha sido atribuído junto
+    (ex: refresh_end_time já chamado pela rota).
+    """
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Appointment) or obj.data_horario is None:
+            continue
+        state = inspect(obj)
+        if obj.end_time is not None and state.attrs.end_time.history.has_changes():
+            continue
+        if not (state.pending or state.attrs.data_horario.history.has_changes()
+                or state.attrs.service_id.history.has_changes()
+                or state.attrs.servico.history.has_changes()):
+            continue
+        # O relacionamento pode não estar carregado (só service_id foi definido)
+        with session.no_autoflush:
+            service = obj.servico
+            if service is None or (obj.service_id is not None and service.id != obj.service_id):
+                service = session.get(Service, obj.service_id) if obj.service_id else None
+        if service is not None:
+            obj.refresh_end_time(service.duracao_minutos)
+
+
+# --------------------------
+# 4. Tabela SlotReservation (Reserva de Horário)
+# --------------------------
+class SlotReservation(db.Model):
+    """
+    Células de tempo ocupadas por agendamentos ativos. A restrição UNIQUE em
+    'inicio' faz o próprio banco rejeitar a segunda reserva do mesmo horário,
+    tornando o agendamento atômico sem trava global entre os workers.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    inicio = db.Column(db.DateTime, nullable=False, unique=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='CASCADE'),
+                               nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<SlotReservation {self.inicio} -> Appointment {self.appointment_id}>'
+
+
+
+# --------------------------
+# 5. Tabela ScheduleVersion (Versão da Agenda)
+# --------------------------
+class ScheduleVersion(db.Model):
+    """
+    Contadores de versão da agenda por escopo ('dia:AAAA-MM-DD' ou 'global').
+    Incrementados na mesma transação das alterações de agendamento; alimentam
+    o ETag/Last-Modified das APIs de disponibilidade.
+    """
+    escopo = db.Column(db.String(40), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<ScheduleVersion {self.escopo} v{self.versao}>'
+
+
+
+# --------------------------
+# 6. Tabela EmailOutbox (Caixa de Saída de E-mails)
+# --------------------------
+class EmailOutbox(db.Model):
+    """
+    E-mails gravados na mesma transação da alteração do agendamento e
+    enviados depois, em lotes, pela tarefa Celery drain_email_outbox.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(120), nullable=False)
+    assunto = db.Column(db.String(255), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+
+    # 'Pendente' -> 'Enviado' | 'Falhou' (após esgotar as tentativas)
+    status = db.Column(db.String(20), nullable=False, default='Pendente')
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    ultimo_erro = db.Column(db.String(500))
+
+    # Reserva do lote por um worker (evita envio duplicado entre drenagens concorrentes)
+    reserva_token = db.Column(db.String(32), index=True)
+    reservado_ate = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    enviado_em = db.Column(db.DateTime)
+
+    # 📌 Índice para a seleção dos pendentes vencidos
+    __table_args__ = (Index('idx_outbox_status_proxima', 'status', 'proxima_tentativa'),)
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status} -> {self.destinatario}>'
+
+
+# --------------------------
+# 7. Tabela DailyRevenue (Faturamento Diário Consolidado)
+# --------------------------
+class DailyRevenue(db.Model):
+    """
+    Consolidado de agendamentos concluídos por (dia, serviço), atualizado de
+    forma incremental quando um agendamento entra ou sai de 'Concluído'.
+    Os totais do relatório de faturamento são lidos daqui, sem varrer os
+    agendamentos. Pode ser reconstruído com 'flask rebuild-daily-revenue'.
+    """
+    __tablename__ = 'daily_revenue'
+
+    dia = db.Column(db.Date, primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receita = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<DailyRevenue {self.dia} serviço {self.service_id}: {self.quantidade} / R$ {self.receita:.2f}>'
+
+
+# --------------------------
+# 8. Tabela AppointmentArchive (Histórico Arquivado)
+# --------------------------
+class AppointmentArchive(db.Model):
+    """
+    Agendamentos concluídos e cancelados antigos, movidos de 'appointment'
+    pelo comando 'flask archive-appointments'. Mantém os mesmos ids e colunas
+    (sem os campos de lembrete), para que relatórios e exportações leiam as
+    duas tabelas com a mesma consulta (ver app/archive.py).
+    """
+    __tablename__ = 'appointment_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    data_horario = db.Column(db.DateTime, index=True, nullable=False)
+    end_time = db.Column(db.DateTime)
+    status = db.Column(db.String(50))
+    valor_cobrado = db.Column(db.Float)
+    created_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), nullable=False)
+    arquivado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    # 📌 Mesmo índice de status + período da tabela quente (faturamento, exportações)
+    __table_args__ = (Index('idx_archive_status_data', 'status', 'data_horario'),)
+
     def __repr__(self):
-        return f'<Appointment {self.user.nome} - {self.servico.nome} em {self.data_horario}>'
\ No newline at end of file
+        return f'<AppointmentArchive {self.id} {self.status} em {self.data_horario}>'
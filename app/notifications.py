@@ -0,0 +1,55 @@
+# app/notifications.py
+
+from app import db
+from app.models import EmailOutbox
+
+# ----------------------------------------------------
+# 📌 CAIXA DE SAÍDA TRANSACIONAL (Outbox)
+# ----------------------------------------------------
+# As rotas apenas gravam o e-mail na tabela email_outbox, na mesma transação
+# da alteração do agendamento. O envio SMTP acontece fora da requisição, na
+# tarefa Celery drain_email_outbox (app/tasks.py).
+
+
+def queue_email(recipient, subject, body):
+    """Adiciona um e-mail à caixa de saída (efetivado junto com o commit da rota)."""
+    message = EmailOutbox(destinatario=recipient, assunto=subject, corpo=body)
+    db.session.add(message)
+    return message
+
+
+def queue_appointment_email(appointment, subject, status):
+    """
+    Enfileira o email de notificação para o usuário sobre o agendamento.
+    Deve ser chamada antes do commit.
+    """
+    body = f"""
+Olá, {appointment.user.nome}!
+
+Seu agendamento foi {status.lower()} com sucesso.
+
+Detalhes do Serviço:
+- Serviço: {appointment.servico.nome}
+- Data/Hora: {appointment.data_horario.strftime('%d/%m/%Y às %H:%M')}
+- Duração: {appointment.servico.duracao_minutos} minutos
+- Status: {appointment.status}
+
+Para visualizar ou cancelar seu agendamento, acesse a seção 'Meus Agendamentos' no aplicativo.
+
+Atenciosamente,
+Sua Equipe de Agendamentos.
+"""
+    return queue_email(appointment.user.email, subject, body)
+
+
+def dispatch_outbox():
+    """
+    Pede ao Celery uma drenagem imediata da caixa de saída (após o commit).
+    Se o broker estiver fora do ar, a drenagem periódica (beat) envia depois.
+    """
+    from app.tasks import drain_email_outbox
+
+    try:
+        drain_email_outbox.delay()
+    except Exception as e:
+        print(f"AVISO: Falha ao agendar a drenagem da caixa de saída: {e}")
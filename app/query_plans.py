@@ -0,0 +1,103 @@
+# app/query_plans.py
+
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select, text
+from app import db
+from app.exports import appointments_statement, billing_statement
+from app.models import Appointment, Service
+from app.services.availability import BUSY_STATUSES, business_hours
+
+# ----------------------------------------------------
+# 📌 PLANOS DAS CONSULTAS CRÍTICAS (EXPLAIN QUERY PLAN)
+# ----------------------------------------------------
+# Cada consulta abaixo reproduz o filtro e a ordenação de uma rota quente.
+# O comando 'flask check-query-plans' roda EXPLAIN QUERY PLAN em todas e
+# falha se alguma voltar a varrer a tabela inteira: o aviso chega antes de
+# o volume de dados o tornar visível. 'SCAN <tabela> USING INDEX x' também
+# conta (percorre todas as linhas, só que na ordem do índice), exceto
+# quando x é parcial e já contém só as linhas pedidas. tests/test_query_plans.py
+# roda a mesma verificação sobre um banco semeado e confere o índice escolhido.
+# Só para SQLite; o formato do EXPLAIN muda em outros bancos.
+
+# 'SCAN appointment [USING [COVERING] INDEX idx]' ('SCAN TABLE ...' até o SQLite 3.35)
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: USING (?:COVERING )?INDEX (\w+))?$')
+
+
+def _hot_queries(now):
+    """(nome, consulta) das consultas críticas, com valores representativos."""
+    day_start, day_end = business_hours(now.date())
+    billing_start = now - timedelta(days=30)
+    billing_rows = billing_statement(billing_start, now).order_by(None).subquery()
+
+    return [
+        # my_appointments: agendamentos do cliente em ordem cronológica
+        ('meus_agendamentos', Appointment.query.filter_by(user_id=1)
+            .order_by(Appointment.data_horario.asc()).statement),
+
+        # Disponibilidade: intervalos ocupados do dia
+        ('ocupacao_do_dia', db.session.query(Appointment.data_horario, Appointment.end_time).filter(
+            Appointment.status.in_(BUSY_STATUSES),
+            Appointment.data_horario >= day_start,
+            Appointment.data_horario < day_end
+        ).order_by(Appointment.data_horario).statement),
+
+        # has_conflict: sobreposição com agendamentos ativos (EXISTS)
+        ('conflito_de_horario', db.session.query(db.exists().where(
+            Appointment.status.in_(BUSY_STATUSES),
+            Appointment.data_horario >= day_start,
+            Appointment.data_horario < now + timedelta(minutes=30),
+            Appointment.end_time > now
+        )).statement),
+
+        # Lista/exportação administrativa filtrada por status e dia
+        ('agendados_do_dia', appointments_statement((
+            Appointment.status == 'Agendado',
+            Appointment.data_horario >= day_start,
+            Appointment.data_horario < day_end
+        ))),
+
+        # Relatório de faturamento: página de concluídos, mais recentes primeiro
+        ('faturamento_pagina', select(billing_rows)
+            .order_by(billing_rows.c.data_horario.desc(), billing_rows.c.id.desc()).limit(50)),
+
+        # Exportação do faturamento (com cliente e serviço)
+        ('faturamento_exportacao', billing_statement(billing_start, now)),
+
+        # Página de agendamento: serviços ativos
+        ('servicos_ativos', Service.query.filter_by(is_active=True)
+            .order_by(Service.nome.asc()).statement),
+    ]
+
+
+def explain(stmt):
+    """Linhas (coluna 'detail') do EXPLAIN QUERY PLAN da consulta, com os valores embutidos."""
+    sql = stmt.compile(dialect=db.session.get_bind().dialect, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+
+def _partial_indexes(table):
+    """Nomes dos índices parciais da tabela (coluna 'partial' do PRAGMA index_list)."""
+    rows = db.session.execute(text(f'PRAGMA index_list("{table}")'))
+    return {row.name for row in rows if row.partial}
+
+
+def full_scans(plan):
+    """Tabelas varridas por inteiro no plano."""
+    scans = []
+    for match in map(_SCAN.match, plan):
+        if not match:
+            continue
+        table, index = match.groups()
+        if index is None or index not in _partial_indexes(table):
+            scans.append(table)
+    return scans
+
+
+def check_query_plans(now=None):
+    """Lista de (nome, plano, tabelas varridas por inteiro) de cada consulta crítica."""
+    results = []
+    for name, stmt in _hot_queries(now or datetime.now()):
+        plan = explain(stmt)
+        results.append((name, plan, full_scans(plan)))
+    return results
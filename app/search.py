@@ -0,0 +1,204 @@
+# app/search.py
+
+import re
+from datetime import datetime
+from sqlalchemy import and_, inspect, or_, text
+from app import db
+from app.models import Appointment, Service, User
+
+# ----------------------------------------------------
+# 📌 BUSCA TEXTUAL (SQLite FTS5, com LIKE como alternativa)
+# ----------------------------------------------------
+# Clientes, serviços e agendamentos ficam em uma única tabela virtual FTS5
+# (search_index), mantida por triggers no próprio banco: qualquer escrita,
+# seja pelo ORM, por UPDATE em lote ou por outro processo, atualiza o índice
+# na mesma transação. O rowid de cada documento é id * 4 + tipo, então as
+# triggers substituem um documento com DELETE/INSERT por chave, sem varrer
+# o índice (tipo 1 = cliente, 2 = serviço, 3 = agendamento). Agendamentos repetem o nome do cliente e do serviço, e as
+# triggers de User/Service os reescrevem quando um nome muda.
+#
+# Em bancos sem FTS5 (ex: PostgreSQL), ou antes da migração, a busca cai
+# para LIKE nas tabelas de origem.
+
+SEARCH_TABLE = 'search_index'
+
+SEARCH_ENGINES = ('fts', 'like')
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# Texto dos documentos de agendamento (mesmo formato nas triggers e no LIKE)
+_APPOINTMENT_DOC = (
+    "SELECT a.id * 4 + 3, u.nome || ' · ' || s.nome, "
+    "a.status || ' ' || strftime('%d/%m/%Y %H:%M', a.data_horario), 'agendamento', a.data_horario "
+    'FROM appointment a JOIN "user" u ON u.id = a.user_id JOIN service s ON s.id = a.service_id'
+)
+
+SEARCH_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        titulo, detalhe, tipo UNINDEXED, quando UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+
+    # --- Clientes ---
+    """CREATE TRIGGER IF NOT EXISTS search_user_ai AFTER INSERT ON "user" BEGIN
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 1, new.nome, new.email, 'cliente');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_user_au AFTER UPDATE OF nome, email ON "user" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 1, new.nome, new.email, 'cliente');
+        DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM appointment WHERE user_id = new.id);
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {_APPOINTMENT_DOC} WHERE a.user_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_user_ad AFTER DELETE ON "user" BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+    END""",
+
+    # --- Serviços ---
+    """CREATE TRIGGER IF NOT EXISTS search_service_ai AFTER INSERT ON service BEGIN
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 2, new.nome, new.descricao, 'servico');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_service_au AFTER UPDATE OF nome, descricao ON service BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 2, new.nome, new.descricao, 'servico');
+        DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM appointment WHERE service_id = new.id);
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {_APPOINTMENT_DOC} WHERE a.service_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_service_ad AFTER DELETE ON service BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+    END""",
+
+    # --- Agendamentos (só colunas exibidas; ex: o lembrete não reescreve o índice) ---
+    f"""CREATE TRIGGER IF NOT EXISTS search_appointment_ai AFTER INSERT ON appointment BEGIN
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {_APPOINTMENT_DOC} WHERE a.id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_appointment_au
+        AFTER UPDATE OF status, data_horario, user_id, service_id ON appointment BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+        INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {_APPOINTMENT_DOC} WHERE a.id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_appointment_ad AFTER DELETE ON appointment BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+    END""",
+)
+
+SEARCH_INDEX_POPULATE = (
+    f"DELETE FROM {SEARCH_TABLE}",
+    f"INSERT INTO {SEARCH_TABLE} (rowid, titulo, detalhe, tipo) "
+    "SELECT id * 4 + 1, nome, email, 'cliente' FROM \"user\"",
+    f"INSERT INTO {SEARCH_TABLE} (rowid, titulo, detalhe, tipo) "
+    "SELECT id * 4 + 2, nome, descricao, 'servico' FROM service",
+    f"INSERT INTO {SEARCH_TABLE} (rowid, titulo, detalhe, tipo, quando) {_APPOINTMENT_DOC}",
+    # Junta os segmentos gerados pela carga em lote
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')",
+)
+
+
+def create_search_index(populate=True):
+    """
+    Cria (se ainda não existir) a tabela FTS5 e as triggers e, por padrão,
+    recarrega o índice a partir das tabelas. Só para SQLite; a migração
+    faz o mesmo em bancos existentes.
+    """
+    for statement in SEARCH_INDEX_DDL:
+        db.session.execute(text(statement))
+    if populate:
+        for statement in SEARCH_INDEX_POPULATE:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+
+def fts_available():
+    """True se o banco é SQLite e a tabela search_index existe."""
+    bind = db.session.get_bind()
+    return bind.dialect.name == 'sqlite' and inspect(bind).has_table(SEARCH_TABLE)
+
+
+def search_terms(query):
+    """Palavras da busca, sem operadores nem pontuação (ex: 'maria@x' -> ['maria', 'x'])."""
+    return _TERM.findall(query.lower())
+
+
+def _result(tipo, ref_id, titulo, detalhe, quando, score=None):
+    if isinstance(quando, str):
+        quando = datetime.fromisoformat(quando)
+    return {
+        'tipo': tipo,
+        'id': ref_id,
+        'titulo': titulo,
+        'detalhe': detalhe,
+        'quando': quando.isoformat(timespec='minutes') if quando else None,
+        'score': round(score, 3) if score is not None else None,
+    }
+
+
+def search_fts(terms, limit, now):
+    """
+    Busca no índice FTS5: cada palavra vale como prefixo e todas devem
+    casar (ex: 'maria corte' traz os cortes da Maria); a ordem é a do bm25,
+    com o título pesando mais que o detalhe. Agendamentos só entram se ainda
+    não passaram.
+    """
+    match = ' '.join(f'"{term}"*' for term in terms)
+    rows = db.session.execute(text(
+        f"SELECT rowid, tipo, titulo, detalhe, quando, bm25({SEARCH_TABLE}, 10.0, 1.0) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+        "AND (tipo != 'agendamento' OR quando >= :now) "
+        "ORDER BY score LIMIT :limit"
+    ), {'match': match, 'now': now.strftime('%Y-%m-%d %H:%M:%S'), 'limit': limit}).all()
+
+    # bm25 é negativo (menor = melhor); a API expõe o valor positivo
+    return [
+        _result(tipo, rowid // 4, titulo, detalhe, quando, -score)
+        for rowid, tipo, titulo, detalhe, quando, score in rows
+    ]
+
+
+def search_like(terms, limit, now):
+    """
+    Alternativa sem FTS: LIKE '%palavra%' em cada tabela (varredura completa,
+    sem ignorar acentos). Cada palavra deve aparecer em algum campo; sem
+    ranking, os resultados vêm agrupados por tipo.
+    """
+    def matches_all(*columns):
+        return and_(*[or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms])
+
+    users = db.session.query(User.id, User.nome, User.email).filter(
+        matches_all(User.nome, User.email)
+    ).order_by(User.nome).limit(limit).all()
+
+    services = db.session.query(Service.id, Service.nome, Service.descricao).filter(
+        matches_all(Service.nome, Service.descricao)
+    ).order_by(Service.nome).limit(limit).all()
+
+    appointments = db.session.query(
+        Appointment.id, User.nome, Service.nome, Appointment.status, Appointment.data_horario
+    ).join(User, Appointment.user_id == User.id).join(Service, Appointment.service_id == Service.id).filter(
+        Appointment.data_horario >= now,
+        matches_all(User.nome, Service.nome, Appointment.status)
+    ).order_by(Appointment.data_horario).limit(limit).all()
+
+    results = [_result('cliente', ref_id, nome, email, None) for ref_id, nome, email in users]
+    results += [_result('servico', ref_id, nome, descricao, None) for ref_id, nome, descricao in services]
+    results += [
+        _result('agendamento', ref_id, f'{cliente} · {servico}',
+                f"{status} {data_horario.strftime('%d/%m/%Y %H:%M')}", data_horario)
+        for ref_id, cliente, servico, status, data_horario in appointments
+    ]
+    return results[:limit]
+
+
+def search(query, limit=20, engine=None, now=None):
+    """
+    Busca clientes, serviços e agendamentos futuros. engine: 'fts' ou 'like'
+    (padrão: FTS5 quando disponível). Retorna (motor usado, resultados).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return engine or 'fts', []
+
+    now = now or datetime.now()
+    if engine is None:
+        engine = 'fts' if fts_available() else 'like'
+    if engine == 'fts':
+        return engine, search_fts(terms, limit, now)
+    return engine, search_like(terms, limit, now)
@@ -0,0 +1,252 @@
+# app/services/availability.py
+
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from sqlalchemy import update
+from app import db
+from app.models import Service, Appointment, SlotReservation, ScheduleVersion
+from app.utils import upsert
+
+# ----------------------------------------------------
+# 📌 MOTOR DE DISPONIBILIDADE (Sweep-line)
+# ----------------------------------------------------
+# Horário de funcionamento e granularidade da grade de horários.
+START_HOUR = 9
+END_HOUR = 17
+SLOT_INTERVAL = 30  # minutos
+
+# Status que ocupam a agenda: um agendamento reagendado continua segurando o novo horário
+BUSY_STATUSES = ('Agendado', 'Reagendado')
+
+# Granularidade das células de reserva (minutos)
+RESERVATION_GRANULARITY = 5
+
+
+def compute_free_slots(day_start, day_end, duration_minutes, busy_intervals,
+                       not_before=None, step_minutes=SLOT_INTERVAL):
+    """
+    Emite os inícios de slot livres entre day_start e day_end.
+
+    Os intervalos ocupados são ordenados uma única vez pelo início; em seguida
+    uma única passada linear avança os slots e o ponteiro de intervalos em
+    conjunto, mantendo o maior fim já visto (fusão implícita dos intervalos).
+    O custo é O(n log n + slots) em vez de O(slots × agendamentos), e cai para
+    O(n + slots) quando os intervalos já chegam ordenados do banco.
+    """
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes)
+    busy = sorted(busy_intervals, key=itemgetter(0))
+    total = len(busy)
+
+    free_slots = []
+    i = 0
+    covered_until = None  # maior fim entre os intervalos que começam antes do slot terminar
+    slot_start = day_start
+
+    while slot_start < day_end:
+        slot_end = slot_start + duration
+        if slot_end > day_end:
+            break
+
+        # Incorpora os intervalos que começam antes do fim deste slot
+        while i < total and busy[i][0] < slot_end:
+            if covered_until is None or busy[i][1] > covered_until:
+                covered_until = busy[i][1]
+            i += 1
+
+        # Ignora horários no passado (apenas relevante para o dia atual)
+        if not_before is not None and slot_start < not_before:
+            slot_start += step
+            continue
+
+        if covered_until is None or covered_until <= slot_start:
+            free_slots.append(slot_start)
+
+        slot_start += step
+
+    return free_slots
+
+
+def drop_past_slots(slots, now):
+    """Remove de uma lista de slots ('HH:MM') do dia atual os que já começaram."""
+    threshold = now.replace(second=0, microsecond=0)
+    if threshold < now:
+        threshold += timedelta(minutes=1)
+    limit = threshold.strftime('%H:%M')
+    return [slot for slot in slots if slot >= limit]
+
+
+def business_hours(date_obj):
+    """Retorna o (início, fim) do expediente para a data informada."""
+    day = date_obj.date() if isinstance(date_obj, datetime) else date_obj
+    start = datetime.combine(day, datetime.min.time().replace(hour=START_HOUR))
+    end = datetime.combine(day, datetime.min.time().replace(hour=END_HOUR))
+    return start, end
+
+
+# ----------------------------------------------------
+# 📌 CHECAGEM DE CONFLITO (Consulta única EXISTS)
+# ----------------------------------------------------
+def has_conflict(service_id, desired_start_time, appointment_id_to_exclude=None):
+    """
+    Verifica se o horário desejado conflita com agendamentos existentes,
+    excluindo um agendamento específico.
+
+    A sobreposição é resolvida em uma única consulta EXISTS sobre o índice
+    (status, data_horario, end_time), sem carregar agendamentos nem serviços.
+    """
+    # session.get usa o identity map: não consulta o banco se o serviço já foi carregado
+    service = db.session.get(Service, service_id)
+    if not service:
+        return False
+
+    desired_end_time = desired_start_time + timedelta(minutes=service.duracao_minutos)
+    start_of_day = datetime.combine(desired_start_time.date(), datetime.min.time())
+
+    conditions = [
+        Appointment.status.in_(BUSY_STATUSES),
+        Appointment.data_horario >= start_of_day,
+        Appointment.data_horario < desired_end_time,
+        Appointment.end_time > desired_start_time,
+    ]
+    if appointment_id_to_exclude:
+        conditions.append(Appointment.id != appointment_id_to_exclude)
+
+    return db.session.query(db.exists().where(*conditions)).scalar()
+
+
+def refresh_service_end_times(service):
+    """
+    Recalcula em lote o end_time dos agendamentos futuros de um serviço após
+    mudança de duração (UPDATE por chave primária, sem carregar objetos) e
+    refaz as reservas de horário correspondentes.
+    """
+    start_of_today = datetime.combine(datetime.now().date(), datetime.min.time())
+    rows = db.session.query(Appointment.id, Appointment.data_horario).filter(
+        Appointment.service_id == service.id,
+        Appointment.status.in_(BUSY_STATUSES),
+        Appointment.data_horario >= start_of_today
+    ).all()
+
+    if not rows:
+        return
+
+    duration = timedelta(minutes=service.duracao_minutos)
+    db.session.execute(
+        update(Appointment),
+        [{'id': appt_id, 'end_time': start + duration} for appt_id, start in rows]
+    )
+
+    # As células antigas saem antes das novas entrarem (a UNIQUE valida cada INSERT)
+    appointment_ids = [appt_id for appt_id, _ in rows]
+    SlotReservation.query.filter(
+        SlotReservation.appointment_id.in_(appointment_ids)
+    ).delete(synchronize_session=False)
+    db.session.execute(
+        SlotReservation.__table__.insert(),
+        [
+            {'inicio': cell, 'appointment_id': appt_id}
+            for appt_id, start in rows
+            for cell in reservation_cells(start, start + duration)
+        ]
+    )
+
+
+# ----------------------------------------------------
+# 📌 RESERVA ATÔMICA DE HORÁRIOS (UNIQUE por célula)
+# ----------------------------------------------------
+def on_reservation_grid(moment):
+    """True se o horário cai no início de uma célula de reserva (ex: 09:35, não 09:32)."""
+    return moment.second == 0 and moment.microsecond == 0 and moment.minute % RESERVATION_GRANULARITY == 0
+
+
+def reservation_cells(start, end):
+    """
+    Células de RESERVATION_GRANULARITY minutos que cobrem [start, end).
+    O início é arredondado para baixo e o fim para cima, então dois
+    intervalos sobrepostos sempre disputam ao menos uma célula. Para que só
+    sobreposições reais colidam, início e duração ficam na grade das células:
+    as rotas recusam horários fora dela (on_reservation_grid) e o ServiceForm,
+    durações que não são múltiplas de RESERVATION_GRANULARITY.
+    """
+    granularity = timedelta(minutes=RESERVATION_GRANULARITY)
+    cell = start.replace(second=0, microsecond=0)
+    cell -= timedelta(minutes=cell.minute % RESERVATION_GRANULARITY)
+
+    cells = []
+    while cell < end:
+        cells.append(cell)
+        cell += granularity
+    return cells
+
+
+def reserve_slots(appointment):
+    """
+    Insere as células ocupadas pelo agendamento. Se outro worker reservou
+    alguma delas primeiro, o flush levanta IntegrityError e a rota deve
+    fazer rollback e tratar como conflito.
+    """
+    db.session.execute(
+        SlotReservation.__table__.insert(),
+        [
+            {'inicio': cell, 'appointment_id': appointment.id}
+            for cell in reservation_cells(appointment.data_horario, appointment.end_time)
+        ]
+    )
+
+
+def release_slots(appointment):
+    """Libera (DELETE imediato) as células reservadas pelo agendamento."""
+    SlotReservation.query.filter_by(
+        appointment_id=appointment.id
+    ).delete(synchronize_session=False)
+
+
+# ----------------------------------------------------
+# 📌 VERSÕES DA AGENDA (Validadores para ETag / Last-Modified)
+# ----------------------------------------------------
+GLOBAL_SCOPE = 'global'
+
+
+def day_scope(day):
+    return f'dia:{day.isoformat()}'
+
+
+def bump_schedule_versions(*days, include_global=False):
+    """
+    Incrementa, com um único upsert, a versão dos dias afetados (e a global,
+    usada quando a duração de um serviço muda). Deve ser chamada antes do
+    commit, na mesma transação da alteração do agendamento.
+    """
+    scopes = {day_scope(day) for day in days}
+    if include_global:
+        scopes.add(GLOBAL_SCOPE)
+    if not scopes:
+        return
+
+    now = datetime.now(timezone.utc)
+    table = ScheduleVersion.__table__
+    # Ordem fixa dos escopos evita deadlock entre transações concorrentes
+    upsert(
+        table,
+        [{'escopo': scope, 'versao': 1, 'atualizado_em': now} for scope in sorted(scopes)],
+        index_elements=['escopo'],
+        set_=lambda excluded: {'versao': table.c.versao + 1, 'atualizado_em': excluded.atualizado_em}
+    )
+
+
+def schedule_versions(days):
+    """
+    Lê em uma consulta as versões dos dias informados e a global.
+    Retorna ({escopo: versao}, última alteração em UTC ou None).
+    """
+    scopes = [GLOBAL_SCOPE] + [day_scope(day) for day in days]
+    rows = db.session.query(
+        ScheduleVersion.escopo, ScheduleVersion.versao, ScheduleVersion.atualizado_em
+    ).filter(ScheduleVersion.escopo.in_(scopes)).all()
+
+    versions = {scope: versao for scope, versao, _ in rows}
+    last_modified = max((updated for _, _, updated in rows), default=None)
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return versions, last_modified
@@ -1,11 +1,21 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+import hashlib
+from flask import Blueprint, Response, current_app, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import login_required, current_user
-from app import db, mail
+from app import db, availability_cache
 from datetime import datetime, timedelta, date
+from collections import defaultdict
 from app.models import Service, Appointment 
-from flask_mail import Message
-from app.tasks import send_appointment_reminder 
+from app.cache import SingleFlight
+from app.decorators import use_replica
+from app.admin.revenue import COMPLETED_STATUS, revert_completion
+from app.notifications import dispatch_outbox, queue_appointment_email
+from app.services.availability import (
+    BUSY_STATUSES, GLOBAL_SCOPE, RESERVATION_GRANULARITY, bump_schedule_versions, business_hours,
+    compute_free_slots, day_scope, drop_past_slots, has_conflict, on_reservation_grid, release_slots,
+    reserve_slots, schedule_versions
+)
 from sqlalchemy import or_, func, and_
+from sqlalchemy.exc import IntegrityError
 
 
 # ----------------------------------------------------------------------
@@ -16,169 +26,286 @@ bp = Blueprint('services', __name__, url_prefix='/services')
 
 
 # ----------------------------------------------------
-# 📌 2. FUNÇÃO AUXILIAR DE ENVIO DE EMAIL (Reusada no Agendamento/Cancelamento)
+# 📌 2. FUNÇÕES AUXILIARES (get_available_slots e get_available_slots_range)
 # ----------------------------------------------------
-def send_appointment_email(appointment, subject, status):
+
+# Limite de dias por consulta de intervalo (ex: visão semanal/mensal)
+MAX_RANGE_DAYS = 31
+
+
+# Consultas idênticas e simultâneas dentro do worker compartilham um único cálculo
+availability_flight = SingleFlight()
+
+
+def get_available_slots_range(service_ids, start_date, end_date, versions=None):
     """
-    Envia email de notificação para o usuário sobre o agendamento.
+    Calcula os slots disponíveis de vários serviços em um intervalo de dias.
+    versions: versões da agenda já lidas para o ETag (ver conditional_json);
+    se omitidas, são lidas aqui. Requisições idênticas concorrentes aguardam
+    o mesmo cálculo (single-flight), desde que leiam as mesmas versões do
+    mesmo banco: quem precisa do primário (ex: logo após agendar) não
+    recebe o resultado de uma réplica atrasada.
     """
-    msg = Message(
-        subject,
-        recipients=[appointment.user.email] 
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    if versions is None:
+        versions, _ = schedule_versions(days)
+    key = (
+        tuple(sorted(set(service_ids))), start_date, end_date,
+        tuple(sorted(versions.items())), db.session().reads_from_replica()
+    )
+    return availability_flight.do(
+        key, lambda: _compute_available_slots_range(service_ids, days, versions)
     )
-    
-    msg.body = f"""
-Olá, {appointment.user.nome}!
 
-Seu agendamento foi {status.lower()} com sucesso.
 
-Detalhes do Serviço:
-- Serviço: {appointment.servico.nome}
-- Data/Hora: {appointment.data_horario.strftime('%d/%m/%Y às %H:%M')}
-- Duração: {appointment.servico.duracao_minutos} minutos
-- Status: {appointment.status}
+def _compute_available_slots_range(service_ids, days, versions):
+    """
+    Calcula os slots disponíveis de vários serviços nos dias informados.
 
-Para visualizar ou cancelar seu agendamento, acesse a seção 'Meus Agendamentos' no aplicativo.
+    Cada (serviço, dia) é lido primeiro do cache de disponibilidade, aceito só
+    se foi calculado nas versões atuais do dia e global. Os dias que faltam
+    são resolvidos com uma única consulta de agendamentos para a janela,
+    agrupados por dia em memória e passados ao motor sweep-line.
+    Retorna {service_id: {date: ['HH:MM', ...]}}.
+    """
+    services = Service.query.filter(Service.id.in_(service_ids)).all()
+    if not services:
+        return {}
+
+    def day_version(day):
+        return (versions.get(day_scope(day), 0), versions.get(GLOBAL_SCOPE, 0))
+
+    # 1. Consulta o cache (lista do dia inteiro, sem o filtro de horários passados)
+    full_day_slots = {}
+    missing_days = set()
+    for day in days:
+        for service in services:
+            cached = availability_cache.get(service.id, day, day_version(day))
+            if cached is None:
+                missing_days.add(day)
+            else:
+                full_day_slots[service.id, day] = cached
+
+    # 2. Busca única de (início, fim) dos agendamentos que ocupam a agenda nos dias faltantes
+    if missing_days:
+        window_start = business_hours(min(missing_days))[0]
+        window_end = business_hours(max(missing_days))[1]
+
+        taken_intervals = db.session.query(
+            Appointment.data_horario, Appointment.end_time
+        ).filter(
+            Appointment.status.in_(BUSY_STATUSES),
+            Appointment.data_horario >= window_start,
+            Appointment.data_horario < window_end
+        ).order_by(Appointment.data_horario).all()
+
+        taken_by_day = defaultdict(list)
+        for start, end in taken_intervals:
+            taken_by_day[start.date()].append((start, end))
+
+        for day in sorted(missing_days):
+            start_time_limit, end_time_limit = business_hours(day)
+
+            # Mesmo critério da consulta por dia: só agendamentos iniciados no expediente
+            day_intervals = [
+                interval for interval in taken_by_day.get(day, [])
+                if interval[0] >= start_time_limit and interval[0] < end_time_limit
+            ]
+
+            for service in services:
+                if (service.id, day) in full_day_slots:
+                    continue
+                free_slots = compute_free_slots(
+                    start_time_limit, end_time_limit, service.duracao_minutos, day_intervals
+                )
+                slots = [slot.strftime('%H:%M') for slot in free_slots]
+                # Leituras da réplica podem estar atrasadas: não entram no cache compartilhado
+                if not db.session().reads_from_replica():
+                    availability_cache.set(service.id, day, slots, day_version(day))
+                full_day_slots[service.id, day] = slots
 
-Atenciosamente,
-Sua Equipe de Agendamentos.
-"""
-    
-    try:
-        mail.send(msg)
-        print(f"DEBUG: Email enviado com sucesso para {appointment.user.email} (Assunto: {subject})")
-    except Exception as e:
-        print(f"ERRO CRÍTICO AO ENVIAR EMAIL: Verifique a configuração SMTP. Erro: {e}")
+    # 3. Ignora horários no passado para o dia atual
+    now = datetime.now()
+    result = {service.id: {} for service in services}
+    for day in days:
+        for service in services:
+            slots = full_day_slots[service.id, day]
+            result[service.id][day] = drop_past_slots(slots, now) if day == now.date() else slots
+
+    return result
+
+
+def get_available_slots(service_id, date_obj, versions=None):
+    """Calcula e retorna todos os slots disponíveis de um serviço em um dia."""
+    day = date_obj.date()
+    slots_by_service = get_available_slots_range([service_id], day, day, versions)
+    return slots_by_service.get(service_id, {}).get(day, [])
 
 
 # ----------------------------------------------------
-# 📌 3. FUNÇÕES AUXILIARES (has_conflict e get_available_slots)
+# 📌 3. ROTA DE API PARA CALCULAR SLOTS DISPONÍVEIS
 # ----------------------------------------------------
-
-def has_conflict(service_id, desired_start_time, appointment_id_to_exclude=None):
+@bp.route('/api/available_slots', methods=['GET'])
+@login_required
+@use_replica
+def api_available_slots():
     """
-    Verifica se o horário desejado conflita com agendamentos existentes, 
-    excluindo um agendamento específico.
+    Endpoint chamado pelo JavaScript para obter os slots disponíveis.
+
+    - Um dia:        ?service_id=1&date=2025-01-10
+    - Intervalo:     ?service_id=1&service_id=2&from=2025-01-06&to=2025-01-12
     """
-    service = Service.query.get(service_id)
-    if not service:
-        return False
-        
-    duration = service.duracao_minutos
-    desired_end_time = desired_start_time + timedelta(minutes=duration)
+    if request.args.get('from') or request.args.get('to'):
+        return api_available_slots_range()
 
-    start_of_day = datetime.combine(desired_start_time.date(), datetime.min.time())
-    end_of_day_exclusive = start_of_day + timedelta(days=1) 
+    service_id = request.args.get('service_id', type=int)
+    date_str = request.args.get('date')
 
-    # Filtra apenas agendamentos com status 'Agendado'
-    query = Appointment.query.join(Service).filter(
-        Appointment.data_horario >= start_of_day,
-        Appointment.data_horario < end_of_day_exclusive
-    ).filter(Appointment.status == 'Agendado')
-    
-    # Exclui o próprio agendamento (mantido para compatibilidade, embora não seja usado na rota 'book')
-    if appointment_id_to_exclude:
-        query = query.filter(Appointment.id != appointment_id_to_exclude)
-        
-    all_appointments_on_day = query.all()
-    
-    for existing_appointment in all_appointments_on_day:
-        existing_service_duration = existing_appointment.servico.duracao_minutos 
-        existing_start_time = existing_appointment.data_horario
-        existing_end_time = existing_start_time + timedelta(minutes=existing_service_duration)
+    if not service_id or not date_str:
+        return jsonify({'error': 'Missing service_id or date'}), 400
 
-        if desired_start_time < existing_end_time and desired_end_time > existing_start_time:
-            return True 
+    try:
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
 
-    return False
+    return conditional_json(
+        [service_id], [date_obj.date()],
+        lambda versions: {'available_slots': get_available_slots(service_id, date_obj, versions)}
+    )
 
 
-def get_available_slots(service_id, date_obj):
-    """Calcula e retorna todos os slots disponíveis de um serviço em um dia."""
-    
-    START_HOUR = 9
-    END_HOUR = 17 
+def api_available_slots_range():
+    """Responde a consulta de vários serviços/dias em um único JSON."""
+    service_ids = request.args.getlist('service_id', type=int)
+    from_str = request.args.get('from')
+    to_str = request.args.get('to')
 
-    service = Service.query.get(service_id)
-    if not service:
-        return []
+    if not service_ids or not from_str or not to_str:
+        return jsonify({'error': 'Missing service_id, from or to'}), 400
 
-    duration = service.duracao_minutos
-    
-    start_time_limit = datetime.combine(date_obj.date(), datetime.min.time().replace(hour=START_HOUR))
-    end_time_limit = datetime.combine(date_obj.date(), datetime.min.time().replace(hour=END_HOUR))
-
-    # 1. Busca agendamentos confirmados (status 'Agendado')
-    existing_appointments = Appointment.query.join(Service).filter(
-        Appointment.data_horario >= start_time_limit,
-        Appointment.data_horario < end_time_limit,
-        Appointment.status == 'Agendado'
-    ).all()
-
-    taken_intervals = []
-    for appt in existing_appointments:
-        appt_duration = appt.servico.duracao_minutos
-        start = appt.data_horario
-        end = start + timedelta(minutes=appt_duration)
-        taken_intervals.append((start, end))
-
-    available_slots = []
-    current_slot_start = start_time_limit
-
-    # Intervalo de iteração (30 minutos)
-    SLOT_INTERVAL = 30 
-    while current_slot_start < end_time_limit:
-        
-        # Ignora horários no passado para o dia atual
-        if date_obj.date() == datetime.now().date() and current_slot_start < datetime.now():
-            current_slot_start += timedelta(minutes=SLOT_INTERVAL)
-            continue
-            
-        potential_end_time = current_slot_start + timedelta(minutes=duration)
+    try:
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(to_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
 
-        if potential_end_time > end_time_limit:
-            break
+    if end_date < start_date:
+        return jsonify({'error': 'from must be before to'}), 400
 
-        # Verifica conflito
-        is_conflicting = False
-        for taken_start, taken_end in taken_intervals:
-            if current_slot_start < taken_end and potential_end_time > taken_start:
-                is_conflicting = True
-                break
-        
-        if not is_conflicting:
-            available_slots.append(current_slot_start.strftime('%H:%M'))
-        
-        current_slot_start += timedelta(minutes=SLOT_INTERVAL)
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        return jsonify({'error': f'Range limited to {MAX_RANGE_DAYS} days'}), 400
 
-    return available_slots
+    def build_payload(versions):
+        slots_by_service = get_available_slots_range(service_ids, start_date, end_date, versions)
+        return {
+            'from': start_date.isoformat(),
+            'to': end_date.isoformat(),
+            'available_slots': {
+                str(service_id): {day.isoformat(): slots for day, slots in days.items()}
+                for service_id, days in slots_by_service.items()
+            }
+        }
 
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    return conditional_json(service_ids, days, build_payload)
 
-# ----------------------------------------------------
-# 📌 4. ROTA DE API PARA CALCULAR SLOTS DISPONÍVEIS
-# ----------------------------------------------------
-@bp.route('/api/available_slots', methods=['GET'])
+
+@bp.route('/api/next_available', methods=['GET'])
 @login_required
-def api_available_slots():
-    """Endpoint chamado pelo JavaScript para obter os slots disponíveis."""
+@use_replica
+def api_next_available():
+    """
+    Retorna o primeiro horário livre de um serviço a partir de uma data.
+
+    ?service_id=1[&from=2025-01-10][&horizon=60]
+
+    A busca avança em blocos de NEXT_AVAILABLE_CHUNK_DAYS dias, cada bloco
+    resolvido por uma única consulta (ou pelo cache), e para no primeiro dia
+    com slot livre ou ao atingir o horizonte.
+    """
     service_id = request.args.get('service_id', type=int)
-    date_str = request.args.get('date')
+    from_str = request.args.get('from')
+    horizon = request.args.get('horizon', type=int) or current_app.config['NEXT_AVAILABLE_HORIZON_DAYS']
+    horizon = max(1, min(horizon, current_app.config['NEXT_AVAILABLE_MAX_HORIZON_DAYS']))
+    chunk_days = current_app.config['NEXT_AVAILABLE_CHUNK_DAYS']
 
-    if not service_id or not date_str:
-        return jsonify({'error': 'Missing service_id or date'}), 400
+    if not service_id:
+        return jsonify({'error': 'Missing service_id'}), 400
 
+    today = datetime.now().date()
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        start_date = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else today
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
+    start_date = max(start_date, today)
+    last_date = start_date + timedelta(days=horizon - 1)
 
-    slots = get_available_slots(service_id, date_obj)
-    
-    return jsonify({'available_slots': slots})
+    chunk_start = start_date
+    while chunk_start <= last_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), last_date)
+        slots_by_service = get_available_slots_range([service_id], chunk_start, chunk_end)
+
+        if service_id not in slots_by_service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        for day, slots in sorted(slots_by_service[service_id].items()):
+            if slots:
+                return jsonify({
+                    'service_id': service_id,
+                    'date': day.isoformat(),
+                    'time': slots[0],
+                    'available_slots': slots
+                })
+
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return jsonify({
+        'error': f'No available slot within {horizon} days',
+        'searched_until': last_date.isoformat()
+    }), 404
+
+
+def conditional_json(service_ids, days, build_payload):
+    """
+    GET condicional das APIs de disponibilidade.
+
+    O ETag é derivado das versões da agenda (dias consultados + global), lidas
+    em uma única consulta. Se o cliente já tem a versão atual, responde 304
+    sem executar o cálculo de slots; caso contrário monta o JSON com
+    build_payload(versions), calculado nessas mesmas versões, e envia
+    ETag/Last-Modified.
+    """
+    versions, last_modified = schedule_versions(days)
+    now = datetime.now()
+
+    parts = [','.join(str(service_id) for service_id in sorted(set(service_ids)))]
+    parts += [f'{scope}={version}' for scope, version in sorted(versions.items())]
+    parts += [day.isoformat() for day in days]
+    includes_today = now.date() in days
+    if includes_today:
+        # Os slots de hoje somem com o passar do tempo: a validade é de um minuto
+        parts.append(now.strftime('%H:%M'))
+    etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    not_modified = False
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified and not includes_today:
+        not_modified = last_modified.replace(microsecond=0) <= request.if_modified_since
+
+    response = Response(status=304) if not_modified else jsonify(build_payload(versions))
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Força o navegador a revalidar (barato) em vez de reutilizar sem perguntar
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 # ----------------------------------------------------
-# 📌 5. ROTAS DE CLIENTE
+# 📌 4. ROTAS DE CLIENTE
 # ----------------------------------------------------
 
 ## --- ROTA DE AGENDAMENTO (Cliente) ---
@@ -187,8 +314,8 @@ def api_available_slots():
 def book_appointment():
     """Permite ao cliente selecionar um serviço e agendar um horário."""
     
-    # 📌 FILTRA apenas serviços ATIVOS para clientes
-    services = Service.query.filter_by(is_active=True).all()
+    # 📌 FILTRA apenas serviços ATIVOS para clientes (em ordem de nome: idx_service_ativo_nome)
+    services = Service.query.filter_by(is_active=True).order_by(Service.nome.asc()).all()
     
     if request.method == 'POST':
         service_id = request.form.get('service_id', type=int)
@@ -208,6 +335,10 @@ def book_appointment():
             flash('Formato de dados inválido.', 'danger')
             return redirect(url_for('services.book_appointment'))
             
+        if not on_reservation_grid(desired_start_time):
+            flash(f'Escolha um horário em intervalos de {RESERVATION_GRANULARITY} minutos.', 'danger')
+            return redirect(url_for('services.book_appointment'))
+            
         # 2. Verificar se o horário já passou
         if desired_start_time < datetime.now() - timedelta(minutes=5): 
             flash('Não é possível agendar um horário no passado.', 'danger')
@@ -219,7 +350,7 @@ def book_appointment():
             flash('O horário selecionado não está disponível. Conflito detectado!', 'danger')
             return redirect(url_for('services.book_appointment'))
             
-        # 4. Criação do Agendamento
+        # 4. Criação do Agendamento + Reserva atômica das células de horário
         try:
             new_appointment = Appointment(
                 user_id=current_user.id,
@@ -227,28 +358,31 @@ def book_appointment():
                 data_horario=desired_start_time,
                 status='Agendado'
             )
+            new_appointment.refresh_end_time(selected_service.duracao_minutos)
+            # O lembrete é enviado pela varredura periódica (sweep_appointment_reminders)
+            reminder_pending = new_appointment.reset_reminder(current_app.config['REMINDER_LEAD_HOURS'])
             
             db.session.add(new_appointment)
-            db.session.commit()
+            db.session.flush() # Gera o id usado nas reservas
+            
+            # A UNIQUE das reservas decide quem fica com o horário se dois workers passarem pela checagem
+            reserve_slots(new_appointment)
+            bump_schedule_versions(desired_start_time.date())
             
-            # 5. Envio do Email de Confirmação Imediata (Síncrono)
-            send_appointment_email(
+            # 5. Email de Confirmação: gravado na caixa de saída, no mesmo commit do agendamento
+            queue_appointment_email(
                 appointment=new_appointment, 
                 subject="Confirmação de Agendamento Realizado", 
                 status='Confirmado'
             )
+            db.session.commit()
+            availability_cache.invalidate_days(desired_start_time.date())
+            from app.admin.dashboard import invalidate_dashboard_kpis  # import local: evita import circular com app.services
+            invalidate_dashboard_kpis()
+            dispatch_outbox()
             
-            # 6. AGENDAMENTO DO LEMBRETE CELERY (24 HORAS ANTES)
-            reminder_time = desired_start_time - timedelta(hours=24)
-            
-            if reminder_time > datetime.now():
-                # NOTE: Calcular o 'countdown' antes do Agendamento
-                countdown_seconds = (reminder_time - datetime.now()).total_seconds()
-                
-                send_appointment_reminder.apply_async(
-                    args=[new_appointment.id], 
-                    countdown=countdown_seconds # Agendado para 24 horas antes
-                )
+            # 6. Lembrete: fica pendente para a varredura periódica do Celery beat
+            if reminder_pending:
                 flash_message = f'Agendamento realizado com sucesso para {desired_start_time.strftime("%d/%m/%Y às %H:%M")}! O lembrete foi agendado.'
             else:
                 flash_message = f'Agendamento realizado com sucesso para {desired_start_time.strftime("%d/%m/%Y às %H:%M")}! (Lembrete não agendado, pois está muito próximo ou no passado).'
@@ -256,6 +390,11 @@ def book_appointment():
             flash(flash_message, 'success')
             return redirect(url_for('services.my_appointments'))
             
+        except IntegrityError:
+            # Outra requisição concorrente reservou o mesmo horário primeiro
+            db.session.rollback()
+            flash('O horário selecionado acabou de ser reservado. Escolha outro horário.', 'danger')
+            return redirect(url_for('services.book_appointment'))
         except Exception as e:
             db.session.rollback()
             print(f"Erro ao salvar agendamento: {e}")
@@ -272,6 +411,7 @@ def book_appointment():
 ## --- ROTA: MEUS AGENDAMENTOS (Cliente) ---
 @bp.route('/my_appointments')
 @login_required
+@use_replica
 def my_appointments():
     """Visualiza todos os agendamentos do usuário logado."""
     appointments = Appointment.query.filter_by(user_id=current_user.id)\
@@ -303,18 +443,24 @@ def cancel_appointment(appointment_id):
         # Redireciona para onde o usuário estava
         return redirect(url_for('services.my_appointments'))
     
+    # Um concluído cancelado sai do faturamento consolidado
+    if appointment.status == COMPLETED_STATUS:
+        revert_completion(appointment)
     appointment.status = 'Cancelado'
-    db.session.commit()
+    release_slots(appointment)
+    bump_schedule_versions(appointment.data_horario.date())
     
-    # Envio de email de cancelamento
-    try:
-        send_appointment_email(
-            appointment=appointment, 
-            subject="CANCELAMENTO de Agendamento", 
-            status='Cancelado'
-        )
-    except Exception as e:
-        print(f"AVISO: Falha ao enviar email de cancelamento: {e}") 
+    # Email de cancelamento: gravado na caixa de saída, no mesmo commit
+    queue_appointment_email(
+        appointment=appointment, 
+        subject="CANCELAMENTO de Agendamento", 
+        status='Cancelado'
+    )
+    db.session.commit()
+    availability_cache.invalidate_days(appointment.data_horario.date())
+    from app.admin.dashboard import invalidate_dashboard_kpis  # import local: evita import circular com app.services
+    invalidate_dashboard_kpis()
+    dispatch_outbox()
 
     flash('Agendamento cancelado com sucesso. Notificação enviada.', 'info')
     
@@ -1,51 +1,288 @@
 # app/tasks.py
 
 # Importa a instância Celery, Mail e DB que definimos em app/__init__.py
-from app.__init__ import celery, mail, db
+from app import celery, mail, db
 from flask_mail import Message
 # Importa o modelo de Agendamento (Appointment) e outros que você usa para obter o cliente
-from app.models import Appointment, User 
-from datetime import datetime
+from app.models import Appointment, User, EmailOutbox
+from app.services.availability import BUSY_STATUSES
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, or_, tuple_
+from sqlalchemy.orm import joinedload
+import uuid
+
+def build_reminder_message(appointment):
+    """Monta a mensagem de lembrete (assunto, destinatário e corpo)."""
+    msg = Message(
+        f'Lembrete: Seu Agendamento no Smart Agenda ({appointment.servico.nome})',
+        recipients=[appointment.user.email]
+    )
+    msg.body = (
+        f"Olá, {appointment.user.nome},\n\n"
+        f"Este é um lembrete do seu agendamento:\n"
+        f"Serviço: {appointment.servico.nome}\n"
+        f"Data e Hora: {appointment.data_horario.strftime('%d/%m/%Y às %H:%M')}\n\n"
+        f"Aguardamos você. Se precisar cancelar, por favor, faça-o através do sistema.\n"
+    )
+    return msg
+
+
+# ----------------------------------------------------
+# 📌 LEMBRETES VERSIONADOS (idempotentes)
+# ----------------------------------------------------
+# Cada lembrete é identificado por (agendamento, lembrete_versao). O
+# reagendamento incrementa a versão, então uma tarefa antiga ainda na fila
+# encontra outra versão e termina sem abrir conexão SMTP (não é preciso
+# revogá-la). O envio só acontece após marcar o lembrete com um UPDATE
+# condicional, então tarefas repetidas não geram e-mails duplicados.
+
+
+def _claim_reminders(items, lead_hours, max_attempts):
+    """
+    Marca em um único UPDATE os lembretes ainda válidos (e com menos de
+    max_attempts falhas) entre os informados e os carrega já com usuário e
+    serviço (uma consulta com JOIN).
+
+    items: pares (appointment_id, versao). Sem versão (tarefas com countdown
+    antigas), o lembrete só sai se o agendamento já estiver na janela, o que
+    impede o envio para um horário que foi reagendado.
+    """
+    now = datetime.now()
+    versioned = [(appt_id, versao) for appt_id, versao in items if versao is not None]
+    unversioned = [appt_id for appt_id, versao in items if versao is None]
+
+    matches = []
+    if versioned:
+        matches.append(tuple_(Appointment.id, Appointment.lembrete_versao).in_(versioned))
+    if unversioned:
+        matches.append(Appointment.id.in_(unversioned))
+    if not matches:
+        return []
+
+    db.session.execute(
+        update(Appointment)
+        .where(
+            or_(*matches),
+            Appointment.lembrete_enviado_em.is_(None),
+            Appointment.lembrete_tentativas < max_attempts,
+            Appointment.status.in_(BUSY_STATUSES),
+            Appointment.data_horario > now,
+            Appointment.data_horario <= now + timedelta(hours=lead_hours)
+        )
+        .values(lembrete_enviado_em=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    appointment_ids = [appt_id for appt_id, _ in items]
+    return Appointment.query.options(
+        joinedload(Appointment.user), joinedload(Appointment.servico)
+    ).filter(
+        Appointment.id.in_(appointment_ids),
+        Appointment.lembrete_enviado_em == now
+    ).order_by(Appointment.data_horario).all()
+
+
+def _deliver_reminders(items):
+    """
+    Envia os lembretes válidos por uma única conexão SMTP. Retorna quantos saíram.
+    Cada falha conta uma tentativa; após REMINDER_MAX_ATTEMPTS o lembrete não
+    é mais tentado (como na caixa de saída, ver _mark_failed).
+    """
+    config = current_app.config
+    max_attempts = config.get('REMINDER_MAX_ATTEMPTS', 5)
+    batch = _claim_reminders(items, config.get('REMINDER_LEAD_HOURS', 24), max_attempts)
+    if not batch:
+        return 0
+
+    sent_ids = set()
+    try:
+        with mail.connect() as conn:
+            for appointment in batch:
+                try:
+                    conn.send(build_reminder_message(appointment))
+                    sent_ids.add(appointment.id)
+                except Exception as e:
+                    print(f"ERRO Celery: Falha ao enviar lembrete do agendamento {appointment.id}. Erro: {e}")
+    except Exception as e:
+        # Falha de conexão: o que não saiu volta a ficar pendente
+        print(f"ERRO Celery: Falha na conexão SMTP ao enviar lembretes. Erro: {e}")
+
+    failed = [appointment for appointment in batch if appointment.id not in sent_ids]
+    if failed:
+        # Reabre apenas as marcações feitas por esta tarefa, contando a falha
+        db.session.execute(
+            update(Appointment)
+            .where(
+                Appointment.id.in_([appointment.id for appointment in failed]),
+                Appointment.lembrete_enviado_em == failed[0].lembrete_enviado_em
+            )
+            .values(lembrete_enviado_em=None, lembrete_tentativas=Appointment.lembrete_tentativas + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        for appointment in failed:
+            if appointment.lembrete_tentativas + 1 >= max_attempts:
+                print(f"ERRO Celery: Lembrete do agendamento {appointment.id} abandonado após {max_attempts} tentativas.")
+
+    return len(sent_ids)
+
+
+@celery.task
+def send_appointment_reminder(appointment_id, versao=None):
+    """
+    Envia o lembrete de um único agendamento, se a versão ainda for a atual.
+    Sem versão (tarefas com countdown enfileiradas antes da varredura
+    periódica), só envia se o agendamento já estiver na janela do lembrete.
+    """
+    return _deliver_reminders([(appointment_id, versao)])
+
+
+@celery.task
+def send_appointment_reminders_batch(items):
+    """
+    Variante em lote: recebe pares [appointment_id, versao], carrega todos os
+    agendamentos (com usuário e serviço) em uma consulta e envia por uma
+    única conexão SMTP. Retorna o número de lembretes enviados.
+    """
+    return _deliver_reminders([tuple(item) for item in items])
+
+
+# ----------------------------------------------------
+# 📌 VARREDURA PERIÓDICA DE LEMBRETES (celery beat)
+# ----------------------------------------------------
+@celery.task
+def sweep_appointment_reminders():
+    """
+    Seleciona em uma consulta (índice lembrete_enviado_em + data_horario) os
+    agendamentos que entraram na janela de REMINDER_LEAD_HOURS horas e os
+    distribui em tarefas send_appointment_reminders_batch de
+    REMINDER_BATCH_SIZE. Substitui as tarefas com countdown por agendamento:
+    o tamanho da fila não cresce mais com a antecedência dos agendamentos.
+    Lembretes que falharem voltam a ficar pendentes e entram na próxima
+    varredura, até REMINDER_MAX_ATTEMPTS tentativas. Retorna o número de
+    lembretes despachados.
+    """
+    config = current_app.config
+    batch_size = config.get('REMINDER_BATCH_SIZE', 100)
+    lead_hours = config.get('REMINDER_LEAD_HOURS', 24)
+    max_attempts = config.get('REMINDER_MAX_ATTEMPTS', 5)
+
+    now = datetime.now()
+    due = db.session.query(Appointment.id, Appointment.lembrete_versao).filter(
+        Appointment.lembrete_enviado_em.is_(None),
+        Appointment.lembrete_tentativas < max_attempts,
+        Appointment.data_horario > now,
+        Appointment.data_horario <= now + timedelta(hours=lead_hours),
+        Appointment.status.in_(BUSY_STATUSES)
+    ).order_by(Appointment.data_horario).all()
+
+    for offset in range(0, len(due), batch_size):
+        chunk = [[appt_id, versao] for appt_id, versao in due[offset:offset + batch_size]]
+        send_appointment_reminders_batch.delay(chunk)
+
+    return len(due)
+
+
+# ----------------------------------------------------
+# 📌 DRENAGEM DA CAIXA DE SAÍDA (Outbox em lotes)
+# ----------------------------------------------------
+def _claim_outbox_batch(batch_size, lease_seconds):
+    """
+    Reserva um lote de e-mails pendentes vencidos com um único UPDATE.
+    A reserva expira após lease_seconds, então um worker que morrer no meio
+    do envio não prende as mensagens para sempre.
+    """
+    now = datetime.now()
+    token = uuid.uuid4().hex
+
+    due_ids = db.session.query(EmailOutbox.id).filter(
+        EmailOutbox.status == 'Pendente',
+        EmailOutbox.proxima_tentativa <= now,
+        or_(EmailOutbox.reservado_ate.is_(None), EmailOutbox.reservado_ate < now)
+    ).order_by(EmailOutbox.proxima_tentativa, EmailOutbox.id).limit(batch_size)
+
+    # A condição de reserva é repetida no UPDATE: se outro worker pegou a
+    # mesma linha entre a subconsulta e a escrita, ela não é reservada aqui.
+    db.session.execute(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id.in_(due_ids.scalar_subquery()),
+            or_(EmailOutbox.reservado_ate.is_(None), EmailOutbox.reservado_ate < now)
+        )
+        .values(reserva_token=token, reservado_ate=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return EmailOutbox.query.filter_by(reserva_token=token).order_by(EmailOutbox.id).all()
+
 
 @celery.task
-def send_appointment_reminder(appointment_id):
-    """
-    Tarefa Celery agendada para enviar um e-mail de lembrete 24h antes do agendamento.
-    A tarefa roda dentro do contexto da aplicação (graças à configuração no __init__.py).
-    """
-    
-    # 1. Busca o agendamento no banco de dados
-    # db.session.get é preferível para buscar pelo ID primário
-    appointment = db.session.get(Appointment, appointment_id)
-    
-    # 2. Verifica se o agendamento existe e não foi cancelado
-    if appointment and appointment.status != 'Cancelado':
-        
-        # O try/except é importante em tarefas de fundo para registrar falhas
+def drain_email_outbox():
+    """
+    Envia os e-mails pendentes da caixa de saída em lotes, reaproveitando uma
+    única conexão SMTP (mail.connect()) por lote. Falhas voltam para a fila
+    com backoff exponencial até OUTBOX_MAX_ATTEMPTS tentativas.
+    Retorna o número de e-mails enviados.
+    """
+    config = current_app.config
+    batch_size = config.get('OUTBOX_BATCH_SIZE', 50)
+    max_attempts = config.get('OUTBOX_MAX_ATTEMPTS', 5)
+    retry_base = config.get('OUTBOX_RETRY_BASE_SECONDS', 60)
+    lease_seconds = config.get('OUTBOX_LEASE_SECONDS', 300)
+
+    sent_total = 0
+    while True:
+        batch = _claim_outbox_batch(batch_size, lease_seconds)
+        if not batch:
+            break
+
+        pending = list(batch)
         try:
-            # Assumindo que:
-            # - appointment.user é o objeto do cliente
-            # - appointment.servico é o objeto do serviço
-            
-            # Monta a Mensagem de E-mail
-            msg = Message(
-                f'Lembrete: Seu Agendamento no Smart Agenda ({appointment.servico.nome})',
-                recipients=[appointment.user.email], 
-                # Se você configurou SENDER_EMAIL no config.py, use-o aqui
-                sender="seu_email@dominio.com" 
-            )
-            msg.body = (
-                f"Olá, {appointment.user.nome},\n\n"
-                f"Este é um lembrete do seu agendamento:\n"
-                f"Serviço: {appointment.servico.nome}\n"
-                f"Data e Hora: {appointment.data_horario.strftime('%d/%m/%Y às %H:%M')}\n\n"
-                f"Aguardamos você. Se precisar cancelar, por favor, faça-o através do sistema.\n"
-            )
-            
-            # Envia o E-mail usando a instância do Flask-Mail
-            mail.send(msg)
-            print(f"Lembrete (ID {appointment_id}) enviado com sucesso para: {appointment.user.email}")
-            
+            with mail.connect() as conn:
+                while pending:
+                    message = pending[0]
+                    try:
+                        conn.send(Message(
+                            message.assunto,
+                            recipients=[message.destinatario],
+                            body=message.corpo
+                        ))
+                    except Exception as e:
+                        # Erro de um destinatário não derruba o lote inteiro
+                        _mark_failed(message, e, max_attempts, retry_base)
+                    else:
+                        message.status = 'Enviado'
+                        message.enviado_em = datetime.now()
+                        sent_total += 1
+                    message.reserva_token = None
+                    message.reservado_ate = None
+                    pending.pop(0)
         except Exception as e:
-            # Em caso de erro (ex: falha de conexão SMTP, e-mail inválido, etc.)
-            print(f"ERRO Celery: Falha ao enviar email de lembrete para agendamento {appointment_id}. Erro: {e}")
\ No newline at end of file
+            # Falha de conexão: o restante do lote volta para a fila com backoff
+            print(f"ERRO Celery: Falha na conexão SMTP ao drenar a caixa de saída. Erro: {e}")
+            for message in pending:
+                _mark_failed(message, e, max_attempts, retry_base)
+                message.reserva_token = None
+                message.reservado_ate = None
+
+        db.session.commit()
+
+        if len(batch) < batch_size:
+            break
+
+    return sent_total
+
+
+def _mark_failed(message, error, max_attempts, retry_base):
+    """Registra a falha e agenda a próxima tentativa (backoff exponencial)."""
+    message.tentativas += 1
+    message.ultimo_erro = str(error)[:500]
+    if message.tentativas >= max_attempts:
+        message.status = 'Falhou'
+        print(f"ERRO Celery: E-mail {message.id} para {message.destinatario} descartado após {message.tentativas} tentativas.")
+    else:
+        delay = retry_base * (2 ** (message.tentativas - 1))
+        message.proxima_tentativa = datetime.now() + timedelta(seconds=delay)
@@ -0,0 +1,193 @@
+# app/utils.py
+
+import base64
+import json
+import unicodedata
+from collections import namedtuple
+from datetime import date, datetime
+from types import SimpleNamespace
+from sqlalchemy import Date, cast, func, insert, literal, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+
+# Dialetos com INSERT ... ON CONFLICT DO UPDATE (upsert atômico em um comando)
+NATIVE_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def upsert(table, rows, index_elements, set_):
+    """
+    Insere as linhas ou, se já existir uma com as mesmas index_elements
+    (nomes das colunas da chave única), aplica o SET de set_(excluded), um
+    dicionário coluna -> expressão em que excluded.<coluna> é o valor que
+    seria inserido. As linhas são gravadas na ordem recebida.
+
+    SQLite e PostgreSQL usam o ON CONFLICT DO UPDATE nativo. Nos demais
+    dialetos cada linha vira um UPDATE e, se nenhuma existir, um INSERT num
+    SAVEPOINT; se outra transação inserir a mesma chave antes, o INSERT
+    falha e o UPDATE é repetido.
+    """
+    rows = [rows] if isinstance(rows, dict) else list(rows)
+    native_insert = NATIVE_UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if native_insert is not None:
+        stmt = native_insert(table).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded)))
+        return
+
+    for row in rows:
+        excluded = SimpleNamespace(**{name: literal(value, table.c[name].type) for name, value in row.items()})
+        update_row = update(table).where(
+            *[table.c[name] == row[name] for name in index_elements]
+        ).values(set_(excluded))
+        if db.session.execute(update_row).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(table).values(row))
+        except IntegrityError:
+            db.session.execute(update_row)
+
+
+def prefix_bounds(prefix):
+    """
+    Converte uma busca por prefixo em um intervalo [início, fim) que o banco
+    resolve com uma busca no índice (col >= 'mar' AND col < 'mas'), ao
+    contrário de LIKE 'mar%', que no SQLite não usa índice por padrão.
+    Retorna None para prefixo vazio.
+    """
+    if not prefix:
+        return None
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search_key(text):
+    """
+    Chave de busca de um texto: minúsculas e sem acentos ('Érica' -> 'erica').
+    Calculada em Python porque o lower() do SQLite só converte ASCII; é a
+    forma gravada em User.nome_busca e a do termo buscado.
+    """
+    decomposed = unicodedata.normalize('NFD', (text or '').strip().lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_email(email):
+    """E-mail na forma gravada e comparada: sem espaços nas pontas e em minúsculas."""
+    return (email or '').strip().lower()
+
+
+DATE_BUCKETS = ('day', 'week', 'month')
+
+
+def date_bucket(column, unit='day'):
+    """
+    Expressão SQL que trunca uma coluna de data/hora para o início do dia,
+    da semana (segunda-feira) ou do mês, para uso em GROUP BY.
+    CAST(... AS DATE) e date_trunc não existem no SQLite (afinidade numérica),
+    então cada dialeto usa as suas funções.
+    """
+    if unit not in DATE_BUCKETS:
+        raise ValueError(f'Agrupamento de data inválido: {unit!r}.')
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        if unit == 'week':
+            # Próximo domingo (ou o próprio) menos 6 dias = segunda-feira da semana
+            return func.date(column, 'weekday 0', '-6 days')
+        if unit == 'month':
+            return func.date(column, 'start of month')
+        return func.date(column)
+    return cast(func.date_trunc(unit, column), Date)
+
+
+def day_of(column):
+    """Expressão SQL com a data (sem hora) de uma coluna DateTime."""
+    return date_bucket(column, 'day')
+
+
+# ----------------------------------------------------
+# 📌 PAGINAÇÃO POR CHAVE (Keyset / Seek)
+# ----------------------------------------------------
+# Em vez de OFFSET (que lê e descarta todas as linhas anteriores), cada página
+# começa exatamente após a última chave vista: WHERE (a, b) > (:a, :b).
+# O custo por página é constante, seja a primeira ou a milésima.
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor'])
+
+
+def encode_cursor(values):
+    """Serializa os valores da chave de ordenação em um cursor opaco (seguro para URL)."""
+    payload = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+# Tipos JSON aceitos no cursor para cada tipo Python de coluna (datas vêm como texto ISO)
+JSON_TYPES = {int: int, float: (int, float), str: str}
+
+
+def decode_cursor(cursor, sort_columns):
+    """Reconstrói os valores da chave a partir do cursor; ValueError se for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor de paginação inválido.') from e
+    if not isinstance(payload, list) or len(payload) != len(sort_columns):
+        raise ValueError('Cursor de paginação inválido.')
+
+    values = []
+    for column, value in zip(sort_columns, payload):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type in JSON_TYPES and not isinstance(value, JSON_TYPES[python_type]):
+                # JSON válido, mas de outro tipo (ex: [123, 1] numa chave de texto)
+                raise TypeError(f'{type(value).__name__} em vez de {python_type.__name__}')
+        except (TypeError, ValueError) as e:
+            raise ValueError('Cursor de paginação inválido.') from e
+        values.append(value)
+    return tuple(values)
+
+
+def keyset_paginate(query, sort_columns, per_page, after=None, before=None, descending=False):
+    """
+    Executa uma página de 'query' ordenada por sort_columns (a última deve ser
+    única, ex: o id) com uma única consulta LIMIT per_page + 1.
+
+    after/before: cursores recebidos de uma página anterior (próxima/anterior).
+    descending: ordem da listagem (ex: histórico do mais recente ao mais antigo).
+    Retorna KeysetPage(items, next_cursor, prev_cursor); cursores ausentes são None.
+    Cursores inválidos levantam ValueError.
+    """
+    backwards = before is not None
+    cursor = before if backwards else after
+    key_values = decode_cursor(cursor, sort_columns) if cursor else None
+
+    # Ao voltar uma página a ordem é invertida e o resultado desinvertido no final
+    ascending = descending == backwards
+    if key_values is not None:
+        key = tuple_(*sort_columns)
+        bound = tuple_(*[literal(value, column.type) for column, value in zip(sort_columns, key_values)])
+        query = query.filter(key > bound if ascending else key < bound)
+
+    order = [column.asc() if ascending else column.desc() for column in sort_columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows, None, None)
+
+    def cursor_for(row):
+        return encode_cursor([getattr(row, column.key) for column in sort_columns])
+
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else key_values is not None
+    return KeysetPage(
+        rows,
+        cursor_for(rows[-1]) if has_next else None,
+        cursor_for(rows[0]) if has_prev else None,
+    )
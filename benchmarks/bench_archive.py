@@ -0,0 +1,171 @@
+# benchmarks/bench_archive.py
+"""
+Benchmark do arquivamento do histórico (app/archive.py).
+
+Popula um SQLite temporário com anos de agendamentos (passados concluídos
+ou cancelados, futuros agendados) e mede, antes e depois de
+'archive_appointments':
+
+  - as consultas quentes da agenda: ocupação de um dia, conflito de horário
+    e "meus agendamentos" de um cliente frequente;
+  - o relatório de faturamento recente (só tabela quente) e de todo o
+    período (tabela quente + arquivo);
+  - o tamanho da tabela appointment e dos seus índices (via dbstat);
+  - a vazão do arquivamento e o lote mais lento (tempo com a escrita presa).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_archive.py --years 5 --per-day 60 --older-than 365
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.archive import archive_batch  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.exports import billing_statement  # noqa: E402
+from app.models import Appointment, Service, User  # noqa: E402
+from app.services.availability import BUSY_STATUSES, has_conflict  # noqa: E402
+
+USERS = 500
+FUTURE_DAYS = 60
+
+
+def build_app(years, per_day):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    app = create_app(BenchConfig)
+    now = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(nome=f'Cliente {i}', email=f'c{i}@bench.local', senha_hash='x') for i in range(USERS)])
+        db.session.add(Service(nome='Corte', descricao='Bench', preco=50, duracao_minutos=30))
+        db.session.commit()
+
+        first_day = now - timedelta(days=int(years * 365))
+        rows = []
+        for day in range((now - first_day).days + FUTURE_DAYS):
+            day_start = first_day + timedelta(days=day)
+            for i in range(per_day):
+                moment = day_start + timedelta(minutes=(i * 480) // per_day)
+                if moment >= now:
+                    status = 'Agendado'
+                else:
+                    status = 'Cancelado' if (day + i) % 7 == 0 else 'Concluído'
+                rows.append({'data_horario': moment, 'end_time': moment + timedelta(minutes=30),
+                             'status': status, 'user_id': 1 + (day * per_day + i) % USERS, 'service_id': 1,
+                             'valor_cobrado': 50.0 if status == 'Concluído' else None,
+                             'created_at': moment, 'lembrete_versao': 0})
+            if len(rows) >= 50000:
+                db.session.execute(Appointment.__table__.insert(), rows)
+                db.session.commit()
+                rows = []
+        if rows:
+            db.session.execute(Appointment.__table__.insert(), rows)
+            db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return app, now, first_day
+
+
+def avg_ms(fn, repeat=50):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def appointment_size_mb():
+    """Páginas da tabela appointment e dos seus índices (None se o SQLite não tem dbstat)."""
+    try:
+        pages = db.session.execute(text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name = 'appointment' "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'appointment')"
+        )).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+    return pages / 1024 / 1024
+
+
+def measure(now, first_day):
+    tomorrow = now + timedelta(days=1)
+    day_end = tomorrow + timedelta(hours=9)
+
+    def busy_day():
+        db.session.query(Appointment.data_horario, Appointment.end_time).filter(
+            Appointment.status.in_(BUSY_STATUSES),
+            Appointment.data_horario >= tomorrow,
+            Appointment.data_horario < day_end
+        ).all()
+
+    def my_appointments():
+        Appointment.query.filter_by(user_id=1).order_by(Appointment.data_horario.asc()).all()
+
+    def billing(start):
+        return lambda: db.session.execute(billing_statement(start, now)).all()
+
+    return {
+        'ocupação do dia': avg_ms(busy_day),
+        'conflito de horário': avg_ms(lambda: has_conflict(1, tomorrow + timedelta(hours=2))),
+        'meus agendamentos': avg_ms(my_appointments),
+        'faturamento 30 dias': avg_ms(billing(now - timedelta(days=30)), repeat=10),
+        'faturamento completo': avg_ms(billing(first_day), repeat=2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--per-day', type=int, default=60)
+    parser.add_argument('--older-than', type=int, default=365)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    app, now, first_day = build_app(args.years, args.per_day)
+    with app.app_context():
+        total_rows = db.session.query(Appointment).count()
+        size_before = appointment_size_mb()
+        before = measure(now, first_day)
+
+        cutoff = now - timedelta(days=args.older_than)
+        moved, slowest = 0, 0.0
+        started = time.perf_counter()
+        while True:
+            batch_started = time.perf_counter()
+            count = archive_batch(cutoff, args.batch_size)
+            slowest = max(slowest, time.perf_counter() - batch_started)
+            moved += count
+            if count < args.batch_size:
+                break
+        elapsed = time.perf_counter() - started
+
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        size_after = appointment_size_mb()
+        after = measure(now, first_day)
+
+    print(f"{total_rows} agendamentos; {moved} arquivados em {elapsed:.1f} s "
+          f"({moved / elapsed:,.0f}/s, lote mais lento {slowest * 1000:.0f} ms)")
+    if size_before is not None:
+        print(f"appointment + índices: {size_before:.1f} MB -> {size_after:.1f} MB")
+    print(f"{'consulta':<24}{'antes (ms)':>12}{'depois (ms)':>13}")
+    for name in before:
+        print(f"{name:<24}{before[name]:>12.2f}{after[name]:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_availability.py
+"""
+Benchmark do cálculo de slots disponíveis.
+
+Compara o laço aninhado original de get_available_slots (slots × agendamentos)
+com o motor sweep-line de app/services/availability.py em dias sintéticos de
+10 a 10.000 agendamentos, conferindo que ambos retornam os mesmos horários.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_availability.py
+"""
+
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app.services.availability import business_hours, compute_free_slots  # noqa: E402
+
+SIZES = (10, 100, 1000, 10000)
+DURATIONS = (15, 30, 45, 60, 90)
+
+
+def legacy_free_slots(start_time_limit, end_time_limit, duration, taken_intervals):
+    """Reprodução fiel do laço original de get_available_slots."""
+    available_slots = []
+    current_slot_start = start_time_limit
+    while current_slot_start < end_time_limit:
+        potential_end_time = current_slot_start + timedelta(minutes=duration)
+        if potential_end_time > end_time_limit:
+            break
+        is_conflicting = False
+        for taken_start, taken_end in taken_intervals:
+            if current_slot_start < taken_end and potential_end_time > taken_start:
+                is_conflicting = True
+                break
+        if not is_conflicting:
+            available_slots.append(current_slot_start.strftime('%H:%M'))
+        current_slot_start += timedelta(minutes=30)
+    return available_slots
+
+
+def synthetic_day(n, day_start, day_end, rng):
+    """Gera n intervalos ocupados espalhados pelo expediente (com sobreposições)."""
+    minutes = int((day_end - day_start).total_seconds() // 60)
+    intervals = []
+    for _ in range(n):
+        start = day_start + timedelta(minutes=rng.randrange(0, minutes, 5))
+        intervals.append((start, start + timedelta(minutes=rng.choice(DURATIONS))))
+    return intervals
+
+
+def late_day(n, day_start, day_end, rng):
+    """
+    Dia com n agendamentos concentrados na última hora do expediente: os slots
+    da manhã ficam livres e o laço original percorre a lista inteira para cada um.
+    """
+    intervals = []
+    for _ in range(n):
+        start = day_end - timedelta(minutes=rng.randrange(5, 60, 5))
+        intervals.append((start, start + timedelta(minutes=rng.choice(DURATIONS))))
+    return intervals
+
+
+def main():
+    rng = random.Random(42)
+    day_start, day_end = business_hours(datetime(2030, 1, 7))
+    duration = 30
+
+    print(f"{'cenário':<10}{'agendamentos':>14}{'original (ms)':>16}{'sweep (ms)':>14}{'ganho':>10}")
+    for label, builder in (('denso', lambda n: synthetic_day(n, day_start, day_end, rng)),
+                           ('tarde', lambda n: late_day(n, day_start, day_end, rng))):
+        for n in SIZES:
+            # A rota entrega os intervalos já ordenados (ORDER BY data_horario pelo índice)
+            taken = sorted(builder(n))
+
+            expected = legacy_free_slots(day_start, day_end, duration, taken)
+            got = [s.strftime('%H:%M') for s in compute_free_slots(day_start, day_end, duration, taken)]
+            assert got == expected, f"Divergência com {n} agendamentos ({label})"
+
+            runs = max(1, 2000 // n)
+            legacy = timeit.timeit(lambda: legacy_free_slots(day_start, day_end, duration, taken), number=runs) / runs
+            sweep = timeit.timeit(lambda: compute_free_slots(day_start, day_end, duration, taken), number=runs) / runs
+            print(f"{label:<10}{n:>14}{legacy * 1000:>16.3f}{sweep * 1000:>14.3f}{legacy / sweep:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+# benchmarks/bench_backfill.py
+"""
+Benchmark (e verificação) dos backfills em lotes das migrações
+(migrations/backfill.py) sobre um banco sintético grande.
+
+Cria um SQLite temporário no esquema anterior à primeira migração (user,
+service e appointment sem as colunas adicionadas depois), com --rows
+agendamentos, e roda 'flask db upgrade' num subprocesso:
+
+  1. interrompe a migração com SIGKILL após --interrupt-after segundos
+     (queda no meio de um backfill) e mostra o ponto salvo em
+     backfill_checkpoint;
+  2. roda 'flask db upgrade' de novo, que retoma do ponto salvo;
+  3. confere o resultado: versão na head, nenhuma linha sem preenchimento
+     (created_at, end_time, lembrete_enviado_em, valor_cobrado), índice de
+     busca e daily_revenue completos, backfill_checkpoint removida.
+
+Durante as duas execuções, uma conexão à parte grava uma linha a cada 50 ms
+e mede quanto esperou pelo lock de escrita: é o que a aplicação sentiria
+com a migração rodando.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_backfill.py --rows 1000000 --batch-size 5000 --sleep 0.02 --interrupt-after 12
+    python benchmarks/bench_backfill.py --directory /tmp/migracoes_antigas --interrupt-after 0
+"""
+
+import argparse
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+USERS = 2000
+SERVICES = [('Corte', 50.0, 30), ('Barba', 35.0, 20), ('Coloração', 120.0, 90), ('Escova', 60.0, 45)]
+STATUSES = ['Concluído'] * 6 + ['Cancelado', 'Agendado']
+
+# 📌 Esquema anterior a a64ffa28ec58 (a primeira revisão não cria as tabelas)
+BASE_SCHEMA = """
+    CREATE TABLE "user" (
+        id INTEGER NOT NULL PRIMARY KEY, nome VARCHAR(100) NOT NULL, email VARCHAR(120) NOT NULL UNIQUE,
+        senha_hash VARCHAR(256) NOT NULL, is_admin BOOLEAN
+    );
+    CREATE TABLE service (
+        id INTEGER NOT NULL PRIMARY KEY, nome VARCHAR(100) NOT NULL, descricao VARCHAR(255),
+        preco FLOAT NOT NULL, duracao_minutos INTEGER NOT NULL
+    );
+    CREATE TABLE appointment (
+        id INTEGER NOT NULL PRIMARY KEY, data_horario DATETIME NOT NULL, status VARCHAR(50),
+        user_id INTEGER NOT NULL REFERENCES "user" (id), service_id INTEGER NOT NULL REFERENCES service (id)
+    );
+    CREATE INDEX ix_appointment_data_horario ON appointment (data_horario);
+    CREATE TABLE bench_heartbeat (id INTEGER PRIMARY KEY, gravado_em FLOAT);
+"""
+
+
+def build_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.executescript(BASE_SCHEMA)
+    conn.executemany('INSERT INTO "user" (id, nome, email, senha_hash, is_admin) VALUES (?, ?, ?, ?, 0)',
+                     [(i, f'Cliente {i}', f'c{i}@bench.local', 'x') for i in range(1, USERS + 1)])
+    conn.executemany('INSERT INTO service (id, nome, descricao, preco, duracao_minutos) VALUES (?, ?, ?, ?, ?)',
+                     [(i, nome, 'Bench', preco, duracao) for i, (nome, preco, duracao) in enumerate(SERVICES, 1)])
+
+    rng = random.Random(25)
+    first_day = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) - timedelta(days=3 * 365)
+    batch = []
+    for i in range(1, rows + 1):
+        moment = first_day + timedelta(days=i * 4 * 365 // rows, minutes=(i * 5) % (11 * 60))
+        batch.append((i, moment.strftime('%Y-%m-%d %H:%M:%S.%f'), rng.choice(STATUSES),
+                      rng.randint(1, USERS), rng.randint(1, len(SERVICES))))
+        if len(batch) == 100000:
+            conn.executemany('INSERT INTO appointment VALUES (?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO appointment VALUES (?, ?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.close()
+
+
+class Writer(threading.Thread):
+    """Grava uma linha a cada 'interval' s e registra a espera de cada gravação."""
+
+    def __init__(self, path, interval=0.05):
+        super().__init__(daemon=True)
+        self.conn = sqlite3.connect(path, timeout=600, check_same_thread=False)
+        self.interval = interval
+        self.waits = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.perf_counter()
+            self.conn.execute('INSERT INTO bench_heartbeat (gravado_em) VALUES (?)', (time.time(),))
+            self.conn.commit()
+            self.waits.append(time.perf_counter() - started)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.conn.close()
+
+
+def upgrade(env, directory, interrupt_after):
+    """Roda 'flask db upgrade'; com interrupt_after > 0, mata o processo depois desse tempo."""
+    command = [sys.executable, '-m', 'flask', 'db', 'upgrade']
+    if directory:
+        command += ['--directory', directory]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True)
+    try:
+        output, _ = process.communicate(timeout=interrupt_after or None)
+        killed = False
+    except subprocess.TimeoutExpired:
+        process.send_signal(signal.SIGKILL)
+        output, _ = process.communicate()
+        killed = True
+    elapsed = time.perf_counter() - started
+    if not killed and process.returncode:
+        sys.exit(f'flask db upgrade falhou:\n{output}')
+    return elapsed, killed, output
+
+
+def checkpoints(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT nome, ultima_chave FROM backfill_checkpoint').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def verify(path):
+    """(descrição, valor obtido, valor esperado) de cada conferência."""
+    conn = sqlite3.connect(path)
+    scalar = lambda sql: conn.execute(sql).fetchone()[0]  # noqa: E731
+    total = scalar('SELECT count(*) FROM appointment')
+    completed = scalar("SELECT count(*) FROM appointment WHERE status = 'Concluído'")
+    checks = [
+        ('sem created_at', scalar('SELECT count(*) FROM appointment WHERE created_at IS NULL'), 0),
+        ('end_time errado', scalar(
+            'SELECT count(*) FROM appointment a JOIN service s ON s.id = a.service_id '
+            'WHERE a.end_time IS NULL OR abs(julianday(a.end_time) - julianday(a.data_horario) '
+            '- s.duracao_minutos / 1440.0) > 1e-6'), 0),
+        ('passados sem lembrete_enviado_em', scalar(
+            "SELECT count(*) FROM appointment WHERE lembrete_enviado_em IS NULL "
+            "AND data_horario <= datetime('now', 'localtime')"), 0),
+        ('concluídos sem valor_cobrado', scalar(
+            "SELECT count(*) FROM appointment WHERE status = 'Concluído' AND valor_cobrado IS NULL"), 0),
+        ('documentos no índice de busca', scalar('SELECT count(*) FROM search_index'),
+         total + USERS + len(SERVICES)),
+        ('concluídos em daily_revenue', scalar('SELECT sum(quantidade) FROM daily_revenue'), completed),
+        ('backfill_checkpoint', scalar(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'backfill_checkpoint'"), 0),
+    ]
+    conn.close()
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, help='padrão: BACKFILL_BATCH_SIZE')
+    parser.add_argument('--sleep', type=float, help='padrão: BACKFILL_SLEEP_SECONDS')
+    parser.add_argument('--interrupt-after', type=float, default=12,
+                        help='segundos até matar a primeira execução (0 = sem interrupção)')
+    parser.add_argument('--directory', help='diretório de migrações (padrão: migrations/)')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    started = time.perf_counter()
+    build_database(path, args.rows)
+    print(f'{args.rows} agendamentos no esquema inicial em {time.perf_counter() - started:.1f} s')
+
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{path}', FLASK_APP='run.py')
+    if args.batch_size is not None:
+        env['BACKFILL_BATCH_SIZE'] = str(args.batch_size)
+    if args.sleep is not None:
+        env['BACKFILL_SLEEP_SECONDS'] = str(args.sleep)
+    env.setdefault('CELERY_BROKER_URL', 'memory://')
+    env.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+    writer = Writer(path)
+    writer.start()
+    runs = []
+    elapsed, killed, output = upgrade(env, args.directory, args.interrupt_after)
+    runs.append(elapsed)
+    if killed:
+        print(f'1ª execução interrompida após {elapsed:.1f} s; checkpoint: {checkpoints(path)}')
+        elapsed, _, output = upgrade(env, args.directory, 0)
+        runs.append(elapsed)
+        resumed = [line.split('] ', 1)[-1] for line in output.splitlines() if 'retomando' in line]
+        print(f'2ª execução concluída em {elapsed:.1f} s; {"; ".join(resumed) or "nenhum backfill retomado"}')
+    writer.stop()
+
+    waits = sorted(writer.waits)
+    print(f'upgrade completo: {sum(runs):.1f} s no total')
+    print(f'escritas concorrentes: {len(waits)}, espera p50 {waits[len(waits) // 2] * 1000:.0f} ms, '
+          f'p99 {waits[int(len(waits) * 0.99)] * 1000:.0f} ms, máxima {waits[-1] * 1000:.0f} ms')
+
+    failed = False
+    for name, value, expected in verify(path):
+        ok = value == expected
+        failed |= not ok
+        print(f"  {'ok ' if ok else 'ERRO'} {name}: {value} (esperado {expected})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/bench_db_profile.py
+"""
+Benchmark dos perfis do SQLite (app/database.py) no caminho do agendamento.
+
+Sobe N processos (como N workers do gunicorn), cada um com a própria
+aplicação e conexões, sobre o MESMO arquivo SQLite, e durante alguns
+segundos cada processo alterna leituras de disponibilidade
+(GET /services/api/available_slots, sem cache) e agendamentos
+(POST /services/book em horários distintos). Compara:
+
+  - padrão: journal em rollback (DELETE), synchronous=FULL, sem mmap;
+  - wal:    journal_mode=WAL, synchronous=NORMAL, mmap, busy_timeout.
+
+Reporta leituras/s, escritas/s e falhas (ex: 'database is locked') e, à
+parte, o custo isolado de um commit do caminho de agendamento (o upsert de
+schedule_version), onde a diferença de fsync entre os perfis aparece sem o
+custo do Flask. Use --dir para pôr o banco no mesmo disco da produção.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_db_profile.py --workers 4 --seconds 10 --reads-per-write 4 --dir /var/lib/app
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Service, User  # noqa: E402
+from app.services.availability import bump_schedule_versions  # noqa: E402
+
+PROFILES = {
+    'padrão': {'SQLITE_WAL': False, 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_MMAP_SIZE': 0},
+    'wal': {'SQLITE_WAL': True, 'SQLITE_SYNCHRONOUS': 'NORMAL', 'SQLITE_MMAP_SIZE': 256 * 1024 * 1024},
+}
+
+
+def build_app(db_path, profile):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        WTF_CSRF_ENABLED = False
+        MAIL_SUPPRESS_SEND = True
+        # Leituras sempre no banco, para medir o SQLite e não o cache
+        AVAILABILITY_CACHE_BACKEND = 'null'
+
+    for key, value in PROFILES[profile].items():
+        setattr(BenchConfig, key, value)
+    return create_app(BenchConfig)
+
+
+def seed(db_path, profile, n_workers):
+    app = build_app(db_path, profile)
+    with app.app_context():
+        db.create_all()
+        service = Service(nome='Corte', descricao='Bench', preco=50, duracao_minutos=30, is_active=True)
+        db.session.add(service)
+        for i in range(n_workers):
+            user = User(nome=f'Cliente {i}', email=f'cliente{i}@bench.local')
+            user.set_password('senha')
+            db.session.add(user)
+        db.session.commit()
+        return service.id
+
+
+def worker(db_path, profile, index, service_id, seconds, reads_per_write, start_at, results):
+    app = build_app(db_path, profile)
+    client = app.test_client()
+    client.post('/auth/login', data={'email': f'cliente{index}@bench.local', 'password': 'senha'})
+
+    reads = writes = failures = 0
+    base_day = datetime.now().date() + timedelta(days=1 + index * 5000)
+    slot = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+
+    while time.time() < deadline:
+        day = base_day + timedelta(days=slot // 16)
+        for _ in range(reads_per_write):
+            response = client.get(f'/services/api/available_slots?service_id={service_id}&date={day:%Y-%m-%d}')
+            if response.status_code == 200:
+                reads += 1
+            else:
+                failures += 1
+
+        moment = datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=30 * (slot % 16))
+        response = client.post('/services/book', data={
+            'service_id': service_id, 'date': f'{moment:%Y-%m-%d}', 'time': f'{moment:%H:%M}'
+        })
+        # Sucesso redireciona para my_appointments; falha de banco vira flash de erro/500
+        if response.status_code == 302 and 'my_appointments' in response.headers.get('Location', ''):
+            writes += 1
+        else:
+            failures += 1
+        slot += 1
+
+    results.put((reads, writes, failures))
+
+
+def commit_cost(directory, profile, n_commits):
+    """Média (ms) de um commit com o upsert de versão da agenda, sem HTTP."""
+    db_path = os.path.join(tempfile.mkdtemp(dir=directory), 'commits.db')
+    app = build_app(db_path, profile)
+    with app.app_context():
+        db.create_all()
+        day = datetime.now().date()
+        started = time.perf_counter()
+        for i in range(n_commits):
+            bump_schedule_versions(day + timedelta(days=i % 30))
+            db.session.commit()
+        return (time.perf_counter() - started) / n_commits * 1000
+
+
+def run_profile(directory, profile, n_workers, seconds, reads_per_write):
+    db_path = os.path.join(tempfile.mkdtemp(dir=directory), 'bench.db')
+    service_id = seed(db_path, profile, n_workers)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + 3  # tempo para todos os processos subirem
+    processes = [
+        ctx.Process(target=worker, args=(db_path, profile, i, service_id, seconds, reads_per_write, start_at, results))
+        for i in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = [sum(values) for values in zip(*[results.get() for _ in processes])]
+    for process in processes:
+        process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--reads-per-write', type=int, default=4)
+    parser.add_argument('--commits', type=int, default=500)
+    parser.add_argument('--dir', default=None, help='Diretório dos bancos temporários (padrão: o do sistema).')
+    args = parser.parse_args()
+
+    print(f"{args.workers} processos, {args.seconds:.0f} s, {args.reads_per_write} leituras por agendamento")
+    print(f"{'perfil':<10}{'leituras/s':>12}{'escritas/s':>12}{'falhas':>8}{'ms/commit':>12}")
+    for profile in PROFILES:
+        reads, writes, failures = run_profile(args.dir, profile, args.workers, args.seconds, args.reads_per_write)
+        per_commit = commit_cost(args.dir, profile, args.commits)
+        print(f"{profile:<10}{reads / args.seconds:>12.1f}{writes / args.seconds:>12.1f}{failures:>8}{per_commit:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
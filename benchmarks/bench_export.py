@@ -0,0 +1,112 @@
+# benchmarks/bench_export.py
+"""
+Benchmark da exportação em streaming (app/exports.py).
+
+Popula um SQLite temporário com agendamentos e mede, para tamanhos
+crescentes, o pico de memória Python (tracemalloc) e o tempo de:
+
+  - exportação em streaming (select só de colunas + yield_per, CSV/NDJSON);
+  - materialização ORM (Appointment.query.all() com cliente e serviço),
+    como a página HTML fazia.
+
+O pico do streaming deve ficar constante; o do ORM cresce com as linhas.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_export.py --sizes 10000 100000 500000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.exports import appointments_statement, export_chunks  # noqa: E402
+from app.models import Appointment, Service, User  # noqa: E402
+
+
+def build_app():
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        users = [User(nome=f'Cliente {i}', email=f'cliente{i}@bench.local', senha_hash='x') for i in range(500)]
+        services = [Service(nome=f'Serviço {i}', descricao='Bench', preco=50 + i, duracao_minutos=30) for i in range(10)]
+        db.session.add_all(users + services)
+        db.session.commit()
+    return app
+
+
+def grow_to(app, target):
+    """Completa a tabela de agendamentos até 'target' linhas."""
+    with app.app_context():
+        current = db.session.query(Appointment).count()
+        start = datetime(2024, 1, 1, 9)
+        chunk = 50000
+        for offset in range(current, target, chunk):
+            rows = []
+            for i in range(offset, min(offset + chunk, target)):
+                moment = start + timedelta(minutes=30 * i)
+                rows.append({'data_horario': moment, 'end_time': moment + timedelta(minutes=30),
+                             'status': 'Concluído', 'user_id': i % 500 + 1, 'service_id': i % 10 + 1,
+                             'created_at': moment, 'lembrete_versao': 0})
+            db.session.execute(Appointment.__table__.insert(), rows)
+            db.session.commit()
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--skip-orm-above', type=int, default=300000,
+                        help='Não roda a materialização ORM acima deste tamanho.')
+    args = parser.parse_args()
+
+    app = build_app()
+    print(f"{'linhas':>10}{'modo':>14}{'tempo (s)':>12}{'pico (MB)':>12}")
+    for size in sorted(args.sizes):
+        grow_to(app, size)
+        with app.app_context():
+            for fmt in ('csv', 'ndjson'):
+                def stream():
+                    written = 0
+                    for chunk in export_chunks(appointments_statement(), fmt):
+                        written += len(chunk)  # descarta, como um socket faria
+                elapsed, peak = measure(stream)
+                print(f"{size:>10}{fmt:>14}{elapsed:>12.2f}{peak:>12.1f}")
+
+            if size <= args.skip_orm_above:
+                def materialize():
+                    rows = Appointment.query.options(
+                        joinedload(Appointment.user), joinedload(Appointment.servico)
+                    ).all()
+                    return len(rows)
+                elapsed, peak = measure(materialize)
+                db.session.expunge_all()
+                print(f"{size:>10}{'orm .all()':>14}{elapsed:>12.2f}{peak:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
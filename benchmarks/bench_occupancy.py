@@ -0,0 +1,113 @@
+# benchmarks/bench_occupancy.py
+"""
+Benchmark do mapa de ocupação (app/admin/analytics.py).
+
+Popula um SQLite temporário com anos de agendamentos e mede, para tamanhos
+crescentes, o tempo de:
+
+  - leitura dos intervalos para arrays NumPy (load_intervals);
+  - acumulação vetorizada na matriz dia da semana × faixa;
+  - acumulação com laço Python por agendamento e por faixa, para comparação.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_occupancy.py --sizes 50000 200000 500000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+import numpy as np  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.admin.analytics import load_intervals, occupied_minutes_matrix, utilization_heatmap  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Appointment, Service, User  # noqa: E402
+
+SLOT = 30
+
+
+def build_app():
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(nome='Cliente', email='cliente@bench.local', senha_hash='x'))
+        db.session.add(Service(nome='Corte', descricao='Bench', preco=50, duracao_minutos=30))
+        db.session.commit()
+    return app
+
+
+def grow_to(app, target, start):
+    """Completa a tabela até 'target' agendamentos, distribuídos no expediente desde 'start'."""
+    with app.app_context():
+        current = db.session.query(Appointment).count()
+        chunk = 50000
+        for offset in range(current, target, chunk):
+            rows = []
+            for i in range(offset, min(offset + chunk, target)):
+                # 16 faixas de 30 min por dia, 09:00-17:00
+                moment = start + timedelta(days=i // 16, minutes=SLOT * (i % 16))
+                duration = (30, 60, 90)[i % 3]
+                rows.append({'data_horario': moment, 'end_time': moment + timedelta(minutes=duration),
+                             'status': 'Concluído', 'user_id': 1, 'service_id': 1,
+                             'created_at': moment, 'lembrete_versao': 0})
+            db.session.execute(Appointment.__table__.insert(), rows)
+            db.session.commit()
+
+
+def python_loop(starts, ends):
+    """Acumulação ingênua: um laço por agendamento e por faixa tocada."""
+    matrix = [[0] * (24 * 60 // SLOT) for _ in range(7)]
+    for start, end in zip(starts.astype(datetime), ends.astype(datetime)):
+        day_end = datetime.combine(start.date(), datetime.min.time()) + timedelta(days=1)
+        end = min(end, day_end)
+        cursor = start
+        while cursor < end:
+            slot_end = cursor.replace(minute=cursor.minute - cursor.minute % SLOT) + timedelta(minutes=SLOT)
+            step_end = min(slot_end, end)
+            slot = (cursor.hour * 60 + cursor.minute) // SLOT
+            matrix[cursor.weekday()][slot] += int((step_end - cursor).total_seconds() // 60)
+            cursor = step_end
+    return matrix
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50000, 200000, 500000])
+    args = parser.parse_args()
+
+    app = build_app()
+    start = datetime(2015, 1, 5, 9)
+    print(f"{'linhas':>10}{'anos':>7}{'leitura (s)':>13}{'numpy (s)':>11}{'total (s)':>11}{'laço py (s)':>13}")
+    for size in sorted(args.sizes):
+        grow_to(app, size, start)
+        end = start + timedelta(days=size // 16 + 1)
+        with app.app_context():
+            load_time, (starts, ends) = timed(lambda: load_intervals(start, end))
+            numpy_time, matrix = timed(lambda: occupied_minutes_matrix(starts, ends))
+            total_time, _ = timed(lambda: utilization_heatmap(start, end))
+            loop_time, reference = timed(lambda: python_loop(starts, ends))
+            assert (np.array(reference) == matrix).all()
+            years = (end - start).days / 365
+            print(f"{size:>10}{years:>7.1f}{load_time:>13.3f}{numpy_time:>11.4f}{total_time:>11.3f}{loop_time:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
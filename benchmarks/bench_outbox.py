@@ -0,0 +1,193 @@
+# benchmarks/bench_outbox.py
+"""
+Benchmark da caixa de saída de e-mails (outbox) contra um SMTP local.
+
+Sobe um servidor aiosmtpd em 127.0.0.1 com um atraso artificial no
+handshake (simulando um provedor SMTP remoto) e compara:
+
+  1. Latência de POST /services/book: envio síncrono (mail.send dentro da
+     requisição, comportamento antigo) vs. gravação na caixa de saída.
+  2. Vazão da entrega: uma conexão SMTP por mensagem (mail.send em laço)
+     vs. drain_email_outbox, que reaproveita uma conexão por lote.
+
+Requer o aiosmtpd (dependência apenas de desenvolvimento):
+    pip install aiosmtpd
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_outbox.py --bookings 40 --messages 300 --handshake-ms 150
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import SMTP  # noqa: E402
+from flask_mail import Message  # noqa: E402
+
+from app import create_app, db, mail  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import EmailOutbox, Service, User  # noqa: E402
+import app.notifications as notifications  # noqa: E402
+from app.tasks import drain_email_outbox  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+class SlowHandshakeController(Controller):
+    """Controller cujo banner de boas-vindas demora handshake_ms (custo por conexão)."""
+
+    def __init__(self, handler, handshake_ms, **kwargs):
+        self.handshake_ms = handshake_ms
+        super().__init__(handler, **kwargs)
+
+    def factory(self):
+        delay = self.handshake_ms / 1000
+
+        class SlowSMTP(SMTP):
+            async def _handle_client(self):
+                await asyncio.sleep(delay)
+                await super()._handle_client()
+
+        return SlowSMTP(self.handler, **self.SMTP_kwargs)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def build_app(port):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        WTF_CSRF_ENABLED = False
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = port
+        MAIL_USE_TLS = False
+        MAIL_USE_SSL = False
+        MAIL_USERNAME = None
+        MAIL_PASSWORD = None
+        MAIL_DEFAULT_SENDER = 'bench@bench.local'
+        OUTBOX_BATCH_SIZE = 100
+
+    # Broker em memória: tarefas disparadas pelas rotas (ex: lembrete) só são
+    # enfileiradas; a drenagem medida roda no próprio processo via .apply()
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(nome='Cliente', email='cliente@bench.local')
+        user.set_password('senha')
+        service = Service(nome='Corte', descricao='Bench', preco=50, duracao_minutos=30, is_active=True)
+        db.session.add_all([user, service])
+        db.session.commit()
+        return app, service.id
+
+
+def bench_booking(app, service_id, n_bookings, synchronous):
+    """Mede a latência de agendamentos em dias distintos (sem conflito entre si)."""
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'cliente@bench.local', 'password': 'senha'})
+
+    original_dispatch = notifications.dispatch_outbox
+    if synchronous:
+        # Comportamento antigo: a requisição paga o SMTP antes de responder
+        def dispatch_inline():
+            drain_email_outbox.apply()
+        notifications.dispatch_outbox = dispatch_inline
+    else:
+        # A drenagem fica com o worker Celery; a requisição só grava a linha
+        notifications.dispatch_outbox = lambda: None
+
+    import app.services.routes as services_routes
+    services_routes.dispatch_outbox = notifications.dispatch_outbox
+
+    offset = 100 if synchronous else 1000
+    latencies = []
+    try:
+        for i in range(n_bookings):
+            day = (datetime.now() + timedelta(days=offset + i)).strftime('%Y-%m-%d')
+            started = time.perf_counter()
+            client.post('/services/book', data={'service_id': service_id, 'date': day, 'time': '10:00'})
+            latencies.append(time.perf_counter() - started)
+    finally:
+        notifications.dispatch_outbox = original_dispatch
+        services_routes.dispatch_outbox = original_dispatch
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000  # noqa: E731
+    return pct(0.50), pct(0.99)
+
+
+def bench_delivery(app, n_messages):
+    with app.app_context():
+        EmailOutbox.query.delete()
+        db.session.commit()
+
+        started = time.perf_counter()
+        for i in range(n_messages):
+            mail.send(Message(f'Msg {i}', recipients=['cliente@bench.local'], body='corpo'))
+        per_message = time.perf_counter() - started
+
+        db.session.execute(EmailOutbox.__table__.insert(), [
+            {'destinatario': 'cliente@bench.local', 'assunto': f'Msg {i}', 'corpo': 'corpo',
+             'status': 'Pendente', 'tentativas': 0, 'proxima_tentativa': datetime.now()}
+            for i in range(n_messages)
+        ])
+        db.session.commit()
+
+        started = time.perf_counter()
+        sent = drain_email_outbox.apply().get()
+        batched = time.perf_counter() - started
+        return per_message, batched, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--handshake-ms', type=int, default=150)
+    args = parser.parse_args()
+
+    handler = CountingHandler()
+    controller = SlowHandshakeController(handler, args.handshake_ms, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    try:
+        app, service_id = build_app(controller.port)
+
+        print(f"Latência de POST /services/book ({args.bookings} agendamentos, handshake {args.handshake_ms} ms)")
+        print(f"{'modo':<20}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for label, synchronous in (('SMTP na requisição', True), ('caixa de saída', False)):
+            p50, p99 = bench_booking(app, service_id, args.bookings, synchronous)
+            print(f"{label:<20}{p50:>10.1f}{p99:>10.1f}")
+
+        print()
+        print(f"Entrega de {args.messages} mensagens")
+        per_message, batched, sent = bench_delivery(app, args.messages)
+        print(f"{'modo':<20}{'total (s)':>10}{'msg/s':>10}")
+        print(f"{'conexão por msg':<20}{per_message:>10.2f}{args.messages / per_message:>10.1f}")
+        print(f"{'drenagem em lote':<20}{batched:>10.2f}{sent / batched:>10.1f}")
+        print(f"\nMensagens recebidas pelo SMTP local: {handler.received}")
+    finally:
+        controller.stop()
+
+
+if __name__ == '__main__':
+    main()
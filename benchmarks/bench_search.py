@@ -0,0 +1,138 @@
+# benchmarks/bench_search.py
+"""
+Benchmark da busca textual (app/search.py): FTS5 vs. LIKE.
+
+Popula um SQLite temporário com clientes, serviços e agendamentos futuros
+e mede, para cada consulta, a latência média da busca pelo índice FTS5
+(ranqueada por bm25) e da busca por LIKE '%...%' nas tabelas de origem.
+Mede também o custo das triggers nas escritas (INSERT de agendamentos
+com e sem o índice).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_search.py --appointments 100000 --users 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Appointment, Service, User  # noqa: E402
+from app.search import create_search_index, search  # noqa: E402
+
+FIRST_NAMES = ['Maria', 'Ana', 'João', 'Pedro', 'Juliana', 'Carla', 'Lucas', 'Fernanda', 'Rafael', 'Beatriz',
+               'Marcos', 'Patrícia', 'Gustavo', 'Camila', 'Bruno', 'Larissa', 'Felipe', 'Aline', 'Diego', 'Renata']
+LAST_NAMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Nascimento',
+              'Lima', 'Araújo', 'Fernandes', 'Carvalho', 'Gomes', 'Martins', 'Rocha', 'Ribeiro', 'Barbosa']
+SERVICES = ['Corte', 'Coloração', 'Escova', 'Manicure', 'Pedicure', 'Hidratação', 'Luzes', 'Barba',
+            'Sobrancelha', 'Depilação', 'Maquiagem', 'Penteado', 'Progressiva', 'Massagem', 'Limpeza de Pele']
+
+# Termos frequentes (LIKE para cedo pelo LIMIT) e seletivos (LIKE varre tudo)
+QUERIES = ['maria corte', 'souza', 'fern', 'limpeza de pele', 'coloracao',
+           'cliente12345', 'patricia barbosa manicure', 'inexistente']
+
+
+def build_app(n_users, n_appointments):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    rng = random.Random(42)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {'nome': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', 'email': f'cliente{i}@bench.local',
+             'senha_hash': 'x', 'is_admin': False}
+            for i in range(n_users)
+        ])
+        db.session.execute(Service.__table__.insert(), [
+            {'nome': nome, 'descricao': f'Serviço de {nome.lower()}', 'preco': 50, 'duracao_minutos': 30,
+             'is_active': True}
+            for nome in SERVICES
+        ])
+        start = datetime.now() + timedelta(days=1)
+        db.session.execute(Appointment.__table__.insert(), [
+            {'data_horario': start + timedelta(minutes=30 * i), 'end_time': start + timedelta(minutes=30 * i + 30),
+             'status': 'Agendado', 'user_id': rng.randint(1, n_users), 'service_id': rng.randint(1, len(SERVICES)),
+             'created_at': start, 'lembrete_versao': 0}
+            for i in range(n_appointments)
+        ])
+        db.session.commit()
+    return app
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def bench_writes(n):
+    """Tempo de n INSERTs de agendamento, um commit cada, sem e com as triggers do índice."""
+    class WriteConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'writes.db')
+
+    app = create_app(WriteConfig)
+    timings = {}
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(nome='Maria Silva', email='maria@bench.local', senha_hash='x'),
+                            Service(nome='Corte', descricao='Corte', preco=50, duracao_minutos=30)])
+        db.session.commit()
+        for label in ('sem índice', 'com triggers'):
+            if label == 'com triggers':
+                create_search_index()
+            start = datetime(2030, 1, 1, 9) if label == 'sem índice' else datetime(2031, 1, 1, 9)
+            started = time.perf_counter()
+            for i in range(n):
+                moment = start + timedelta(minutes=30 * i)
+                db.session.add(Appointment(data_horario=moment, end_time=moment + timedelta(minutes=30),
+                                           status='Agendado', user_id=1, service_id=1))
+                db.session.commit()
+            timings[label] = (time.perf_counter() - started) / n * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--appointments', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--writes', type=int, default=500)
+    args = parser.parse_args()
+
+    app = build_app(args.users, args.appointments)
+    with app.app_context():
+        started = time.perf_counter()
+        create_search_index()
+        build = time.perf_counter() - started
+        docs = db.session.execute(text('SELECT count(*) FROM search_index')).scalar()
+        print(f"Índice FTS5: {docs} documentos criados em {build:.2f} s\n")
+
+        print(f"{'consulta':<28}{'FTS5 (ms)':>11}{'LIKE (ms)':>11}{'ganho':>8}   primeiro resultado (FTS5)")
+        for query in QUERIES:
+            fts_ms, (_, fts_results) = timed(lambda: search(query, engine='fts'), args.repeat)
+            like_ms, _ = timed(lambda: search(query, engine='like'), max(1, args.repeat // 4))
+            first = fts_results[0]['titulo'] if fts_results else '-'
+            print(f"{query:<28}{fts_ms:>11.2f}{like_ms:>11.2f}{like_ms / fts_ms:>7.0f}x   {first}")
+
+    print(f"\nCusto por INSERT de agendamento ({args.writes} commits)")
+    for label, ms in bench_writes(args.writes).items():
+        print(f"{label:<14}{ms:>8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
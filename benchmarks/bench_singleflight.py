@@ -0,0 +1,131 @@
+# benchmarks/bench_singleflight.py
+"""
+Benchmark da coalescência (single-flight) em /services/api/available_slots.
+
+Simula o pico de uma promoção: uma rajada de requisições idênticas
+(mesmo serviço e mesmo dia) disparadas ao mesmo tempo contra um único
+worker, com o cache de disponibilidade frio. Mede, com e sem single-flight,
+quantas consultas SQL chegam ao banco e a latência p50/p99. A contagem
+inclui a carga do usuário logado (Flask-Login), feita por toda requisição.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_singleflight.py --requests 200 --appointments 3000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Appointment, Service, User  # noqa: E402
+import app.services.routes as services_routes  # noqa: E402
+
+
+class PassThrough:
+    """Substituto sem coalescência: cada chamada executa a função."""
+
+    def do(self, key, fn):
+        return fn()
+
+
+def build_app(n_appointments):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+        WTF_CSRF_ENABLED = False
+        # Isola o efeito da coalescência: sem cache, toda requisição precisaria do banco
+        AVAILABILITY_CACHE_BACKEND = 'null'
+
+    app = create_app(BenchConfig)
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        user = User(nome='Cliente', email='cliente@bench.local')
+        user.set_password('senha')
+        service = Service(nome='Corte', descricao='Bench', preco=50, duracao_minutos=30, is_active=True)
+        db.session.add_all([user, service])
+        db.session.commit()
+
+        # Dia da rajada com muitos agendamentos (concentrados no fim do expediente)
+        day = datetime.combine((datetime.now() + timedelta(days=2)).date(), datetime.min.time())
+        rows = []
+        for i in range(n_appointments):
+            start = day + timedelta(hours=15, minutes=rng.randrange(0, 120, 5))
+            rows.append({'data_horario': start, 'end_time': start + timedelta(minutes=30),
+                         'status': 'Agendado', 'user_id': user.id, 'service_id': service.id,
+                         'created_at': datetime.now()})
+        db.session.execute(Appointment.__table__.insert(), rows)
+        db.session.commit()
+        return app, service.id, day.strftime('%Y-%m-%d')
+
+
+def burst(app, service_id, day, n_requests):
+    client = app.test_client()
+    client.post('/auth/login', data={'email': 'cliente@bench.local', 'password': 'senha'})
+    cookie = client.get_cookie('session').value
+
+    with app.app_context():
+        engine = db.engine
+    queries = [0]
+    lock = threading.Lock()
+
+    def count(*_):
+        with lock:
+            queries[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+
+    barrier = threading.Barrier(n_requests)
+    latencies = [0.0] * n_requests
+
+    def worker(i):
+        c = app.test_client()
+        c.set_cookie('session', cookie)
+        barrier.wait()
+        started = time.perf_counter()
+        c.get(f'/services/api/available_slots?service_id={service_id}&date={day}')
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_requests)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    event.remove(engine, 'before_cursor_execute', count)
+
+    latencies.sort()
+    pct = lambda p: latencies[min(n_requests - 1, int(n_requests * p))] * 1000  # noqa: E731
+    return queries[0], pct(0.50), pct(0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--appointments', type=int, default=3000)
+    args = parser.parse_args()
+
+    app, service_id, day = build_app(args.appointments)
+    single_flight = services_routes.availability_flight
+
+    print(f"{'modo':<16}{'requisições':>12}{'consultas SQL':>15}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for label, flight in (('sem coalescer', PassThrough()), ('single-flight', single_flight)):
+        services_routes.availability_flight = flight
+        queries, p50, p99 = burst(app, service_id, day, args.requests)
+        print(f"{label:<16}{args.requests:>12}{queries:>15}{p50:>10.1f}{p99:>10.1f}")
+    services_routes.availability_flight = single_flight
+
+
+if __name__ == '__main__':
+    main()
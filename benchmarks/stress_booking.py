@@ -0,0 +1,146 @@
+# benchmarks/stress_booking.py
+"""
+Teste de estresse do agendamento concorrente sobre SQLite.
+
+Dispara N requisições POST /services/book em paralelo (uma thread e um
+cliente por usuário), todas liberadas ao mesmo tempo por uma barreira:
+  1. todas para o MESMO horário  -> deve existir exatamente 1 agendamento;
+  2. cada uma para um horário diferente -> todas devem ser aceitas,
+     mostrando que a reserva não serializa agendamentos independentes.
+
+--race-window-ms alarga artificialmente o intervalo entre has_conflict e o
+commit (como um worker lento), para que todas as threads passem pela
+checagem antes de qualquer commit: sem a reserva atômica isso gera
+agendamentos duplos.
+
+Uso (na raiz do projeto):
+    python benchmarks/stress_booking.py --threads 32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+# Sem Redis/SMTP locais: fila em memória e e-mails suprimidos
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Appointment, Service, SlotReservation, User  # noqa: E402
+import app.services.routes as services_routes  # noqa: E402
+
+
+def widen_race_window(seconds):
+    """Faz has_conflict aguardar após a checagem, antes do INSERT/commit da rota."""
+    original = services_routes.has_conflict
+
+    def slow_has_conflict(*args, **kwargs):
+        result = original(*args, **kwargs)
+        time.sleep(seconds)
+        return result
+
+    services_routes.has_conflict = slow_has_conflict
+
+
+def build_app(db_path):
+    class StressConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        WTF_CSRF_ENABLED = False
+        MAIL_SUPPRESS_SEND = True
+
+    app = create_app(StressConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, n_users):
+    with app.app_context():
+        service = Service(nome='Corte', descricao='Estresse', preco=50, duracao_minutos=30, is_active=True)
+        db.session.add(service)
+        for i in range(n_users):
+            user = User(nome=f'Cliente {i}', email=f'cliente{i}@stress.local')
+            user.set_password('senha')
+            db.session.add(user)
+        db.session.commit()
+        return service.id
+
+
+def run_wave(app, service_id, n, slot_for):
+    """Executa n agendamentos simultâneos; slot_for(i) devolve (data, hora) da thread i."""
+    clients = []
+    for i in range(n):
+        client = app.test_client()
+        client.post('/auth/login', data={'email': f'cliente{i}@stress.local', 'password': 'senha'})
+        clients.append(client)
+
+    barrier = threading.Barrier(n)
+    latencies = [0.0] * n
+
+    def worker(i):
+        date_str, time_str = slot_for(i)
+        barrier.wait()
+        started = time.perf_counter()
+        clients[i].post('/services/book', data={'service_id': service_id, 'date': date_str, 'time': time_str})
+        latencies[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--race-window-ms', type=int, default=50)
+    args = parser.parse_args()
+    n = args.threads
+
+    if args.race_window_ms:
+        widen_race_window(args.race_window_ms / 1000)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+    app = build_app(db_path)
+    service_id = seed(app, n)
+
+    day = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+
+    # 1. Mesmo horário para todos
+    elapsed, _ = run_wave(app, service_id, n, lambda i: (day, '10:00'))
+    with app.app_context():
+        booked = Appointment.query.filter(
+            Appointment.data_horario == datetime.strptime(f'{day} 10:00', '%Y-%m-%d %H:%M')
+        ).count()
+    print(f"[mesmo horário] {n} requisições em {elapsed:.2f}s -> {booked} agendamento(s)")
+
+    # 2. Horários distintos (um dia por thread, para não esgotar o expediente)
+    def distinct_slot(i):
+        return (datetime.now() + timedelta(days=8 + i)).strftime('%Y-%m-%d'), '11:00'
+
+    elapsed, latencies = run_wave(app, service_id, n, distinct_slot)
+    with app.app_context():
+        accepted = Appointment.query.filter(Appointment.data_horario >= datetime.now() + timedelta(days=8)).count()
+        overlaps = db.session.query(SlotReservation.inicio).group_by(SlotReservation.inicio)\
+            .having(db.func.count() > 1).count()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"[horários distintos] {n} requisições em {elapsed:.2f}s -> {accepted} aceitos, p99 {p99 * 1000:.0f} ms")
+
+    assert booked == 1, f"Agendamento duplo detectado: {booked} agendamentos no mesmo horário"
+    assert accepted == n, f"Agendamentos independentes rejeitados: {accepted}/{n}"
+    assert overlaps == 0
+    print("OK: nenhum agendamento duplo.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# migrations/backfill.py
+"""
+Preenchimento de dados em lotes para as migrações (backfill online).
+
+Um UPDATE sobre a tabela inteira segura a escrita do banco (no SQLite, o
+banco todo) até terminar. Aqui a tabela é percorrida em faixas da chave
+(id > última AND id <= limite, via índice da chave primária), cada faixa na
+sua própria transação curta, com uma pausa opcional entre elas para as
+escritas da aplicação passarem:
+
+    backfill('appointment.created_at', 'appointment',
+             values={'created_at': agora},
+             where=sa.text('created_at IS NULL'))
+
+    chunked('appointment.end_time', appointment, preencher_faixa)
+
+O progresso de cada backfill (última chave concluída) fica na tabela
+backfill_checkpoint, gravado na mesma transação do lote: se a migração for
+interrompida, a próxima execução retoma da faixa seguinte. A linha é
+apagada ao terminar (e a tabela, quando não restam outras). As operações
+de esquema anteriores ao backfill já estão confirmadas quando ele começa,
+então devem tolerar a nova execução (ver column_exists).
+
+📌 Só para revisões novas: revisões já aplicadas em algum banco não são
+reescritas para usar estes helpers.
+
+Tamanho do lote e pausa vêm de BACKFILL_BATCH_SIZE / BACKFILL_SLEEP_SECONDS
+(app/config.py) e podem ser sobrescritos por chamada.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app
+
+logger = logging.getLogger('alembic.backfill')
+
+CHECKPOINT_TABLE = 'backfill_checkpoint'
+
+# Intervalo mínimo (s) entre duas mensagens de progresso
+PROGRESS_INTERVAL = 5.0
+
+_checkpoints = sa.Table(
+    CHECKPOINT_TABLE, sa.MetaData(),
+    sa.Column('nome', sa.String(120), primary_key=True),
+    sa.Column('ultima_chave', sa.BigInteger, nullable=False),
+    sa.Column('atualizado_em', sa.DateTime, nullable=False),
+)
+
+
+def column_exists(table, column):
+    """True se a coluna já existe (para repetir com segurança uma migração interrompida)."""
+    if op.get_context().as_sql:
+        return False
+    return column in {col['name'] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _as_table(table, key):
+    return sa.table(table, sa.column(key)) if isinstance(table, str) else table
+
+
+def _settings(batch_size, sleep):
+    config = current_app.config
+    if batch_size is None:
+        batch_size = config.get('BACKFILL_BATCH_SIZE', 5000)
+    if sleep is None:
+        sleep = config.get('BACKFILL_SLEEP_SECONDS', 0.0)
+    return batch_size, sleep
+
+
+@contextmanager
+def _transaction(conn):
+    """Transação explícita de um lote (a conexão está em autocommit dentro do bloco)."""
+    # SQLite: o lock de escrita é pedido já no início (IMMEDIATE), onde o
+    # busy_timeout espera por ele. Numa transação que lê e depois escreve, a
+    # promoção falharia na hora se outra conexão tivesse gravado no meio.
+    conn.exec_driver_sql('BEGIN IMMEDIATE' if conn.dialect.name == 'sqlite' else 'BEGIN')
+    try:
+        yield
+    except BaseException:
+        conn.exec_driver_sql('ROLLBACK')
+        raise
+    conn.exec_driver_sql('COMMIT')
+
+
+def _load_checkpoint(conn, name):
+    if not sa.inspect(conn).has_table(CHECKPOINT_TABLE):
+        return None
+    return conn.execute(
+        sa.select(_checkpoints.c.ultima_chave).where(_checkpoints.c.nome == name)
+    ).scalar()
+
+
+def _save_checkpoint(conn, name, last_key):
+    values = {'ultima_chave': last_key, 'atualizado_em': datetime.now()}
+    updated = conn.execute(_checkpoints.update().where(_checkpoints.c.nome == name).values(**values))
+    if not updated.rowcount:
+        conn.execute(_checkpoints.insert().values(nome=name, **values))
+
+
+def _clear_checkpoint(conn, name):
+    with _transaction(conn):
+        conn.execute(_checkpoints.delete().where(_checkpoints.c.nome == name))
+    remaining = conn.execute(sa.select(sa.func.count()).select_from(_checkpoints)).scalar()
+    if not remaining:
+        _checkpoints.drop(conn)
+
+
+def _report(name, done, total, started, final=False):
+    elapsed = time.monotonic() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    percent = done * 100 / total if total else 100.0
+    if final:
+        logger.info('%s: %d linhas em %.1f s (%.0f/s)', name, done, elapsed, rate)
+    else:
+        remaining = (total - done) / rate if rate else 0.0
+        logger.info('%s: %d/%d (%.0f%%), %.0f linhas/s, faltam ~%.0f s',
+                    name, done, total, percent, rate, remaining)
+
+
+def chunked(name, table, apply, key='id', batch_size=None, sleep=None):
+    """
+    Percorre 'table' (nome ou sa.table) em faixas de até batch_size linhas,
+    em ordem da chave inteira e única 'key', chamando apply(conn, inicio, fim)
+    para cada faixa inicio < key <= fim dentro de uma transação. apply faz o
+    seu próprio filtro e deve ser idempotente. 'name' identifica o progresso
+    salvo para a retomada. Retorna o número de linhas percorridas.
+    """
+    batch_size, sleep = _settings(batch_size, sleep)
+    table = _as_table(table, key)
+    key_column = table.c[key]
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        _checkpoints.create(conn, checkfirst=True)
+
+        last_key = _load_checkpoint(conn, name)
+        if last_key is not None:
+            logger.info('%s: retomando após %s = %s', name, key, last_key)
+        else:
+            first_key = conn.execute(sa.select(sa.func.min(key_column))).scalar()
+            last_key = first_key - 1 if first_key is not None else None
+
+        # As faixas seguem só a chave (índice da chave primária): um filtro
+        # aqui poderia levar o banco a outro índice e a ordenar a cada lote
+        total = 0
+        if last_key is not None:
+            total = conn.execute(
+                sa.select(sa.func.count()).select_from(table).where(key_column > last_key)
+            ).scalar()
+
+        done = 0
+        started = last_report = time.monotonic()
+        while done < total:
+            # Limite da faixa: a batch_size-ésima chave seguinte (ou a última que resta)
+            remaining = sa.select(key_column).where(key_column > last_key)
+            high = conn.execute(remaining.order_by(key_column).offset(batch_size - 1).limit(1)).scalar()
+            full = high is not None
+            if not full:
+                high = conn.execute(sa.select(sa.func.max(key_column))).scalar()
+
+            with _transaction(conn):
+                apply(conn, last_key, high)
+                _save_checkpoint(conn, name, high)
+            done = min(done + batch_size, total) if full else total
+            last_key = high
+
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                _report(name, done, total, started)
+                last_report = time.monotonic()
+            if sleep:
+                time.sleep(sleep)
+
+        _report(name, done, total, started, final=True)
+        _clear_checkpoint(conn, name)
+    return done
+
+
+def backfill(name, table, values, where=None, key='id', batch_size=None, sleep=None):
+    """
+    UPDATE table SET values WHERE where, em lotes pela chave (ver chunked).
+    Se 'values' depende do valor atual, 'where' deve excluir as linhas já
+    preenchidas (ex: coluna IS NULL) para o lote poder ser repetido.
+    No modo offline (--sql) emite um único UPDATE.
+    """
+    if isinstance(table, str):
+        table = sa.table(table, sa.column(key), *[sa.column(column) for column in values])
+    if op.get_context().as_sql:
+        op.execute(table.update().where(*([where] if where is not None else [])).values(values))
+        return None
+
+    # Dentro do lote o filtro vai num CASE, que nenhum índice atende: o banco
+    # segue pela faixa da chave primária em vez de um índice do filtro (ex:
+    # status), que o levaria a percorrer a tabela inteira a cada lote
+    conditions = [sa.case((where, 1)) == 1] if where is not None else []
+
+    def apply(conn, low, high):
+        conn.execute(
+            table.update()
+            .where(table.c[key] > low, table.c[key] <= high, *conditions)
+            .values(values)
+        )
+
+    return chunked(name, table, apply, key=key, batch_size=batch_size, sleep=sleep)
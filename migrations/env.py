@@ -1,4 +1,6 @@
 import logging
+import os
+import sys
 from logging.config import fileConfig
 
 from flask import current_app
@@ -14,6 +16,9 @@ config = context.config
 fileConfig(config.config_file_name)
 logger = logging.getLogger('alembic.env')
 
+# As revisões importam os helpers de migrations/backfill.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 
 def get_engine():
     try:
@@ -90,9 +95,18 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # A tabela FTS5 de busca (e as tabelas internas search_index_*) é criada
+    # por SQL na migração, fora dos modelos: o autogenerate não deve removê-la.
+    # Idem para backfill_checkpoint, que só existe durante um backfill
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'table' and (name.startswith('search_index')
+                                          or name == 'backfill_checkpoint'))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
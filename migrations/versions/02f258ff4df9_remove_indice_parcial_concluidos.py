@@ -0,0 +1,31 @@
+"""Remove o índice parcial de concluídos (o faturamento usa idx_appointment_status_periodo)
+
+Revision ID: 02f258ff4df9
+Revises: 959b7683a78a
+Create Date: 2026-10-17 22:41:52.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '02f258ff4df9'
+down_revision = '959b7683a78a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sem estatísticas (ANALYZE), o SQLite prefere status + período ao parcial;
+    # o índice só custava espaço e escrita a cada conclusão
+    op.drop_index('idx_appointment_concluido_data', table_name='appointment', if_exists=True)
+
+
+def downgrade():
+    # 📌 Sem batch_alter_table: recriar appointment no SQLite apagaria as triggers do índice de busca
+    op.create_index(
+        'idx_appointment_concluido_data', 'appointment', ['data_horario', 'id'], unique=False,
+        sqlite_where=sa.text("status = 'Concluído'"),
+        postgresql_where=sa.text("status = 'Concluído'")
+    )
@@ -0,0 +1,86 @@
+"""Cria a tabela slot_reservation para reserva atômica de horários
+
+Revision ID: 1f49537930c6
+Revises: 8032bf5ea0a7
+Create Date: 2026-10-17 10:02:17.554390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime, timedelta
+
+
+# revision identifiers, used by Alembic.
+revision = '1f49537930c6'
+down_revision = '8032bf5ea0a7'
+branch_labels = None
+depends_on = None
+
+# 📌 Mantidos em sincronia com app/services/availability.py
+BUSY_STATUSES = ('Agendado', 'Reagendado')
+RESERVATION_GRANULARITY = 5
+
+
+def _reservation_cells(start, end):
+    cell = start.replace(second=0, microsecond=0)
+    cell -= timedelta(minutes=cell.minute % RESERVATION_GRANULARITY)
+    while cell < end:
+        yield cell
+        cell += timedelta(minutes=RESERVATION_GRANULARITY)
+
+
+def upgrade():
+    op.create_table(
+        'slot_reservation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('inicio', sa.DateTime(), nullable=False),
+        sa.Column('appointment_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('inicio')
+    )
+    with op.batch_alter_table('slot_reservation', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_slot_reservation_appointment_id'), ['appointment_id'], unique=False)
+
+    # 📌 Reserva as células dos agendamentos futuros que ainda ocupam a agenda.
+    # Sobreposições herdadas do período sem reserva ficam com o agendamento mais antigo.
+    appointment = sa.table(
+        'appointment',
+        sa.column('id', sa.Integer),
+        sa.column('data_horario', sa.DateTime),
+        sa.column('end_time', sa.DateTime),
+        sa.column('status', sa.String),
+    )
+    slot_reservation = sa.table(
+        'slot_reservation',
+        sa.column('inicio', sa.DateTime),
+        sa.column('appointment_id', sa.Integer),
+    )
+
+    conn = op.get_bind()
+    start_of_today = datetime.combine(datetime.now().date(), datetime.min.time())
+    rows = conn.execute(
+        sa.select(appointment.c.id, appointment.c.data_horario, appointment.c.end_time)
+        .where(appointment.c.status.in_(BUSY_STATUSES))
+        .where(appointment.c.data_horario >= start_of_today)
+        .where(appointment.c.end_time.is_not(None))
+        .order_by(appointment.c.id)
+    ).fetchall()
+
+    taken = set()
+    reservations = []
+    for appt_id, start, end in rows:
+        for cell in _reservation_cells(start, end):
+            if cell not in taken:
+                taken.add(cell)
+                reservations.append({'inicio': cell, 'appointment_id': appt_id})
+
+    if reservations:
+        op.bulk_insert(slot_reservation, reservations)
+
+
+def downgrade():
+    with op.batch_alter_table('slot_reservation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_slot_reservation_appointment_id'))
+
+    op.drop_table('slot_reservation')
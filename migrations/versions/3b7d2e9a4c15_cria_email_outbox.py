@@ -0,0 +1,46 @@
+"""Cria a tabela email_outbox (caixa de saída transacional de e-mails)
+
+Revision ID: 3b7d2e9a4c15
+Revises: f799a8b52de6
+Create Date: 2026-10-17 13:05:41.227914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7d2e9a4c15'
+down_revision = 'f799a8b52de6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('destinatario', sa.String(length=120), nullable=False),
+        sa.Column('assunto', sa.String(length=255), nullable=False),
+        sa.Column('corpo', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('tentativas', sa.Integer(), nullable=False),
+        sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+        sa.Column('ultimo_erro', sa.String(length=500), nullable=True),
+        sa.Column('reserva_token', sa.String(length=32), nullable=True),
+        sa.Column('reservado_ate', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('enviado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.create_index('idx_outbox_status_proxima', ['status', 'proxima_tentativa'], unique=False)
+        batch_op.create_index(batch_op.f('ix_email_outbox_reserva_token'), ['reserva_token'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('email_outbox', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_outbox_reserva_token'))
+        batch_op.drop_index('idx_outbox_status_proxima')
+
+    op.drop_table('email_outbox')
@@ -0,0 +1,33 @@
+"""Índices para os filtros da lista administrativa de agendamentos
+
+Revision ID: 6a0e4b8d1f37
+Revises: d5e83a17c9f2
+Create Date: 2026-10-17 16:31:52.104877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0e4b8d1f37'
+down_revision = 'd5e83a17c9f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('idx_appointment_servico_data', ['service_id', 'data_horario'], unique=False)
+        batch_op.create_index('idx_appointment_user_data', ['user_id', 'data_horario'], unique=False)
+
+    # 📌 Índice de expressão: a busca por prefixo do nome compara lower(nome)
+    op.create_index('idx_user_nome_lower', 'user', [sa.text('lower(nome)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_user_nome_lower', table_name='user')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('idx_appointment_user_data')
+        batch_op.drop_index('idx_appointment_servico_data')
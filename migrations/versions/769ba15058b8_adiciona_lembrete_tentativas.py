@@ -0,0 +1,29 @@
+"""Adiciona lembrete_tentativas em Appointment (limite de falhas do lembrete)
+
+Revision ID: 769ba15058b8
+Revises: 02f258ff4df9
+Create Date: 2026-10-17 23:02:41.550917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import column_exists
+
+
+# revision identifiers, used by Alembic.
+revision = '769ba15058b8'
+down_revision = '02f258ff4df9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # server_default preenche as linhas existentes sem falhas registradas
+    # 📌 ADD/DROP COLUMN direto: recriar appointment no SQLite apagaria as triggers do índice de busca
+    if not column_exists('appointment', 'lembrete_tentativas'):
+        op.add_column('appointment', sa.Column('lembrete_tentativas', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('appointment', 'lembrete_tentativas')
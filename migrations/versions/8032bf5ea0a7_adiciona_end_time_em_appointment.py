@@ -0,0 +1,74 @@
+"""Adiciona end_time calculado em Appointment e índice composto para checagem de conflito
+
+Revision ID: 8032bf5ea0a7
+Revises: a64ffa28ec58
+Create Date: 2026-10-17 09:12:44.381205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import timedelta
+
+from migrations.backfill import chunked, column_exists
+
+
+# revision identifiers, used by Alembic.
+revision = '8032bf5ea0a7'
+down_revision = 'a64ffa28ec58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 1. Adicionar a coluna 'end_time' (nula até o preenchimento)
+    if not column_exists('appointment', 'end_time'):
+        with op.batch_alter_table('appointment', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    # 2. Preencher end_time = data_horario + duração do serviço
+    # 📌 Calculado em Python para ser portável entre SQLite e PostgreSQL
+    appointment = sa.table(
+        'appointment',
+        sa.column('id', sa.Integer),
+        sa.column('data_horario', sa.DateTime),
+        sa.column('service_id', sa.Integer),
+        sa.column('end_time', sa.DateTime),
+    )
+    service = sa.table(
+        'service',
+        sa.column('id', sa.Integer),
+        sa.column('duracao_minutos', sa.Integer),
+    )
+
+    pending = appointment.c.end_time.is_(None)
+
+    def fill_range(conn, low, high):
+        rows = conn.execute(
+            sa.select(appointment.c.id, appointment.c.data_horario, service.c.duracao_minutos)
+            .select_from(appointment.join(service, appointment.c.service_id == service.c.id))
+            .where(appointment.c.id > low, appointment.c.id <= high, pending)
+        ).fetchall()
+        if rows:
+            conn.execute(
+                appointment.update()
+                .where(appointment.c.id == sa.bindparam('appt_id'))
+                .values(end_time=sa.bindparam('novo_end_time')),
+                [
+                    {'appt_id': appt_id, 'novo_end_time': inicio + timedelta(minutes=duracao)}
+                    for appt_id, inicio, duracao in rows
+                ]
+            )
+
+    # 📌 Em lotes por id (migrations/backfill.py): a carga inteira não fica na memória
+    # nem segura a escrita da tabela até o fim
+    chunked('appointment.end_time', appointment, fill_range)
+
+    # 3. Índice composto para a consulta de sobreposição (status + intervalo)
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('idx_appointment_status_periodo', ['status', 'data_horario', 'end_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('idx_appointment_status_periodo')
+        batch_op.drop_column('end_time')
@@ -0,0 +1,100 @@
+"""Adiciona nome_busca (minúsculas, sem acentos) em User e grava e-mails em minúsculas
+
+Revision ID: 959b7683a78a
+Revises: f2b8d4c61a95
+Create Date: 2026-10-17 22:05:13.604718
+
+"""
+import unicodedata
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import chunked, column_exists
+
+
+# revision identifiers, used by Alembic.
+revision = '959b7683a78a'
+down_revision = 'f2b8d4c61a95'
+branch_labels = None
+depends_on = None
+
+
+# 📌 Cópias de app.utils.search_key / normalize_email na data desta revisão:
+# a migração não pode mudar junto com o código da aplicação
+def search_key(text):
+    decomposed = unicodedata.normalize('NFD', (text or '').strip().lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+user = sa.table(
+    'user',
+    sa.column('id', sa.Integer),
+    sa.column('nome', sa.String),
+    sa.column('email', sa.String),
+    sa.column('nome_busca', sa.String),
+)
+
+
+def check_email_collisions():
+    """
+    Interrompe a migração se houver cadastros cujos e-mails só diferem em
+    maiúsculas/espaços: com o login comparando em minúsculas, nenhum deles
+    conseguiria entrar. Quem mantém o banco decide como mesclá-los.
+    """
+    if op.get_context().as_sql:
+        return
+    ids_by_email = defaultdict(list)
+    for user_id, email in op.get_bind().execute(sa.select(user.c.id, user.c.email).order_by(user.c.id)):
+        ids_by_email[normalize_email(email)].append(user_id)
+    collisions = {email: ids for email, ids in ids_by_email.items() if len(ids) > 1}
+    if collisions:
+        details = '; '.join(f'{email}: usuários {", ".join(map(str, ids))}' for email, ids in sorted(collisions.items()))
+        raise RuntimeError(
+            f'E-mails repetidos ignorando maiúsculas ({details}). Mescle ou altere esses cadastros '
+            'e rode a migração de novo; nada foi alterado.'
+        )
+
+
+def upgrade():
+    # 0. Antes de qualquer alteração: os e-mails em minúsculas precisam continuar únicos
+    check_email_collisions()
+
+    # 1. Coluna com a chave de busca do nome (o lower() do SQLite só converte ASCII)
+    # 📌 ADD/DROP COLUMN direto, sem recriar "user": os gatilhos do índice de busca continuam
+    if not column_exists('user', 'nome_busca'):
+        op.add_column('user', sa.Column('nome_busca', sa.String(length=100), nullable=True))
+
+    # 2. Preencher nome_busca e passar os e-mails para minúsculas
+    # 📌 Calculado em Python, com a mesma regra usada pela aplicação
+    def fill_range(conn, low, high):
+        rows = conn.execute(
+            sa.select(user.c.id, user.c.nome, user.c.email, user.c.nome_busca)
+            .where(user.c.id > low, user.c.id <= high)
+        ).fetchall()
+        for user_id, nome, email, nome_busca in rows:
+            values = {}
+            if nome_busca != search_key(nome):
+                values['nome_busca'] = search_key(nome)
+            if email != normalize_email(email):
+                values['email'] = normalize_email(email)
+            if values:
+                conn.execute(user.update().where(user.c.id == user_id).values(**values))
+
+    chunked('user.nome_busca', user, fill_range)
+
+    # 3. O índice da busca/ordem por nome passa de lower(nome) para nome_busca
+    op.drop_index('idx_user_nome_lower', table_name='user', if_exists=True)
+    op.create_index('idx_user_nome_busca', 'user', ['nome_busca'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    # Os e-mails continuam em minúsculas (não há como recuperar a grafia original)
+    op.drop_index('idx_user_nome_busca', table_name='user')
+    op.create_index('idx_user_nome_lower', 'user', [sa.text('lower(nome)')], unique=False)
+    op.drop_column('user', 'nome_busca')
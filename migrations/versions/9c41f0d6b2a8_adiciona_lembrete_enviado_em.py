@@ -0,0 +1,54 @@
+"""Adiciona lembrete_enviado_em em Appointment para a varredura periódica de lembretes
+
+Revision ID: 9c41f0d6b2a8
+Revises: 3b7d2e9a4c15
+Create Date: 2026-10-17 14:22:09.513870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime, timedelta
+
+from migrations.backfill import backfill, column_exists
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41f0d6b2a8'
+down_revision = '3b7d2e9a4c15'
+branch_labels = None
+depends_on = None
+
+# 📌 Mantido em sincronia com REMINDER_LEAD_HOURS (app/config.py)
+REMINDER_LEAD_HOURS = 24
+
+
+def upgrade():
+    if not column_exists('appointment', 'lembrete_enviado_em'):
+        with op.batch_alter_table('appointment', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('lembrete_enviado_em', sa.DateTime(), nullable=True))
+
+    # 📌 Agendamentos passados ou já dentro da janela tiveram o lembrete tratado
+    # pelas tarefas com countdown antigas: marcá-los evita um segundo envio.
+    appointment = sa.table(
+        'appointment',
+        sa.column('id', sa.Integer),
+        sa.column('data_horario', sa.DateTime),
+        sa.column('lembrete_enviado_em', sa.DateTime),
+    )
+    now = datetime.now()
+    backfill(
+        'appointment.lembrete_enviado_em', appointment,
+        values={'lembrete_enviado_em': now},
+        where=sa.and_(appointment.c.data_horario <= now + timedelta(hours=REMINDER_LEAD_HOURS),
+                      appointment.c.lembrete_enviado_em.is_(None))
+    )
+
+    # Índice criado depois do preenchimento: cada UPDATE do backfill não precisa mantê-lo
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('idx_appointment_lembrete', ['lembrete_enviado_em', 'data_horario'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('idx_appointment_lembrete')
+        batch_op.drop_column('lembrete_enviado_em')
@@ -0,0 +1,92 @@
+"""Cria daily_revenue (faturamento diário consolidado) e valor_cobrado em Appointment
+
+Revision ID: b2f6c83e5d10
+Revises: 6a0e4b8d1f37
+Create Date: 2026-10-17 17:45:26.880413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import backfill, column_exists
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f6c83e5d10'
+down_revision = '6a0e4b8d1f37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not column_exists('appointment', 'valor_cobrado'):
+        with op.batch_alter_table('appointment', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('valor_cobrado', sa.Float(), nullable=True))
+
+    appointment = sa.table(
+        'appointment',
+        sa.column('id', sa.Integer),
+        sa.column('data_horario', sa.DateTime),
+        sa.column('status', sa.String),
+        sa.column('service_id', sa.Integer),
+        sa.column('valor_cobrado', sa.Float),
+    )
+    service = sa.table(
+        'service',
+        sa.column('id', sa.Integer),
+        sa.column('preco', sa.Float),
+    )
+    daily_revenue = sa.table(
+        'daily_revenue',
+        sa.column('dia', sa.Date),
+        sa.column('service_id', sa.Integer),
+        sa.column('quantidade', sa.Integer),
+        sa.column('receita', sa.Float),
+    )
+
+    # 1. Concluídos antigos: o melhor valor disponível é o preço atual do serviço (em lotes)
+    current_price = (
+        sa.select(service.c.preco)
+        .where(service.c.id == appointment.c.service_id)
+        .scalar_subquery()
+    )
+    backfill(
+        'appointment.valor_cobrado', appointment,
+        values={'valor_cobrado': current_price},
+        where=sa.and_(appointment.c.status == 'Concluído', appointment.c.valor_cobrado.is_(None))
+    )
+
+    # 2. Consolidado inicial com um único INSERT ... SELECT ... GROUP BY
+    # (a tabela é criada só agora, junto da carga: numa retomada ela ainda não existe)
+    op.create_table(
+        'daily_revenue',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('receita', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+        sa.PrimaryKeyConstraint('dia', 'service_id')
+    )
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        dia = sa.func.date(appointment.c.data_horario)
+    else:
+        dia = sa.cast(appointment.c.data_horario, sa.Date)
+    grouped = (
+        sa.select(
+            dia,
+            appointment.c.service_id,
+            sa.func.count(appointment.c.id),
+            sa.func.sum(appointment.c.valor_cobrado),
+        )
+        .where(appointment.c.status == 'Concluído')
+        .group_by(dia, appointment.c.service_id)
+    )
+    op.execute(daily_revenue.insert().from_select(['dia', 'service_id', 'quantidade', 'receita'], grouped))
+
+
+def downgrade():
+    op.drop_table('daily_revenue')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('valor_cobrado')
@@ -0,0 +1,140 @@
+"""Cria o índice de busca textual (FTS5) de clientes, serviços e agendamentos
+
+Revision ID: c7d19e4f2a63
+Revises: b2f6c83e5d10
+Create Date: 2026-10-17 19:12:40.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.backfill import chunked
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d19e4f2a63'
+down_revision = 'b2f6c83e5d10'
+branch_labels = None
+depends_on = None
+
+
+# Documento de um agendamento: rowid = id * 4 + 3 (1 = cliente, 2 = serviço)
+APPOINTMENT_DOC = (
+    "SELECT a.id * 4 + 3, u.nome || ' · ' || s.nome, "
+    "a.status || ' ' || strftime('%d/%m/%Y %H:%M', a.data_horario), 'agendamento', a.data_horario "
+    'FROM appointment a JOIN "user" u ON u.id = a.user_id JOIN service s ON s.id = a.service_id'
+)
+
+# Carga inicial: (tabela, resto do rowid por 4, SELECT dos documentos, coluna id no SELECT)
+INITIAL_LOAD = (
+    ('user', 1, 'SELECT id * 4 + 1, nome, email, \'cliente\', NULL FROM "user"', 'id'),
+    ('service', 2, "SELECT id * 4 + 2, nome, descricao, 'servico', NULL FROM service", 'id'),
+    ('appointment', 3, APPOINTMENT_DOC, 'a.id'),
+)
+
+TRIGGERS = (
+    'search_user_ai', 'search_user_au', 'search_user_ad',
+    'search_service_ai', 'search_service_au', 'search_service_ad',
+    'search_appointment_ai', 'search_appointment_au', 'search_appointment_ad',
+)
+
+
+def upgrade():
+    # FTS5 é exclusivo do SQLite; nos demais bancos a busca usa LIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            titulo, detalhe, tipo UNINDEXED, quando UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+    """)
+
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_user_ai AFTER INSERT ON "user" BEGIN
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 1, new.nome, new.email, 'cliente');
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS search_user_au AFTER UPDATE OF nome, email ON "user" BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 1, new.nome, new.email, 'cliente');
+            DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM appointment WHERE user_id = new.id);
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {APPOINTMENT_DOC} WHERE a.user_id = new.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_user_ad AFTER DELETE ON "user" BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 1;
+        END
+    """)
+
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_service_ai AFTER INSERT ON service BEGIN
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 2, new.nome, new.descricao, 'servico');
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS search_service_au AFTER UPDATE OF nome, descricao ON service BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo) VALUES (new.id * 4 + 2, new.nome, new.descricao, 'servico');
+            DELETE FROM search_index WHERE rowid IN (SELECT id * 4 + 3 FROM appointment WHERE service_id = new.id);
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {APPOINTMENT_DOC} WHERE a.service_id = new.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_service_ad AFTER DELETE ON service BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 2;
+        END
+    """)
+
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS search_appointment_ai AFTER INSERT ON appointment BEGIN
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {APPOINTMENT_DOC} WHERE a.id = new.id;
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS search_appointment_au AFTER UPDATE OF status, data_horario, user_id, service_id ON appointment BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+            INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {APPOINTMENT_DOC} WHERE a.id = new.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS search_appointment_ad AFTER DELETE ON appointment BEGIN
+            DELETE FROM search_index WHERE rowid = old.id * 4 + 3;
+        END
+    """)
+
+    # Carga inicial dos registros existentes, em lotes por id (migrations/backfill.py).
+    # Cada lote apaga e reinsere os documentos da sua faixa: repetir um lote
+    # (retomada após interrupção) não duplica documentos.
+    for table, kind, documents, id_column in INITIAL_LOAD:
+        _load(table, kind, documents, id_column)
+    op.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def _load(table, kind, documents, id_column):
+    insert = f'INSERT INTO search_index (rowid, titulo, detalhe, tipo, quando) {documents}'
+    if op.get_context().as_sql:
+        op.execute(insert)
+        return
+
+    def load_range(conn, low, high):
+        bounds = {'low': low, 'high': high}
+        conn.execute(sa.text(
+            f'DELETE FROM search_index WHERE rowid > :low * 4 + {kind} AND rowid <= :high * 4 + {kind} '
+            f'AND rowid % 4 = {kind}'
+        ), bounds)
+        conn.execute(sa.text(f'{insert} WHERE {id_column} > :low AND {id_column} <= :high'), bounds)
+
+    chunked(f'search_index.{table}', table, load_range)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS search_index')
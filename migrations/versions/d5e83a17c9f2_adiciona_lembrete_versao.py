@@ -0,0 +1,27 @@
+"""Adiciona lembrete_versao em Appointment (lembretes versionados e idempotentes)
+
+Revision ID: d5e83a17c9f2
+Revises: 9c41f0d6b2a8
+Create Date: 2026-10-17 15:08:33.742106
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e83a17c9f2'
+down_revision = '9c41f0d6b2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # server_default preenche as linhas existentes com a versão inicial
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lembrete_versao', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('lembrete_versao')
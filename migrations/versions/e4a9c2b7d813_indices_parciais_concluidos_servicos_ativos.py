@@ -0,0 +1,36 @@
+"""Índices parciais: agendamentos concluídos (faturamento) e serviços ativos
+
+Revision ID: e4a9c2b7d813
+Revises: c7d19e4f2a63
+Create Date: 2026-10-17 20:05:13.482915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c2b7d813'
+down_revision = 'c7d19e4f2a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 📌 Sem batch_alter_table: recriar appointment/service no SQLite apagaria
+    # as triggers do índice de busca (c7d19e4f2a63)
+    op.create_index(
+        'idx_appointment_concluido_data', 'appointment', ['data_horario', 'id'], unique=False,
+        sqlite_where=sa.text("status = 'Concluído'"),
+        postgresql_where=sa.text("status = 'Concluído'")
+    )
+    op.create_index(
+        'idx_service_ativo_nome', 'service', ['nome'], unique=False,
+        sqlite_where=sa.text('is_active = 1'),
+        postgresql_where=sa.text('is_active = true')
+    )
+
+
+def downgrade():
+    op.drop_index('idx_service_ativo_nome', table_name='service')
+    op.drop_index('idx_appointment_concluido_data', table_name='appointment')
@@ -0,0 +1,53 @@
+"""Cria appointment_archive (histórico arquivado de agendamentos)
+
+Revision ID: f2b8d4c61a95
+Revises: e4a9c2b7d813
+Create Date: 2026-10-17 20:48:37.219604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d4c61a95'
+down_revision = 'e4a9c2b7d813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'appointment_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('data_horario', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('valor_cobrado', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('arquivado_em', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['service_id'], ['service.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('appointment_archive', schema=None) as batch_op:
+        batch_op.create_index('idx_archive_status_data', ['status', 'data_horario'], unique=False)
+        batch_op.create_index(batch_op.f('ix_appointment_archive_data_horario'), ['data_horario'], unique=False)
+
+
+COPIED_COLUMNS = 'id, data_horario, end_time, status, valor_cobrado, created_at, user_id, service_id'
+
+
+def downgrade():
+    # 📌 O histórico arquivado volta para a tabela quente antes de a tabela sumir
+    op.execute(
+        f'INSERT INTO appointment ({COPIED_COLUMNS}) SELECT {COPIED_COLUMNS} FROM appointment_archive'
+    )
+
+    with op.batch_alter_table('appointment_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_appointment_archive_data_horario'))
+        batch_op.drop_index('idx_archive_status_data')
+
+    op.drop_table('appointment_archive')
@@ -0,0 +1,31 @@
+"""Cria a tabela schedule_version (versões da agenda para ETag/Last-Modified)
+
+Revision ID: f799a8b52de6
+Revises: 1f49537930c6
+Create Date: 2026-10-17 11:20:06.918342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f799a8b52de6'
+down_revision = '1f49537930c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sem preenchimento: um escopo sem linha equivale à versão inicial
+    op.create_table(
+        'schedule_version',
+        sa.Column('escopo', sa.String(length=40), nullable=False),
+        sa.Column('versao', sa.Integer(), nullable=False),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('escopo')
+    )
+
+
+def downgrade():
+    op.drop_table('schedule_version')
@@ -0,0 +1,115 @@
+# tests/conftest.py
+
+import os
+import socket
+import sys
+
+import pytest
+from aiosmtpd.controller import Controller
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from app import availability_cache, celery, create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import Service, User  # noqa: E402
+
+PASSWORD = 'senha-teste'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Fábrica de apps de teste sobre um SQLite em tmp_path (mesmo 'path' = mesmo banco)."""
+
+    def factory(path=None, **config):
+        path = path or str(tmp_path / 'app.db')
+
+        class TestConfig(Config):
+            TESTING = True
+            WTF_CSRF_ENABLED = False
+            MAIL_SUPPRESS_SEND = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+
+        for name, value in config.items():
+            setattr(TestConfig, name, value)
+
+        app = create_app(TestConfig)
+        celery.conf.task_always_eager = True
+        with app.app_context():
+            # Só o primário: a réplica (quando configurada) é uma cópia dele
+            db.create_all(bind_key=None)
+        return app
+
+    yield factory
+    availability_cache.clear()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def seed(app):
+    """Admin, uma cliente e dois serviços ativos. Retorna os ids."""
+    with app.app_context():
+        admin = User(nome='Admin', email='admin@teste.com', is_admin=True)
+        client = User(nome='Maria Silva', email='maria@teste.com')
+        for user in (admin, client):
+            user.set_password(PASSWORD)
+        corte = Service(nome='Corte', descricao='Corte de cabelo', preco=50, duracao_minutos=30, is_active=True)
+        coloracao = Service(nome='Coloração', descricao='Tinta', preco=120, duracao_minutos=90, is_active=True)
+        db.session.add_all([admin, client, corte, coloracao])
+        db.session.commit()
+        return {'admin': admin.id, 'cliente': client.id, 'corte': corte.id, 'coloracao': coloracao.id}
+
+
+@pytest.fixture
+def login():
+    """login(client, email): autentica o cliente de teste com a senha padrão."""
+
+    def do_login(client, email, password=PASSWORD):
+        return client.post('/auth/login', data={'email': email, 'password': password})
+
+    return do_login
+
+
+class SMTPHandler:
+    """Servidor SMTP de teste: guarda os destinatários aceitos e recusa os de 'reject'."""
+
+    def __init__(self):
+        self.delivered = []
+        self.refused = []
+        self.reject = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            self.refused.append(address)
+            return '550 5.1.1 Caixa postal inexistente'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return '250 Mensagem aceita'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    """Servidor SMTP local (aiosmtpd); smtp.mail_config aponta o Flask-Mail para ele."""
+    controller = Controller(SMTPHandler(), hostname='127.0.0.1', port=free_port())
+    controller.start()
+    controller.mail_config = {
+        'MAIL_SUPPRESS_SEND': False, 'MAIL_SERVER': controller.hostname, 'MAIL_PORT': controller.port,
+        'MAIL_USE_TLS': False, 'MAIL_USE_SSL': False, 'MAIL_USERNAME': None, 'MAIL_PASSWORD': None,
+    }
+    yield controller
+    controller.stop()
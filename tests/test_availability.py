@@ -0,0 +1,189 @@
+# tests/test_availability.py
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import app.services.routes as services_routes
+
+from app import availability_cache, db
+from app.cache import MemoryCacheBackend
+from app.models import Appointment, Service, SlotReservation, User
+
+
+def _slots(client, service_id, day, etag=None):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get(f'/services/api/available_slots?service_id={service_id}&date={day}', headers=headers)
+
+
+def test_booking_from_another_worker_changes_etag_and_payload(make_app, seed, login, tmp_path):
+    # Dois "workers" sobre o mesmo banco, cada um com o seu cache em memória
+    worker_a = make_app()
+    worker_b = make_app(str(tmp_path / 'app.db'))
+    cache_a, cache_b = MemoryCacheBackend(), MemoryCacheBackend()
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+
+    client_a = worker_a.test_client()
+    login(client_a, 'maria@teste.com')
+    availability_cache.use_backend(cache_a)
+    first = _slots(client_a, seed['corte'], day)
+    assert first.status_code == 200
+    assert '10:00' in first.get_json()['available_slots']
+    etag = first.headers['ETag']
+
+    # O agendamento passa pelo outro worker: só o cache dele é invalidado
+    client_b = worker_b.test_client()
+    login(client_b, 'maria@teste.com')
+    availability_cache.use_backend(cache_b)
+    booked = client_b.post('/services/book', data={'service_id': seed['corte'], 'date': day, 'time': '10:00'})
+    assert booked.status_code == 302
+
+    availability_cache.use_backend(cache_a)
+    second = _slots(client_a, seed['corte'], day, etag)
+    assert second.status_code == 200
+    assert second.headers['ETag'] != etag
+    assert '10:00' not in second.get_json()['available_slots']
+
+    # A nova versão volta a ser servida do cache e validada com 304
+    assert _slots(client_a, seed['corte'], day, second.headers['ETag']).status_code == 304
+    assert _slots(client_a, seed['corte'], day).get_json() == second.get_json()
+
+
+def test_result_computed_before_a_commit_is_not_served_after_it(app, seed):
+    # Cálculo que começou antes do commit grava depois da invalidação
+    from app.services.availability import bump_schedule_versions, schedule_versions
+    from app import db
+
+    day = (datetime.now() + timedelta(days=3)).date()
+    with app.app_context():
+        old_versions, _ = schedule_versions([day])
+        bump_schedule_versions(day)
+        db.session.commit()
+        availability_cache.invalidate_days(day)
+        availability_cache.set(seed['corte'], day, ['09:00'], (old_versions.get(f'dia:{day}', 0), 0))
+
+        new_versions, _ = schedule_versions([day])
+        assert availability_cache.get(seed['corte'], day, (new_versions[f'dia:{day}'], 0)) is None
+
+
+def test_duration_off_the_reservation_grid_is_rejected(app, seed, login):
+    client = app.test_client()
+    login(client, 'admin@teste.com')
+    form = {'nome': 'Escova', 'descricao': 'Escova simples', 'preco': '40', 'duracao_minutos': '32'}
+
+    response = client.post('/admin/service/new', data=form)
+    assert 'A duração deve ser múltipla de 5 minutos' in response.get_data(as_text=True)
+    response = client.post(f'/admin/service/edit/{seed["corte"]}', data={**form, 'nome': 'Corte'})
+    assert 'A duração deve ser múltipla de 5 minutos' in response.get_data(as_text=True)
+
+    with app.app_context():
+        assert Service.query.filter_by(nome='Escova').count() == 0
+        assert db.session.get(Service, seed['corte']).duracao_minutos == 30
+
+
+def test_start_off_the_reservation_grid_is_rejected(app, seed, login):
+    client = app.test_client()
+    login(client, 'maria@teste.com')
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+
+    response = client.post('/services/book', data={'service_id': seed['corte'], 'date': day, 'time': '09:32'},
+                           follow_redirects=True)
+    assert 'Escolha um horário em intervalos de 5 minutos' in response.get_data(as_text=True)
+
+    # Na grade, agendamentos seguidos não disputam células
+    for time in ('09:00', '09:30'):
+        booked = client.post('/services/book', data={'service_id': seed['corte'], 'date': day, 'time': time})
+        assert booked.status_code == 302
+    with app.app_context():
+        assert Appointment.query.count() == 2
+
+
+def _book_concurrently(app, service_id, times, day):
+    """Um cliente logado por thread; todas postam ao mesmo tempo (barreira)."""
+    with app.app_context():
+        for i in range(len(times)):
+            user = User(nome=f'Cliente {i}', email=f'cliente{i}@teste.com')
+            user.set_password('senha')
+            db.session.add(user)
+        db.session.commit()
+
+    clients = []
+    for i in range(len(times)):
+        client = app.test_client()
+        client.post('/auth/login', data={'email': f'cliente{i}@teste.com', 'password': 'senha'})
+        clients.append(client)
+
+    barrier = threading.Barrier(len(times))
+
+    def worker(i):
+        barrier.wait()
+        clients[i].post('/services/book', data={'service_id': service_id, 'date': day, 'time': times[i]})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(times))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _widen_race_window(monkeypatch, seconds=0.05):
+    # Todas as threads passam por has_conflict antes de qualquer commit
+    original = services_routes.has_conflict
+
+    def slow_has_conflict(*args, **kwargs):
+        result = original(*args, **kwargs)
+        time.sleep(seconds)
+        return result
+
+    monkeypatch.setattr(services_routes, 'has_conflict', slow_has_conflict)
+
+
+def test_concurrent_bookings_for_the_same_slot_accept_only_one(app, seed, monkeypatch):
+    _widen_race_window(monkeypatch)
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+    _book_concurrently(app, seed['corte'], ['10:00'] * 8, day)
+
+    with app.app_context():
+        assert Appointment.query.count() == 1
+
+
+def test_concurrent_bookings_for_distinct_slots_are_all_accepted(app, seed, monkeypatch):
+    _widen_race_window(monkeypatch)
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+    times = [f'{9 + i // 2:02d}:{30 * (i % 2):02d}' for i in range(8)]
+    _book_concurrently(app, seed['corte'], times, day)
+
+    with app.app_context():
+        assert Appointment.query.count() == len(times)
+        overlaps = db.session.query(SlotReservation.inicio).group_by(SlotReservation.inicio)\
+            .having(db.func.count() > 1).count()
+        assert overlaps == 0
+
+
+def test_end_time_follows_start_and_service_on_flush(app, seed):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=3)
+    with app.app_context():
+        # Só service_id (sem carregar o serviço) e sem end_time
+        appointment = Appointment(user_id=seed['cliente'], service_id=seed['corte'], data_horario=start)
+        db.session.add(appointment)
+        db.session.commit()
+        assert appointment.end_time == start + timedelta(minutes=30)
+
+        appointment.data_horario = start + timedelta(hours=2)
+        db.session.commit()
+        assert appointment.end_time == start + timedelta(hours=2, minutes=30)
+
+        appointment.service_id = seed['coloracao']
+        db.session.commit()
+        assert appointment.end_time == start + timedelta(hours=3, minutes=30)
+
+        # Alterações que não envolvem início nem serviço mantêm o fim gravado
+        appointment.status = 'Concluído'
+        db.session.commit()
+        assert appointment.end_time == start + timedelta(hours=3, minutes=30)
+
+        # end_time atribuído junto com o início prevalece
+        appointment.data_horario = start
+        appointment.end_time = start + timedelta(minutes=45)
+        db.session.commit()
+        assert appointment.end_time == start + timedelta(minutes=45)
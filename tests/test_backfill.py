@@ -0,0 +1,101 @@
+# tests/test_backfill.py
+
+import sqlite3
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from migrations import backfill as backfill_module
+from migrations.backfill import CHECKPOINT_TABLE, backfill
+
+# Versão reduzida do benchmarks/bench_backfill.py (1 milhão de linhas, com
+# interrupção por SIGKILL): 20 mil linhas em lotes de 1000 bastam para
+# interromper no meio e retomar, e o teste roda em menos de um segundo.
+ROWS = 20000
+BATCH_SIZE = 1000
+INTERRUPT_AFTER_BATCHES = 7
+
+appointment = sa.table(
+    'appointment',
+    sa.column('id', sa.Integer),
+    sa.column('status', sa.String),
+    sa.column('preenchido', sa.Integer),
+    sa.column('vezes', sa.Integer),
+)
+
+
+@pytest.fixture
+def synthetic_db(tmp_path):
+    """SQLite com ROWS agendamentos (1 em cada 8 cancelado) e ids com lacunas."""
+    path = tmp_path / 'backfill.db'
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE appointment (id INTEGER PRIMARY KEY, status VARCHAR(50), '
+                 'preenchido INTEGER, vezes INTEGER NOT NULL DEFAULT 0)')
+    conn.executemany('INSERT INTO appointment (id, status) VALUES (?, ?)',
+                     [(i * 3, 'Cancelado' if i % 8 == 0 else 'Concluído') for i in range(1, ROWS + 1)])
+    conn.commit()
+    conn.close()
+    return sa.create_engine(f'sqlite:///{path}')
+
+
+class Interrupted(Exception):
+    """Simula a queda do processo no meio de um lote."""
+
+
+def _run_backfill(engine):
+    """Roda o backfill como numa migração (op ligado a um MigrationContext)."""
+    with engine.connect() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            # 'vezes' conta quantas vezes cada linha foi atualizada
+            return backfill(
+                'appointment.preenchido', appointment,
+                values={'preenchido': 1, 'vezes': appointment.c.vezes + 1},
+                where=appointment.c.status != 'Cancelado',
+                batch_size=BATCH_SIZE, sleep=0,
+            )
+
+
+def _scalar(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(sa.text(sql)).scalar()
+
+
+def test_interrupted_backfill_resumes_from_checkpoint(app, synthetic_db, monkeypatch):
+    save_checkpoint = backfill_module._save_checkpoint
+    batches = []
+
+    def crashing_save(conn, name, last_key):
+        # O lote de número INTERRUPT_AFTER_BATCHES + 1 cai antes do COMMIT
+        if len(batches) == INTERRUPT_AFTER_BATCHES:
+            raise Interrupted
+        batches.append(last_key)
+        save_checkpoint(conn, name, last_key)
+
+    with app.app_context():
+        monkeypatch.setattr(backfill_module, '_save_checkpoint', crashing_save)
+        with pytest.raises(Interrupted):
+            _run_backfill(synthetic_db)
+
+        # Só os lotes confirmados ficaram gravados, junto com o ponto salvo
+        last_key = _scalar(synthetic_db, f'SELECT ultima_chave FROM {CHECKPOINT_TABLE}')
+        assert last_key == batches[-1] == INTERRUPT_AFTER_BATCHES * BATCH_SIZE * 3
+        assert _scalar(synthetic_db, 'SELECT max(id) FROM appointment WHERE vezes > 0') <= last_key
+        assert _scalar(synthetic_db, f'SELECT count(*) FROM appointment WHERE id > {last_key} AND vezes > 0') == 0
+
+        monkeypatch.undo()
+        resumed = _run_backfill(synthetic_db)
+
+    # A retomada percorre só o que faltava
+    assert resumed == ROWS - INTERRUPT_AFTER_BATCHES * BATCH_SIZE
+
+    # Cada linha do filtro foi preenchida exatamente uma vez; as demais, nenhuma
+    assert _scalar(synthetic_db, "SELECT count(*) FROM appointment "
+                                 "WHERE status != 'Cancelado' AND (preenchido IS NOT 1 OR vezes != 1)") == 0
+    assert _scalar(synthetic_db, "SELECT count(*) FROM appointment "
+                                 "WHERE status = 'Cancelado' AND (preenchido IS NOT NULL OR vezes != 0)") == 0
+
+    # Checkpoint apagado (e a tabela também, por não haver outros backfills)
+    assert _scalar(synthetic_db, f"SELECT count(*) FROM sqlite_master WHERE name = '{CHECKPOINT_TABLE}'") == 0
@@ -0,0 +1,89 @@
+# tests/test_cache.py
+
+from datetime import date
+
+import fakeredis
+import pytest
+
+from app.cache import AvailabilityCache, RedisCacheBackend
+
+PREFIX = 'agendapro:disponibilidade:'
+DAY, OTHER_DAY = date(2026, 11, 3), date(2026, 11, 4)
+VERSION = (3, 1)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def client(server):
+    return fakeredis.FakeRedis(server=server)
+
+
+def _cache(client, ttl=300):
+    cache = AvailabilityCache()
+    cache.use_backend(RedisCacheBackend(client, ttl=ttl))
+    return cache
+
+
+def test_entries_of_a_day_share_one_hash(client):
+    cache = _cache(client)
+    cache.set(1, DAY, ['09:00', '09:30'], VERSION)
+    cache.set(2, DAY, ['10:00'], VERSION)
+    cache.set(1, OTHER_DAY, ['11:00'], VERSION)
+
+    assert sorted(client.keys(PREFIX + '*')) == [f'{PREFIX}{DAY}'.encode(), f'{PREFIX}{OTHER_DAY}'.encode()]
+    assert sorted(client.hkeys(f'{PREFIX}{DAY}')) == [b'1', b'2']
+    assert cache.get(1, DAY, VERSION) == ['09:00', '09:30']
+    assert cache.get(2, DAY, VERSION) == ['10:00']
+    assert cache.get(3, DAY, VERSION) is None
+
+
+def test_entry_from_another_version_is_a_miss(client):
+    cache = _cache(client)
+    cache.set(1, DAY, ['09:00'], VERSION)
+    assert cache.get(1, DAY, (VERSION[0] + 1, VERSION[1])) is None
+    assert cache.get(1, DAY, (VERSION[0], VERSION[1] + 1)) is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_ttl_is_set_on_first_write_only(client):
+    cache = _cache(client, ttl=300)
+    key = f'{PREFIX}{DAY}'
+    cache.set(1, DAY, ['09:00'], VERSION)
+    assert 295 <= client.ttl(key) <= 300
+
+    # Escritas seguintes no mesmo dia não renovam o prazo (expire nx):
+    # o hash inteiro expira a partir da primeira entrada
+    client.expire(key, 10)
+    cache.set(2, DAY, ['10:00'], VERSION)
+    assert 0 < client.ttl(key) <= 10
+
+    # Depois de expirado, a próxima escrita define o TTL de novo
+    client.delete(key)
+    cache.set(2, DAY, ['10:00'], VERSION)
+    assert 295 <= client.ttl(key) <= 300
+
+
+def test_invalidate_days_is_seen_by_every_worker(server):
+    worker_a = _cache(fakeredis.FakeRedis(server=server))
+    worker_b = _cache(fakeredis.FakeRedis(server=server))
+    worker_a.set(1, DAY, ['09:00'], VERSION)
+    worker_a.set(1, OTHER_DAY, ['11:00'], VERSION)
+    assert worker_b.get(1, DAY, VERSION) == ['09:00']
+
+    worker_b.invalidate_days(DAY)
+    assert worker_a.get(1, DAY, VERSION) is None
+    assert worker_a.get(1, OTHER_DAY, VERSION) == ['11:00']
+
+
+def test_clear_removes_only_cache_keys(client):
+    client.set('outra:chave', 'x')
+    cache = _cache(client)
+    cache.set(1, DAY, ['09:00'], VERSION)
+    cache.set(1, OTHER_DAY, ['11:00'], VERSION)
+
+    cache.clear()
+    assert client.keys('*') == [b'outra:chave']
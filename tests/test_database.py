@@ -0,0 +1,78 @@
+# tests/test_database.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from app import db, utils
+from app.admin.revenue import _apply_delta
+from app.models import DailyRevenue, ScheduleVersion
+from app.services.availability import bump_schedule_versions, day_scope
+
+
+def _journal_mode(app):
+    with app.app_context():
+        return db.session.execute(text('PRAGMA journal_mode')).scalar()
+
+
+def test_disabling_wal_switches_an_existing_database_back_to_delete(make_app):
+    wal_app = make_app()
+    assert _journal_mode(wal_app) == 'wal'
+    with wal_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+    # O modo WAL fica gravado no arquivo: sem o PRAGMA explícito continuaria em WAL
+    assert _journal_mode(make_app(SQLITE_WAL=False)) == 'delete'
+
+
+@pytest.fixture(params=['nativo', 'portavel'])
+def upsert_mode(request, monkeypatch):
+    """Roda o teste com o ON CONFLICT do SQLite e com o caminho dos demais dialetos."""
+    if request.param == 'portavel':
+        monkeypatch.setattr(utils, 'NATIVE_UPSERT_DIALECTS', {})
+    return request.param
+
+
+def test_upsert_inserts_then_updates(app, seed, upsert_mode):
+    day = date(2026, 11, 3)
+    with app.app_context():
+        bump_schedule_versions(day)
+        bump_schedule_versions(day, include_global=True)
+        db.session.commit()
+        versions = dict(db.session.query(ScheduleVersion.escopo, ScheduleVersion.versao))
+        assert versions == {day_scope(day): 2, 'global': 1}
+
+        _apply_delta(day, seed['corte'], 1, 50.0)
+        _apply_delta(day, seed['corte'], 1, 50.0)
+        _apply_delta(day, seed['corte'], -1, -50.0)
+        db.session.commit()
+        row = db.session.query(DailyRevenue.quantidade, DailyRevenue.receita).one()
+        assert tuple(row) == (1, 50.0)
+
+
+def test_portable_upsert_retries_the_update_after_a_concurrent_insert(app, seed, monkeypatch):
+    monkeypatch.setattr(utils, 'NATIVE_UPSERT_DIALECTS', {})
+    day = date(2026, 11, 3)
+    with app.app_context():
+        original_execute = db.session.execute
+        raced = []
+
+        def execute(stmt, *args, **kwargs):
+            result = original_execute(stmt, *args, **kwargs)
+            # Outra transação insere a chave entre o UPDATE vazio e o INSERT
+            if stmt.is_update and not raced:
+                raced.append(True)
+                original_execute(DailyRevenue.__table__.insert().values(
+                    dia=day, service_id=seed['corte'], quantidade=1, receita=50.0))
+            return result
+
+        monkeypatch.setattr(db.session, 'execute', execute)
+        _apply_delta(day, seed['corte'], 1, 50.0)
+        monkeypatch.undo()
+        db.session.commit()
+
+        assert raced
+        row = db.session.query(DailyRevenue.quantidade, DailyRevenue.receita).one()
+        assert tuple(row) == (2, 100.0)
@@ -0,0 +1,140 @@
+# tests/test_outbox.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db, mail
+from app.models import Appointment, EmailOutbox
+from app.notifications import queue_email
+from app.tasks import _claim_outbox_batch, drain_email_outbox
+from conftest import free_port
+
+RETRY_BASE = 60
+
+
+@pytest.fixture
+def outbox_app(make_app, smtp):
+    """App que envia de verdade para o servidor SMTP local, com até 3 tentativas."""
+    return make_app(
+        **smtp.mail_config,
+        OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=RETRY_BASE, OUTBOX_LEASE_SECONDS=300
+    )
+
+
+def _queue(*recipients):
+    messages = [queue_email(recipient, 'Assunto', 'Corpo') for recipient in recipients]
+    db.session.commit()
+    return [message.id for message in messages]
+
+
+def _make_due(message_id):
+    db.session.get(EmailOutbox, message_id).proxima_tentativa = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_expired_lease_is_reclaimed(outbox_app, smtp):
+    with outbox_app.app_context():
+        message_id, = _queue('cliente@teste.com')
+
+        # Um worker reserva o lote e morre antes de enviar
+        assert [message.id for message in _claim_outbox_batch(10, lease_seconds=300)] == [message_id]
+        db.session.remove()
+
+        # Com a reserva em vigor ninguém mais pega a mensagem
+        assert drain_email_outbox.run() == 0
+        assert smtp.handler.delivered == []
+
+        # Reserva vencida: a próxima drenagem envia
+        db.session.get(EmailOutbox, message_id).reservado_ate = datetime.now() - timedelta(seconds=1)
+        db.session.commit()
+        assert drain_email_outbox.run() == 1
+
+        message = db.session.get(EmailOutbox, message_id)
+        assert message.status == 'Enviado'
+        assert message.reserva_token is None and message.reservado_ate is None
+        assert smtp.handler.delivered == ['cliente@teste.com']
+
+
+def test_failed_message_backs_off_exponentially(outbox_app, smtp):
+    smtp.handler.reject.add('inexistente@teste.com')
+    with outbox_app.app_context():
+        failing_id, ok_id = _queue('inexistente@teste.com', 'cliente@teste.com')
+
+        # A recusa de um destinatário não impede o resto do lote
+        started = datetime.now()
+        assert drain_email_outbox.run() == 1
+        assert smtp.handler.delivered == ['cliente@teste.com']
+        assert db.session.get(EmailOutbox, ok_id).status == 'Enviado'
+
+        message = db.session.get(EmailOutbox, failing_id)
+        assert (message.status, message.tentativas) == ('Pendente', 1)
+        assert '550' in message.ultimo_erro
+        assert message.proxima_tentativa >= started + timedelta(seconds=RETRY_BASE)
+
+        # Antes do prazo a mensagem não é tentada de novo
+        assert drain_email_outbox.run() == 0
+        assert db.session.get(EmailOutbox, failing_id).tentativas == 1
+
+        # Segunda falha: o intervalo dobra
+        _make_due(failing_id)
+        started = datetime.now()
+        drain_email_outbox.run()
+        message = db.session.get(EmailOutbox, failing_id)
+        assert message.tentativas == 2
+        assert started + timedelta(seconds=2 * RETRY_BASE) <= message.proxima_tentativa
+        assert message.proxima_tentativa < started + timedelta(seconds=3 * RETRY_BASE)
+
+
+def test_message_fails_after_max_attempts(outbox_app, smtp):
+    smtp.handler.reject.add('inexistente@teste.com')
+    with outbox_app.app_context():
+        message_id, = _queue('inexistente@teste.com')
+
+        for attempt in range(1, 4):
+            _make_due(message_id)
+            drain_email_outbox.run()
+            assert db.session.get(EmailOutbox, message_id).tentativas == attempt
+
+        message = db.session.get(EmailOutbox, message_id)
+        assert message.status == 'Falhou'
+
+        # Descartada: não volta a ser tentada
+        _make_due(message_id)
+        drain_email_outbox.run()
+        assert db.session.get(EmailOutbox, message_id).tentativas == 3
+
+
+def test_connection_failure_returns_the_batch_to_the_queue(make_app):
+    app = make_app(MAIL_SUPPRESS_SEND=False, MAIL_SERVER='127.0.0.1', MAIL_PORT=free_port(),
+                   MAIL_USE_TLS=False, MAIL_USE_SSL=False)
+    with app.app_context():
+        ids = _queue('a@teste.com', 'b@teste.com')
+        assert drain_email_outbox.run() == 0
+        for message_id in ids:
+            message = db.session.get(EmailOutbox, message_id)
+            assert (message.status, message.tentativas, message.reserva_token) == ('Pendente', 1, None)
+
+
+def test_no_email_is_queued_when_the_booking_rolls_back(app, seed, login, monkeypatch):
+    client = app.test_client()
+    login(client, 'maria@teste.com')
+
+    def failing_commit():
+        db.session.flush()  # o e-mail chega a ser gravado na transação...
+        raise OperationalError('COMMIT', {}, Exception('disk I/O error'))
+
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+    with mail.record_messages() as outbox:
+        monkeypatch.setattr(db.session, 'commit', failing_commit)
+        response = client.post('/services/book', data={'service_id': seed['corte'], 'date': day, 'time': '10:00'})
+        monkeypatch.undo()
+        assert 'Ocorreu um erro ao processar o agendamento' in response.get_data(as_text=True)
+
+        # ...e sai junto com o agendamento no rollback
+        with app.app_context():
+            assert db.session.query(EmailOutbox).count() == 0
+            assert db.session.query(Appointment).count() == 0
+            assert drain_email_outbox.run() == 0
+    assert outbox == []
@@ -0,0 +1,41 @@
+# tests/test_pagination.py
+
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models import Appointment, User
+from app.utils import decode_cursor, encode_cursor
+
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 11, 3, 10, 30)
+    columns = (Appointment.data_horario, Appointment.id)
+    assert decode_cursor(encode_cursor([when, 7]), columns) == (when, 7)
+
+
+@pytest.mark.parametrize('payload, columns', [
+    ([[123, 1], 1], (Appointment.data_horario, Appointment.id)),
+    ([123, 1], (Appointment.data_horario, Appointment.id)),
+    (['2026-13-45', 1], (Appointment.data_horario, Appointment.id)),
+    (['2026-11-03T10:30:00', 'x'], (Appointment.data_horario, Appointment.id)),
+    ([[123, 1], 1], (User.nome_busca, User.id)),
+    ([None, 1], (User.nome_busca, User.id)),
+])
+def test_malformed_cursor_values_raise_value_error(payload, columns):
+    with pytest.raises(ValueError):
+        decode_cursor(_cursor(payload), columns)
+
+
+def test_malformed_cursor_redirects_instead_of_failing(app, seed, login):
+    client = app.test_client()
+    login(client, 'admin@teste.com')
+    for url in ('/admin/appointments', '/auth/manage_users'):
+        response = client.get(url, query_string={'depois': _cursor([[123, 1], 1])})
+        assert response.status_code == 302, url
@@ -0,0 +1,57 @@
+# tests/test_query_plans.py
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Appointment, Service, User
+from app.query_plans import check_query_plans
+
+# Índice que cada consulta crítica deve usar (o resto só não pode varrer tabelas)
+EXPECTED_INDEXES = {
+    'meus_agendamentos': 'idx_appointment_user_data',
+    'conflito_de_horario': 'idx_appointment_status_periodo',
+    'faturamento_pagina': 'idx_appointment_status_periodo',
+    'faturamento_exportacao': 'idx_appointment_status_periodo',
+    'servicos_ativos': 'idx_service_ativo_nome',
+}
+
+
+@pytest.fixture
+def plans(app):
+    """Planos das consultas críticas sobre um banco com um ano de agendamentos."""
+    rng = random.Random(23)
+    now = datetime.now().replace(microsecond=0)
+    with app.app_context():
+        users = [User(nome=f'Cliente {i}', email=f'c{i}@teste.com', senha_hash='x') for i in range(50)]
+        services = [Service(nome=f'Serviço {i}', preco=50, duracao_minutos=30, is_active=i % 4 != 0)
+                    for i in range(8)]
+        db.session.add_all(users + services)
+        db.session.flush()
+
+        first = now - timedelta(days=365)
+        rows = []
+        for i in range(5000):
+            start = first + timedelta(hours=2 * i)
+            rows.append({
+                'data_horario': start, 'end_time': start + timedelta(minutes=30),
+                'status': rng.choice(['Concluído'] * 6 + ['Cancelado', 'Agendado']),
+                'user_id': rng.choice(users).id, 'service_id': rng.choice(services).id,
+            })
+        db.session.execute(Appointment.__table__.insert(), rows)
+        db.session.commit()
+
+        yield {name: (plan, scans) for name, plan, scans in check_query_plans(now)}
+
+
+def test_hot_queries_do_not_scan_whole_tables(plans):
+    scanned = {name: (scans, plan) for name, (plan, scans) in plans.items() if scans}
+    assert scanned == {}
+
+
+@pytest.mark.parametrize('name, index', sorted(EXPECTED_INDEXES.items()))
+def test_hot_queries_use_their_index(plans, name, index):
+    plan, _ = plans[name]
+    assert any(f'INDEX {index} ' in f'{line} ' for line in plan), plan
@@ -0,0 +1,77 @@
+# tests/test_reminders.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, tasks
+from app.models import Appointment
+
+MAX_ATTEMPTS = 2
+
+
+@pytest.fixture
+def reminder_app(make_app, smtp):
+    return make_app(**smtp.mail_config, REMINDER_MAX_ATTEMPTS=MAX_ATTEMPTS, REMINDER_LEAD_HOURS=24)
+
+
+@pytest.fixture
+def due_appointment(reminder_app, seed):
+    """Agendamento da cliente dentro da janela do lembrete, ainda sem lembrete."""
+    with reminder_app.app_context():
+        start = datetime.now() + timedelta(hours=3)
+        appointment = Appointment(
+            user_id=seed['cliente'], service_id=seed['corte'], data_horario=start,
+            end_time=start + timedelta(minutes=30), status='Agendado'
+        )
+        db.session.add(appointment)
+        db.session.commit()
+        return appointment.id
+
+
+def _swept(monkeypatch):
+    """Ids que a varredura despacharia (sem rodar as tarefas de envio)."""
+    chunks = []
+    monkeypatch.setattr(tasks.send_appointment_reminders_batch, 'delay', chunks.append)
+    tasks.sweep_appointment_reminders.run()
+    return [appt_id for chunk in chunks for appt_id, _ in chunk]
+
+
+def _deliver(appointment_id):
+    appointment = db.session.get(Appointment, appointment_id)
+    sent = tasks.send_appointment_reminders_batch.run([[appointment.id, appointment.lembrete_versao]])
+    db.session.expire_all()
+    return sent
+
+
+def test_reminder_is_sent_once(reminder_app, smtp, due_appointment):
+    with reminder_app.app_context():
+        assert _deliver(due_appointment) == 1
+        assert _deliver(due_appointment) == 0
+        appointment = db.session.get(Appointment, due_appointment)
+        assert appointment.lembrete_enviado_em is not None and appointment.lembrete_tentativas == 0
+    assert smtp.handler.delivered == ['maria@teste.com']
+
+
+def test_failing_reminder_stops_after_max_attempts(reminder_app, smtp, due_appointment, monkeypatch):
+    smtp.handler.reject.add('maria@teste.com')
+    with reminder_app.app_context():
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            assert _swept(monkeypatch) == [due_appointment]
+            assert _deliver(due_appointment) == 0
+            appointment = db.session.get(Appointment, due_appointment)
+            assert (appointment.lembrete_enviado_em, appointment.lembrete_tentativas) == (None, attempt)
+
+        # Esgotado: nem a varredura nem uma tarefa antiga na fila tentam de novo
+        assert _swept(monkeypatch) == []
+        assert _deliver(due_appointment) == 0
+    assert smtp.handler.refused == ['maria@teste.com'] * MAX_ATTEMPTS
+
+
+def test_rescheduling_resets_the_attempts(reminder_app, due_appointment):
+    with reminder_app.app_context():
+        appointment = db.session.get(Appointment, due_appointment)
+        appointment.lembrete_tentativas = MAX_ATTEMPTS
+        appointment.data_horario += timedelta(days=2)
+        assert appointment.reset_reminder(24) is True
+        assert appointment.lembrete_tentativas == 0
@@ -0,0 +1,66 @@
+# tests/test_replica.py
+
+import shutil
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g, session
+
+from app import db
+from app.services import routes as services_routes
+
+
+@pytest.fixture
+def replicated(app, make_app, seed, tmp_path):
+    """App com primário e réplica em dois arquivos SQLite (a réplica é uma cópia, sem replicação)."""
+    # Fecha as conexões do app que semeou o banco: o WAL volta ao arquivo antes da cópia
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    primary, replica = tmp_path / 'app.db', tmp_path / 'replica.db'
+    shutil.copy(primary, replica)
+    return make_app(str(primary), DATABASE_REPLICA_URL=f'sqlite:///{replica}', REPLICA_STICKY_SECONDS=30)
+
+
+def test_sticky_user_reads_own_booking_while_others_read_replica(replicated, seed, login):
+    day = (datetime.now() + timedelta(days=3)).strftime('%Y-%m-%d')
+    url = f'/services/api/available_slots?service_id={seed["corte"]}&date={day}'
+
+    booker = replicated.test_client()
+    login(booker, 'maria@teste.com')
+    assert booker.post('/services/book', data={
+        'service_id': seed['corte'], 'date': day, 'time': '10:00'
+    }).status_code == 302
+
+    # Quem agendou lê o primário (ler o que gravou)...
+    assert '10:00' not in booker.get(url).get_json()['available_slots']
+
+    # ...os demais continuam na réplica, que não recebeu o agendamento
+    other = replicated.test_client()
+    login(other, 'admin@teste.com')
+    assert '10:00' in other.get(url).get_json()['available_slots']
+
+
+def test_replica_and_primary_reads_do_not_share_a_flight(replicated, seed, monkeypatch):
+    keys = []
+
+    class RecordingFlight:
+        def do(self, key, fn):
+            keys.append(key)
+            return fn()
+
+    monkeypatch.setattr(services_routes, 'availability_flight', RecordingFlight())
+    day = (datetime.now() + timedelta(days=3)).date()
+
+    for sticky in (False, True):
+        with replicated.test_request_context():
+            g.usar_replica = True
+            if sticky:
+                session['_ler_primario_ate'] = time.time() + 30
+            assert db.session().reads_from_replica() is not sticky
+            # Mesmas versões: só o banco lido distingue as duas chamadas
+            services_routes.get_available_slots_range([seed['corte']], day, day, versions={})
+
+    assert len(keys) == 2 and keys[0] != keys[1]
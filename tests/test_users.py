@@ -0,0 +1,146 @@
+# tests/test_users.py
+
+import importlib.util
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import db
+from app.models import Appointment, User
+from conftest import PASSWORD
+
+
+@pytest.fixture
+def clientes(app, seed):
+    """Clientes com acentos e e-mail em maiúsculas, um agendamento para cada um."""
+    with app.app_context():
+        erica = User(nome='Érica Souza', email='Erica.Souza@Teste.com')
+        ana = User(nome='Ânia Lima', email='ania@teste.com')
+        for user in (erica, ana):
+            user.set_password(PASSWORD)
+        db.session.add_all([erica, ana])
+        db.session.flush()
+        start = datetime.now() + timedelta(days=2)
+        for offset, user in enumerate((erica, ana)):
+            db.session.add(Appointment(
+                data_horario=start + timedelta(hours=offset), end_time=start + timedelta(hours=offset, minutes=30),
+                user_id=user.id, service_id=seed['corte']
+            ))
+        db.session.commit()
+        return {'erica': erica.id, 'ania': ana.id}
+
+
+def _listed_users(client, q):
+    html = client.get('/auth/manage_users', query_string={'q': q}).get_data(as_text=True)
+    return {nome for nome in ('Érica Souza', 'Ânia Lima', 'Maria Silva') if nome in html}
+
+
+def test_email_is_stored_lowercase_and_login_ignores_case(app, clientes, login):
+    with app.app_context():
+        assert db.session.get(User, clientes['erica']).email == 'erica.souza@teste.com'
+
+    client = app.test_client()
+    response = login(client, ' ERICA.souza@teste.com ')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/')
+
+
+@pytest.mark.parametrize('busca, esperados', [
+    ('Érica', {'Érica Souza'}),
+    ('ér', {'Érica Souza'}),
+    ('eri', {'Érica Souza'}),
+    ('Ân', {'Ânia Lima'}),
+    ('ân', {'Ânia Lima'}),
+    ('ERICA.S', {'Érica Souza'}),
+    ('maria@', {'Maria Silva'}),
+])
+def test_user_search_ignores_case_and_accents(app, clientes, login, busca, esperados):
+    client = app.test_client()
+    login(client, 'admin@teste.com')
+    assert _listed_users(client, busca) == esperados
+
+
+def test_name_change_updates_search_key(app, clientes):
+    with app.app_context():
+        user = db.session.get(User, clientes['ania'])
+        user.nome = 'Íris Prado'
+        db.session.commit()
+        found = db.session.query(User.nome).filter(User.prefix_condition('iris')).all()
+        assert found == [('Íris Prado',)]
+
+
+def test_appointment_count_links_to_the_user_appointments(app, clientes, login):
+    client = app.test_client()
+    login(client, 'admin@teste.com')
+    html = client.get('/auth/manage_users').get_data(as_text=True)
+    assert f'user_id={clientes["erica"]}' in html
+    assert 'cliente=' not in html
+
+    page = client.get('/admin/appointments', query_string={'escopo': 'todos', 'user_id': clientes['erica']})
+    assert page.status_code == 200
+    text = page.get_data(as_text=True)
+    assert 'erica.souza@teste.com' in text and 'ania@teste.com' not in text
+
+
+
+@pytest.fixture
+def users_db(tmp_path):
+    """Cria uma tabela "user" no esquema anterior à 959b7683a78a e devolve o engine."""
+    path = tmp_path / 'usuarios.db'
+
+    def build(users):
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE "user" (id INTEGER PRIMARY KEY, nome VARCHAR(100), email VARCHAR(120) UNIQUE)')
+        conn.execute('CREATE INDEX idx_user_nome_lower ON "user" (lower(nome))')
+        conn.executemany('INSERT INTO "user" (id, nome, email) VALUES (?, ?, ?)', users)
+        conn.commit()
+        conn.close()
+        return sa.create_engine(f'sqlite:///{path}')
+
+    return build
+
+
+def _upgrade_nome_busca(app, engine):
+    """Roda o upgrade da revisão como o 'flask db upgrade' (com o app para a configuração dos lotes)."""
+    path = next(Path(__file__).parents[1].glob('migrations/versions/959b7683a78a_*.py'))
+    spec = importlib.util.spec_from_file_location('migration_959b7683a78a', path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with app.app_context(), engine.connect() as conn:
+        # Transação controlada pelo Alembic, como a de cada revisão no 'flask db upgrade'
+        context = MigrationContext.configure(conn, opts={'transactional_ddl': True})
+        with Operations.context(context), context.begin_transaction():
+            migration.upgrade()
+
+
+def _users_table(engine):
+    with engine.connect() as conn:
+        columns = {column['name'] for column in sa.inspect(conn).get_columns('user')}
+        emails = conn.execute(sa.text('SELECT email FROM "user" ORDER BY id')).scalars().all()
+    return columns, emails
+
+
+def test_email_migration_stops_on_case_only_duplicates(app, users_db):
+    engine = users_db([(1, 'Ana', 'Ana@Teste.com'), (2, 'Ana Paula', 'ana@teste.com'), (3, 'Érica', 'Erica@Teste.com')])
+    with pytest.raises(RuntimeError, match=r'ana@teste\.com: usuários 1, 2'):
+        _upgrade_nome_busca(app, engine)
+
+    # Nada foi alterado: nem a coluna nova nem os e-mails
+    columns, emails = _users_table(engine)
+    assert 'nome_busca' not in columns
+    assert emails == ['Ana@Teste.com', 'ana@teste.com', 'Erica@Teste.com']
+
+
+def test_email_migration_lowercases_emails_and_fills_search_key(app, users_db):
+    engine = users_db([(1, 'Ana', 'Ana@Teste.com'), (2, 'Érica Souza', ' Erica@Teste.com')])
+    _upgrade_nome_busca(app, engine)
+
+    columns, emails = _users_table(engine)
+    assert emails == ['ana@teste.com', 'erica@teste.com']
+    with engine.connect() as conn:
+        assert conn.execute(sa.text('SELECT nome_busca FROM "user" ORDER BY id')).scalars().all() == ['ana', 'erica souza']